@@ -79,82 +79,47 @@ pd.options.display.float_format = '{:,.2f}'.format
 
 import statsmodels.formula.api as smf
 
-# Create loop to process the datasets
+from nyc_sales.loader import sales_files
+from nyc_sales.schema import borough_names
+from nyc_sales.store import SalesStore, update_store
+
+# Load the datasets
 
 # Defining lists of years and boroughs
 years = [2018, 2019, 2020, 2021]
 boroughs = ['manhattan', 'brooklyn', 'queens']
 
-# Defining the list of columns we want to keep in our final database
-columns_to_keep = ['BOROUGH', 'NEIGHBORHOOD', 'BUILDINGCLASSCATEGORY', 'BLOCK', 'LOT', 'EASE-MENT',
-                    'ADDRESS', 'APARTMENTNUMBER', 'ZIPCODE', 'RESIDENTIALUNITS', 'COMMERCIALUNITS', 
-                   'TOTALUNITS', 'LANDSQUAREFEET', 'GROSSSQUAREFEET', 'YEARBUILT', 'TAXCLASSATTIMEOFSALE', 
-                   'BUILDINGCLASSATTIMEOFSALE', 'SALEPRICE', 'SALEDATE']
-
-# Creating a dictionary to store the clean databases
-dict_df = {}
-
-# LOOP
-
-for year in years :
-    for borough in boroughs :
-
-        # Importing the database
-        filename = str(year) + '_' + borough + '.xlsx'
-
-        # Load year 2018 and 2019 
-        if year == 2018 or year == 2019 :
-            database = pd.read_excel(filename, header = 4)
-        # Load year 2020 and 2021
-        elif year == 2020 or year == 2021 :
-            database = pd.read_excel(filename, header = 6)
-        
-        # Deleting '\n's and empty spaces from column names
-        database.columns = database.columns.str.replace(pat = '\n', repl = '')
-        database.columns = database.columns.str.replace(pat = ' ', repl = '')
-        
-        # Only keeping useful columns in the db
-        database = database[columns_to_keep]
-        
-        # Storing clean database into the dictionary
-        dict_df[filename[:-5]] = database
-
-# Concatenating all clean databases into one big DB
-nyc_db = pd.concat(dict_df, ignore_index = True)
-
-# Dropping "EASE-MENT" column
-nyc_db = nyc_db.drop('EASE-MENT', axis = 1)
-
-# Putting all the right column types
+# The header row moved between years (row 5 in 2018-2019, row 7 in 2020-2021),
+# so the loader looks for the BOROUGH / SALE PRICE row in each workbook and
+# parses the workbooks in parallel. Column names come back without '\n's and
+# spaces, and only the columns we use are kept ("EASE-MENT" is left out).
+# The parsed workbooks go into a Parquet store partitioned by sale year and
+# borough, so a workbook is only parsed again when it changes.
+update_store('nyc_sales.store', sales_files('.', years, boroughs))
+sales = SalesStore('nyc_sales.store')
 
-nyc_db['BOROUGH'] = nyc_db['BOROUGH'].astype(str)
-nyc_db['BLOCK'] = nyc_db['BLOCK'].astype(str)
-nyc_db['LOT'] = nyc_db['LOT'].astype(str)
-nyc_db['ZIPCODE'] = nyc_db['ZIPCODE'].astype(str)
-nyc_db['TAXCLASSATTIMEOFSALE'] =nyc_db['TAXCLASSATTIMEOFSALE'].astype(str)
-nyc_db['YEARBUILT'] = nyc_db['YEARBUILT'].astype(str)
+# Only the boroughs and years we study are read from the store
+nyc_db = sales.query(filters = [('BOROUGH', 'in', [1, 3, 4]), ('saleyear', 'in', years)])
 
-# Converting the 'YEAR BUILT' column to datetime format
+# Putting all the right column types
 
-nyc_db['YEARBUILT'] = nyc_db['YEARBUILT'].str[0:4]
-nyc_db['YEARBUILT'] = pd.to_datetime(nyc_db['YEARBUILT'], format = '%Y', errors='coerce')
+# BOROUGH, BLOCK, LOT, ZIPCODE and TAXCLASSATTIMEOFSALE already come as small
+# integer codes, SALEDATE as a date with the sale year next to it and the
+# building class letter ('A') as a categorical (see nyc_sales.schema).
+# YEARBUILT comes as a whole year, missing for 0 and for years outside
+# 1700 to this year.
 
 # Drop rows where we do not have information on gross feet squarage and sale price
 nyc_db.dropna(subset = ['SALEPRICE'], inplace = True)
 nyc_db.dropna(subset = ['GROSSSQUAREFEET'], inplace = True)
 
-# Create column with the sale year
-nyc_db['saleyear'] = nyc_db['SALEDATE'].dt.year
-
 nyc_db_subset = nyc_db.copy()
 
 # Map 2018-2019 and 2020-2021 to pre and post-Covid
 nyc_db_subset['Pre/Post Covid'] = nyc_db_subset['saleyear'].map({2018 : 'Pre Covid', 2019 : 'Pre Covid', 2020 : 'Post Covid', 2021 : 'Post Covid'})
 
 # Map Borough numbers to Boroughs names
-nyc_db_subset['BOROUGH'] = nyc_db_subset['BOROUGH'].map({'1.0' : 'Manhattan', 
-                                                         '3.0' : 'Brooklyn', 
-                                                         '4.0' : 'Queens'})
+nyc_db_subset['BOROUGH'] = borough_names(nyc_db_subset['BOROUGH'])
 # Cleaning NaN values from Apartment number column
 
 nyc_db_subset.dropna(subset = ['APARTMENTNUMBER', 'BOROUGH', 'YEARBUILT'], axis = 0, inplace = True)
@@ -174,44 +139,19 @@ What percentage of the total residential transactions (Tax Class Type Two) occur
 
 """
 
-# Create Data Frame for Tax Class 2 Properties
-class2 = nyc_db_subset.loc[nyc_db_subset['TAXCLASSATTIMEOFSALE'] == '2.0']
-#Include Pre Covid Variables
-class2.pre = class2.loc[class2['Pre/Post Covid'] == 'Pre Covid']
-
-# Find number of transactions for each borough
-class2.pre.manhattan = class2.pre.loc[class2.pre['BOROUGH'] == 'Manhattan']
-class2.pre.brooklyn = class2.pre.loc[class2.pre['BOROUGH'] == 'Brooklyn']
-class2.pre.queens = class2.pre.loc[class2.pre['BOROUGH'] == 'Queens']
-
-#Include Post Covid Variables
-class2.post = class2.loc[class2['Pre/Post Covid'] == 'Post Covid']
-
-# Find number of transactions for each borough
-class2.post.manhattan = class2.post.loc[class2.post['BOROUGH'] == 'Manhattan']
-class2.post.brooklyn = class2.post.loc[class2.post['BOROUGH'] == 'Brooklyn']
-class2.post.queens = class2.post.loc[class2.post['BOROUGH'] == 'Queens']
+from nyc_sales.cube import crosstab, crosstab_table
 
+# Create Data Frame for Tax Class 2 Properties
+class2 = nyc_db_subset.loc[nyc_db_subset['TAXCLASSATTIMEOFSALE'] == 2]
 
+# Count the transactions of each borough before and after Covid in one pass,
+# with the totals, as shares of all the tax class 2 transactions
+# (nyc_sales.cube.SalesCube gives the same tables straight from the sales store)
+class2_cube = crosstab(class2, ['BOROUGH', 'Pre/Post Covid'])
 
-preman = class2.pre.manhattan.BOROUGH.count()/class2.BOROUGH.count()
-prebro = class2.pre.brooklyn.BOROUGH.count()/class2.BOROUGH.count()
-preque = class2.pre.queens.BOROUGH.count()/class2.BOROUGH.count()
-postman = class2.post.manhattan.BOROUGH.count()/class2.BOROUGH.count()
-postbro = class2.post.brooklyn.BOROUGH.count()/class2.BOROUGH.count()
-postque = class2.post.queens.BOROUGH.count()/class2.BOROUGH.count()
-
-totalprecov = preman + prebro + preque
-totalpostcov = postman + postbro + postque
-totalman = preman + postman
-totalbro = prebro + postbro
-totalque = preque + postque
-total = totalprecov + totalpostcov
-
-percov = pd.DataFrame({'Borough': ['Manhattan', 'Brooklyn', 'Queens', 'Total'],
-                       'Pre Covid': [preman, prebro, preque, totalprecov],
-                       'Post Covid': [postman, postbro, postque, totalpostcov],
-                       'Total': [totalman, totalbro, totalque, total]})
+percov = crosstab_table(class2_cube, index = 'BOROUGH', columns = 'Pre/Post Covid', statistic = 'share')
+percov = percov.loc[['Manhattan', 'Brooklyn', 'Queens', 'Total'], ['Pre Covid', 'Post Covid', 'Total']]
+percov = percov.rename_axis('Borough').reset_index()
 
 percov
 
@@ -259,7 +199,7 @@ The previous descriptive questions yielded insights that Manhattan had higher fr
 To dive deeper, what is the average sale price per square feet in each of the borough's? Is there any difference between before and after the pandemic?
 """
 
-class2 = nyc_db_subset.loc[nyc_db_subset['TAXCLASSATTIMEOFSALE'] == '2.0']
+class2 = nyc_db_subset.loc[nyc_db_subset['TAXCLASSATTIMEOFSALE'] == 2]
 class2.dropna(subset = ['SALEPRICE'], inplace = True)
 class2.drop(class2[class2['SALEPRICE'] == 0].index, inplace = True)
 class2.dropna(subset = ['GROSSSQUAREFEET'], inplace = True)
@@ -372,7 +312,7 @@ buildingclass_category.head(30)
 
 # See the residential building class at time of sale 'A' with its borough during both pre/post Covid
 
-buildingclass_ts = nyc_db_subset[nyc_db_subset['BUILDINGCLASSATTIMEOFSALE'].str.startswith('A')]
+buildingclass_ts = nyc_db_subset[nyc_db_subset['BUILDINGCLASSLETTER'] == 'A']
 buildingclass_ts = buildingclass_ts.groupby(['BOROUGH', 'BUILDINGCLASSATTIMEOFSALE', 'Pre/Post Covid'])['SALEPRICE'].nunique()
 buildingclass_ts = buildingclass_ts.to_frame()
 buildingclass_ts.rename(columns = {'SALEPRICE':'# of Transactions'}, inplace = True)
@@ -402,8 +342,8 @@ We would like to understand how each of those variables change across Boroughs a
 
 # Run regression for Pre-Covid Variables
 
-regpre = nyc_db_subset[nyc_db_subset['BUILDINGCLASSATTIMEOFSALE'].str.startswith('A')]
-regpre = nyc_db_subset[nyc_db_subset['TAXCLASSATTIMEOFSALE'] == '2.0']
+regpre = nyc_db_subset[nyc_db_subset['BUILDINGCLASSLETTER'] == 'A']
+regpre = nyc_db_subset[nyc_db_subset['TAXCLASSATTIMEOFSALE'] == 2]
 regpre = nyc_db_subset[nyc_db_subset['Pre/Post Covid'] == 'Pre Covid']
 regspre = smf.ols(data= regpre, formula='SALEPRICE ~ GROSSSQUAREFEET + BOROUGH+ BUILDINGCLASSATTIMEOFSALE').fit()
 regspre.summary()
@@ -411,8 +351,8 @@ regspre.summary()
 """When running the regression for the impact the variables had on the sales price before the pandemic, the overall correlation was low, at 0.119. Individually, each of the variables, had a low correlation -possibly due to the amount of variables included, but all which are highly relevant for our analysis. Furthemore, the correlation coefficients for most of the buildings categories is negative, except for A7, D3, D9, R5, RA, RB, RH and RK, most of which are Condos. Based on the p-values (lower than 0.05), we can see that building classes C4 and C5, which are both Walk Up Apartments, are the only ones significant. As expected, Borough and Gross Square Feet had a much higher correlation with Sale Price, as an increase of one unit in Gross Square Feet, would represent a $606 increase in sale price. On the other hand, Borough didn't seem to have such a strong correlation either, possibly due to the range of prices or high amount of variables being explored. """
 
 # Test Regression for Post-Covid Variables
-regpost = nyc_db_subset[nyc_db_subset['BUILDINGCLASSATTIMEOFSALE'].str.startswith('A')]
-regpost = nyc_db_subset[nyc_db_subset['TAXCLASSATTIMEOFSALE'] == '2.0']
+regpost = nyc_db_subset[nyc_db_subset['BUILDINGCLASSLETTER'] == 'A']
+regpost = nyc_db_subset[nyc_db_subset['TAXCLASSATTIMEOFSALE'] == 2]
 regpost = nyc_db_subset[nyc_db_subset['Pre/Post Covid'] == 'Post Covid']
 regspost = smf.ols(data= regpost, formula='SALEPRICE ~ GROSSSQUAREFEET + BOROUGH + BUILDINGCLASSCATEGORY').fit()
 regspost.summary()
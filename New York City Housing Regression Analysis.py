@@ -365,33 +365,21 @@ nyc.info()
 nyc = nyc.drop(['EASE-MENT'], axis = 1)
 
 # %%
-# Convert datatypes 'BOROUGH', 'BLOCK', 'LOT', 'ZIPCODE', 'TAXCLASSATTIMEOFSALE', 'YEARBUILT' as string 
-nyc['BOROUGH'] = nyc['BOROUGH'].astype(str)
+# Store 'BOROUGH', 'BLOCK', 'LOT', 'ZIPCODE', 'TAXCLASSATTIMEOFSALE' as small integer codes instead of strings,
+# which also adds the building class letter ('A') and the sale year (see nyc_sales.schema)
+# 'YEARBUILT' becomes a whole year, with 0 and years outside 1700 to this year as missing values
+from nyc_sales.schema import borough_names, enforce_sales_schema
 
-nyc['BLOCK'] = nyc['BLOCK'].astype(str)
-
-nyc['LOT'] = nyc['LOT'].astype(str)
-
-nyc['ZIPCODE'] = nyc['ZIPCODE'].astype(str)
-
-nyc['TAXCLASSATTIMEOFSALE'] = nyc['TAXCLASSATTIMEOFSALE'].astype(str)
-
-nyc['YEARBUILT'] = nyc['YEARBUILT'].astype(str)
+nyc = enforce_sales_schema(nyc)
 
 # %%
 # Return a series containing counts of unique values from column 'YEARBUILT' in nyc dataframe 
 nyc['YEARBUILT'].value_counts()
 
 # %%
-# Return values that corresponds to index 0 to 4 inside 'YEARBUILT' column inside nyc dataframe
-nyc['YEARBUILT'] = nyc['YEARBUILT'].str[0:4]
-
+# Return the first values of the 'YEARBUILT' column inside nyc dataframe
 nyc['YEARBUILT'].head()
 
-# %%
-# Format year as a four digit number and override error by returning NaT (missing value) for any values that do not conform
-nyc['YEARBUILT'] = pd.to_datetime(nyc['YEARBUILT'], format = '%Y', errors='coerce')
-
 # %%
 # Drop null values from column 'SALEPRICE' and 'GROSSSQUAREFEET' inside the nyc dataframe 
 nyc.dropna(subset = ['SALEPRICE'], inplace = True)
@@ -415,7 +403,7 @@ nyc['TAXCLASSATTIMEOFSALE'].value_counts()
 
 # %%
 # only keep residential sales
-nyc_subset = nyc[(nyc['TAXCLASSATTIMEOFSALE'] =='1.0') | (nyc['TAXCLASSATTIMEOFSALE'] =='2.0')]
+nyc_subset = nyc[(nyc['TAXCLASSATTIMEOFSALE'] == 1) | (nyc['TAXCLASSATTIMEOFSALE'] == 2)]
 
 # %%
 # Return a series containing counts of unique values from column 'TAXCLASSATTIMEOFSALE' in nyc dataframe 
@@ -433,7 +421,7 @@ nyc_subset = nyc_subset[nyc_subset['BUILDINGCLASSCATEGORY'] != '05 TAX CLASS 1 V
 # 1. Your borough data is currently coded with numbers. Replace the numbers with the name of each borough. 
 
 # %%
-nyc_subset = nyc_subset.replace({'BOROUGH':{'1.0':'Manhattan', '3.0':'Brooklyn', '4.0':'Queens'}})
+nyc_subset = nyc_subset.assign(BOROUGH = borough_names(nyc_subset['BOROUGH']))
 nyc_subset
 
 # %% [markdown]
@@ -155,8 +155,17 @@ pd.options.display.float_format = '{:,.2f}'.format
 #import midter dataset files
 dataset = files.upload()
 
-#first year public dataset
-df_public = pd.read_excel('2013-14-corporate-report-of-entity-tax-information.xlsx', sheet_name = 'December')
+from ato_tax.cache import SheetCache
+from ato_tax.loader import read_sheets, load_income_years
+
+# parsed sheets are cached in .ato_cache so later runs skip the excel parsing
+cache = SheetCache('.ato_cache')
+
+#first year public ('December') and private ('March') datasets, parsed in parallel
+#every firm is read in: the $200M panel and the threshold sweep of part 2 (at the end) start from the same rows
+df_public, df_private = read_sheets([('2013-14-corporate-report-of-entity-tax-information.xlsx', 'December'),
+                                     ('2013-14-corporate-report-of-entity-tax-information.xlsx', 'March')],
+                                    cache = cache)
 df_public
 
 #drop ABN null value
@@ -164,23 +173,27 @@ df_public
 df_public = df_public.dropna(subset=['ABN'])
 df_public
 
+# Do not keep any firms that are missing their Australian Business Number (ABN)
+df_public.dropna(inplace = True)
+df_public
+
+# every firm of the first year, before the $200M filter
+from ato_tax.loader import stack_base_year
+
+all_firms = stack_base_year(df_public, df_private)
+
 #filter each year of data to only include firms with $200M or more in total income
 
 df_public = df_public[df_public['Total income $'] >= 200000000]
 df_public.head(20)
 
 #first year private dataset
-df_private = pd.read_excel('2013-14-corporate-report-of-entity-tax-information.xlsx', sheet_name = 'March')
 df_private
 
 #filter each year of data to only include firms with $200M or more in total income
 df_private = df_private[df_private['Total income $'] >= 200000000]
 df_private.head(20)
 
-# Do not keep any firms that are missing their Australian Business Number (ABN)
-df_public.dropna(inplace = True)
-df_public
-
 frames = [df_public, df_private]
 
 df_public_private = pd.concat(frames, keys = ['public', 'private']).reset_index().drop('level_1', axis=1).rename(columns={'level_0':'Public/Private'})
@@ -222,33 +235,16 @@ files = ['2014-15-corporate-report-of-entity-tax-information.xlsx', \
        '2019-20-corporate-report-of-entity-tax-information.xlsx']
 
 
-# Total Compilation Variable (empty list to append cleaned dataset)
-dict_df = {}
-
-for file in files:
-  # DATA LOADING (2014-15, 2015-16)
-  if (file[0:7] == '2014-15' or file[0:7] == '2015-16'):
-    year = file[0:7]
-
-    # Load df from a sheet "(year)"
-    df = pd.read_excel(file, sheet_name = year)
-    
-    # Create a new column "Income year" to df
-    # Use forloop to insert file of "(year)" to "Income year" column
-    df['Income year'] = year
-
-  # DATA LOADING (2016-17 ... 2019-20)                
-  else:
-    # Load df from a sheet "Income tax details" 
-    df = pd.read_excel(file, sheet_name = 1)
-
-  # Final Merge: add "df" to "dict_df" (save each cleaned dataframe by appending to empty list)
-  year = file[2:4]
-  df = df[df['Total income $'] >= 200000000].reset_index(drop = True)
-  df.dropna(subset=['ABN'], inplace =True)
-  df = df.rename(columns={'Total income $' : 'Total income_' + year, 'Taxable income $' : 'Taxable income_' + year, 'Tax payable $' : 'Tax payable_' + year})
-  dict_df[file[0:7]] = df
-  
+# Total Compilation Variable (cleaned dataset of each year, keyed by income year)
+# Each workbook is loaded and cleaned in its own worker process:
+#   - 2014-15, 2015-16 are read from the sheet "(year)" and get an "Income year" column
+#   - 2016-17 ... 2019-20 are read from the sheet "Income tax details"
+#   - only firms with an ABN, filed on time, are kept (the rows are filtered while they
+#     are read from the sheet), the $200M filter comes after the names are matched below
+#   - the tax columns are renamed with the year ('Total income_14')
+#   - the rows without an ABN come back separately from the same pass over the sheet
+# max_workers sets the number of worker processes (defaults to the number of CPUs)
+dict_df, without_abn = load_income_years(files, max_workers = None, cache = cache, threshold = None, without_abn = True)
 
 dict_df['2014-15']
 
@@ -257,10 +253,31 @@ dict_df['2014-15']
 **2.** For dataframes that disclose more than one year of data, filter out any late filings. i.e. Only keep data related to 2013-2014 that was disclosed in December of 2015 and same idea for all other years. Any data that is filed later will engender a later change in behavior, if any, which would make it harder to measure.
 """
 
+# late filings are already skipped by the loader, this only drops the column
 for year in dict_df.keys() : 
   dict_df[year] = dict_df[year][dict_df[year]['Income year'] == year]
   dict_df[year] = dict_df[year].drop('Income year', axis = 1)
 
+# rows without an ABN are matched to the base year firms on their (normalized) names,
+# matches with a confidence of 0.9 or more take the firm's Name and ABN unless the year
+# already has that ABN or several rows matched it (the merge below would mix them up)
+from ato_tax.resolve import NameIndex, resolve_income_year
+
+firm_names = NameIndex.from_panel(all_firms)
+resolution = {}
+for year, unidentified in without_abn.items():
+  dict_df[year], resolution[year] = resolve_income_year(dict_df[year], unidentified, firm_names, year)
+
+# rows without an ABN in each year, by what became of them
+pd.DataFrame(resolution).T
+
+# every year in full is kept for the threshold sweep, the panel only keeps the firms
+# with $200M or more in total income
+from ato_tax.loader import above_threshold
+
+all_years = dict_df
+dict_df = {year: above_threshold(df) for year, df in all_years.items()}
+
 """**3.** Perform a wide merge in which each firm has only one row of data and subsequent years of information are presented in additional columns."""
 
 df_public_private = df_public_private.rename(columns={'Total income $' : 'Total income_' + '13',
@@ -269,9 +286,10 @@ df_public_private = df_public_private.rename(columns={'Total income $' : 'Total
 df_public_private = df_public_private.drop('Income Year', axis = 1)
 df_public_private.head()
 
-df_merge = df_public_private
-for year in dict_df.keys() : 
-  df_merge = pd.merge(df_merge, dict_df[year], how = 'left', on = ['Name', 'ABN'])
+from ato_tax.merge import wide_merge
+
+# left merge every year onto the first year on Name and ABN, all years in one pass
+df_merge = wide_merge(df_public_private, dict_df.values())
 
 df_merge
 
@@ -286,15 +304,12 @@ df_merge
 As a check point, your final DataFrame should have data relating to **154 unique private firms and 643 unique public firms**.
 """
 
-# Wide to extra long format
-df_melt = pd.melt(df_merge, id_vars = ['Public/Private', 'Name', 'ABN'])
-# Create column with time period
-df_melt[['Metric', 'Income Year']] = df_melt['variable'].str.split('_', expand=True)
-df_melt.drop('variable', axis = 1, inplace = True)
-df_melt['Income Year'] = '20' + df_melt['Income Year']
+from ato_tax.panel import build_panel
 
-# Reformat the data
-df_reshaped = df_melt.pivot_table(index = ['Name', 'ABN', 'Public/Private', 'Income Year'], columns = 'Metric', values = 'value').reset_index()
+# Stack the seven years directly into firm-year rows (same result as melting df_merge
+# and pivoting it back): each year gets an "Income Year" column, and only the firms
+# of the 2013-14 base year are kept, with their Public/Private status
+df_reshaped = build_panel(df_public_private, dict_df.values())
 
 df_reshaped
 
@@ -313,10 +328,14 @@ df_reshaped
 
 """**6b.**	Make sure all datatypes are appropriate. If not, adjust accordingly."""
 
+from ato_tax.schema import enforce_panel_schema, memory_report
+
+# categorical Name and Public/Private, int64 ABN, int16 Income Year, float64 money columns
+df_reshaped = enforce_panel_schema(df_reshaped)
 df_reshaped.dtypes
 
-df_reshaped['ABN'] = df_reshaped['ABN'].astype('int') 
-df_reshaped['Income Year'] = df_reshaped['Income Year'].astype('int')
+# memory used by each column with python strings and a float ABN (before) and with the schema (after)
+memory_report(df_reshaped)
 
 """**6c.**	Take some time to understand the data you are working with. Are there any biases, errors or incomplete items that concern you? No need to explicitly answer that question but keep it in mind when performing the rest of your analysis. You can learn more about the data [here](https://www.ato.gov.au/Business/Large-business/In-detail/Tax-transparency/Corporate-tax-transparency-report-for-the-2014-15-income-year/)."""
 
@@ -324,12 +343,28 @@ df_reshaped.info()
 
 """**Export your data as a pickle file so that you can easily import it into part 2 of this case.**"""
 
-# export cleaned data as a pickle file
+# export cleaned data as a columnar panel store (one Arrow file per income year)
+from ato_tax.store import write_panel
 
 # replace final with name of your dataframe
 final = df_reshaped
 
-# 'part1.p' is the name of the file that is exported
-final.to_pickle('part1.p')
+# 'part1.panel' is the name of the directory that is exported
+# the workbooks are recorded in its manifest; a new income year can later be added with
+#   python -m ato_tax.store part1.panel 2020-21-corporate-report-of-entity-tax-information.xlsx
+write_panel(final, 'part1.panel', ['2013-14-corporate-report-of-entity-tax-information.xlsx'] + files)
+
+# the same panel without the $200M cutoff, for the threshold sweep in part 2, built from
+# the rows read above before they were filtered
+from ato_tax.summary import yearly_summary
+from ato_tax.sweep import threshold_sweep, unfiltered_panel
+
+everything = unfiltered_panel(all_firms, all_years.values())
+write_panel(everything, 'part1.all.panel')
+
+# at $200M the sweep has to give back the yearly totals of the panel
+at_cutoff = threshold_sweep(everything, [200000000]).rename(columns = {'Income Year': 'years'})
+ato = yearly_summary(final, years = sorted(everything['Income Year'].unique()))
+pd.testing.assert_frame_equal(at_cutoff[ato.columns], ato, check_dtype = False)
 
 """At a minimum, you must turn in your 3 questions before you can receive access to part 2 so that your questions are not influenced by the questions you will answer in Part 2. I am giving you leniency in how to manage your time but I highly recommend having your questions done and MOST of the cleaning done before class on 10/17. The whole case is due a week later on 10/24."""
\ No newline at end of file
@@ -58,8 +58,12 @@ import pandas as pd
 import numpy as np
 pd.options.display.float_format = '{:,.2f}'.format
 
-# reimport the pickle file
-final = pd.read_pickle('part1.p')
+# reopen the panel store exported in part 1 (memory mapped, columns are read on first use)
+from ato_tax.store import PanelStore
+panel = PanelStore('part1.panel')
+
+# firm-year rows, each firm's years in order
+final = panel.to_pandas().sort_values(['Name', 'ABN', 'Public/Private', 'Income Year'], ignore_index = True)
 final
 
 """## Calculate your Results - #1
@@ -67,85 +71,42 @@ final
 **a.**	How much total tax did the ATO collect from our sample firms in each year?
 """
 
-Tax_payable_2013 = final.loc[final['Income Year'] == 2013, 'Tax payable'].sum()
-Tax_payable_2014 = final.loc[final['Income Year'] == 2014, 'Tax payable'].sum()
-Tax_payable_2015 = final.loc[final['Income Year'] == 2015, 'Tax payable'].sum()
-Tax_payable_2016 = final.loc[final['Income Year'] == 2016, 'Tax payable'].sum()
-Tax_payable_2017 = final.loc[final['Income Year'] == 2017, 'Tax payable'].sum()
-Tax_payable_2018 = final.loc[final['Income Year'] == 2018, 'Tax payable'].sum()
-Tax_payable_2019 = final.loc[final['Income Year'] == 2019, 'Tax payable'].sum()
+from ato_tax.summary import yearly_summary
 
-years = [2013, 2014, 2015, 2016, 2017, 2018, 2019]
-tax_payable = [Tax_payable_2013, Tax_payable_2014, Tax_payable_2015, Tax_payable_2016, Tax_payable_2017, Tax_payable_2018, Tax_payable_2019]
-ato = pd.DataFrame(years, columns = ['years'])
-ato['tax_payable'] = tax_payable
-ato
+# totals, tax as a % of total income and their year to year changes, all in one pass over final
+ato = yearly_summary(final, years = [2013, 2014, 2015, 2016, 2017, 2018, 2019])
+ato[['years', 'tax_payable']]
 
 """**b.** Turn your result from (a) into a new dataframe. Calculate the percentage change in total tax collected from year to year for each year in our sample and save the calculation as a new column in your new dataframe."""
 
-percent_change_14 = (Tax_payable_2014 - Tax_payable_2013)/ Tax_payable_2013 *100
-percent_change_15 = (Tax_payable_2015 - Tax_payable_2014)/ Tax_payable_2014 *100
-percent_change_16 = (Tax_payable_2016 - Tax_payable_2015)/ Tax_payable_2015 *100
-percent_change_17 = (Tax_payable_2017 - Tax_payable_2016)/ Tax_payable_2016 *100
-percent_change_18 = (Tax_payable_2018 - Tax_payable_2017)/ Tax_payable_2017 *100
-percent_change_19 = (Tax_payable_2019 - Tax_payable_2018)/ Tax_payable_2018 *100
-
-percent_change = [0, percent_change_14, percent_change_15, percent_change_16, percent_change_17, percent_change_18, percent_change_19]
-ato['percent_change'] = percent_change
-ato
+ato[['years', 'tax_payable', 'percent_change']]
 
 """**c.**	It is possible that any change documented above is related to a general change in the economy. To provide some evidence, calculate the Total income (revenue) reported by our sample firms in each year and add it as a column to the dataframe you created in (b) above."""
 
-Total_income_2013 = final.loc[final['Income Year'] == 2013, 'Total income'].sum()
-Total_income_2014 = final.loc[final['Income Year'] == 2014, 'Total income'].sum()
-Total_income_2015 = final.loc[final['Income Year'] == 2015, 'Total income'].sum()
-Total_income_2016 = final.loc[final['Income Year'] == 2016, 'Total income'].sum()
-Total_income_2017 = final.loc[final['Income Year'] == 2017, 'Total income'].sum()
-Total_income_2018 = final.loc[final['Income Year'] == 2018, 'Total income'].sum()
-Total_income_2019 = final.loc[final['Income Year'] == 2019, 'Total income'].sum()
-
-Total_income = [Total_income_2013, Total_income_2014, Total_income_2015, Total_income_2016, Total_income_2017, Total_income_2018, Total_income_2019]
-ato['Total_income'] = Total_income
-ato
+ato[['years', 'tax_payable', 'percent_change', 'Total_income']]
 
 """There is indeed a direct relationship between Total Income and Tax Payable. The correlation is evident, as the amount of the total income has the same tendency as that of the tax payable, which can be attributed to overall changes in the economy.
 
 **d.** Calculate the percentage of total income reported in each year that is paid to the ATO in each year. Add your result to the dataframe created in (b) above.
 """
 
-Tax_payable_2013 = final.loc[final['Income Year'] == 2013, 'Tax payable'].sum()
-Tax_payable_2014 = final.loc[final['Income Year'] == 2014, 'Tax payable'].sum()
-Tax_payable_2015 = final.loc[final['Income Year'] == 2015, 'Tax payable'].sum()
-Tax_payable_2016 = final.loc[final['Income Year'] == 2016, 'Tax payable'].sum()
-Tax_payable_2017 = final.loc[final['Income Year'] == 2017, 'Tax payable'].sum()
-Tax_payable_2018 = final.loc[final['Income Year'] == 2018, 'Tax payable'].sum()
-Tax_payable_2019 = final.loc[final['Income Year'] == 2019, 'Tax payable'].sum()
-
-percent_tax_payable_2013 = (Tax_payable_2013/Total_income_2013)*100
-percent_tax_payable_2014 = (Tax_payable_2014/Total_income_2014)*100
-percent_tax_payable_2015 = (Tax_payable_2015/Total_income_2015)*100
-percent_tax_payable_2016 = (Tax_payable_2016/Total_income_2016)*100
-percent_tax_payable_2017 = (Tax_payable_2017/Total_income_2017)*100
-percent_tax_payable_2018 = (Tax_payable_2018/Total_income_2018)*100
-percent_tax_payable_2019 = (Tax_payable_2013/Total_income_2019)*100
-
-percent_tax_payable = [percent_tax_payable_2013,percent_tax_payable_2014,percent_tax_payable_2015,percent_tax_payable_2016,percent_tax_payable_2017,percent_tax_payable_2018,percent_tax_payable_2019]
-ato['percent_tax_payable'] = percent_tax_payable
-ato
+ato[['years', 'tax_payable', 'percent_change', 'Total_income', 'percent_tax_payable']]
 
 """**e.** Lastly, calculate the percentage change from year to year for the variable you calculated in (d). Add your result to the same dataframe."""
 
-percent_change_tax_payable_14 = ((percent_tax_payable_2014 - percent_tax_payable_2013)/percent_tax_payable_2013) *100
-percent_change_tax_payable_15 = ((percent_tax_payable_2015 - percent_tax_payable_2014)/percent_tax_payable_2014) *100
-percent_change_tax_payable_16 = ((percent_tax_payable_2016 - percent_tax_payable_2015)/percent_tax_payable_2015) *100
-percent_change_tax_payable_17 = ((percent_tax_payable_2017 - percent_tax_payable_2016)/percent_tax_payable_2016) *100
-percent_change_tax_payable_18 = ((percent_tax_payable_2018 - percent_tax_payable_2017)/percent_tax_payable_2017) *100
-percent_change_tax_payable_19 = ((percent_tax_payable_2019 - percent_tax_payable_2018)/percent_tax_payable_2018) *100
-
-percent_change_tax_payable = [0,percent_change_tax_payable_14, percent_change_tax_payable_15, percent_change_tax_payable_16, percent_change_tax_payable_17, percent_change_tax_payable_18, percent_change_tax_payable_19]
-ato['Percent_change_tax_payable'] = percent_change_tax_payable
 ato
 
+from ato_tax.sweep import threshold_sweep
+
+# how much do these results depend on the $200M cutoff of part 1?
+# 'part1.all.panel' holds every firm of the workbooks; a firm-year is kept at a threshold when
+# both its base year and its own total income reach it (as the $200M filter did)
+everything = PanelStore('part1.all.panel').to_pandas()
+sweep = threshold_sweep(everything, thresholds = range(100000000, 505000000, 5000000))
+sweep[sweep['threshold'].isin([100000000, 200000000, 250000000, 500000000])]
+
+sweep.pivot(index = 'Income Year', columns = 'threshold', values = 'percent_tax_payable')
+
 """**f.** Interpret your results. Specifically:
 
 - Describe the pattern you notice
@@ -176,42 +137,20 @@ The Australian Government passed a policy in December 2015 to promote transparen
 - Absolute change in second effective tax rate calculated (tax paid/total income) from year to year
 """
 
-#Taxes Paid as a Percentage of Taxable Income
-final['Taxes as % of Taxable Income'] = final['Tax payable']/final['Taxable income'] *100
-final['Taxes as % of Taxable Income']
-
-#Taxes Paid as a Percentage of Total Income
-final['Taxes as % of Total Income'] = final['Tax payable']/final['Total income'] *100
-final['Taxes as % of Total Income']
+from ato_tax.growth import growth_metrics
 
-#Percentage change in Taxable income from year to year
-final['% change in taxable income']=final['Taxable income'].pct_change() * 100
-final.loc[final['Income Year'] == 2013, '% change in taxable income'] = np.nan
-final.head()
+# all the per-firm metrics in one vectorized pass; the changes are only taken between
+# consecutive income years of the same firm (ABN), never across two firms
+final = final.join(growth_metrics(final))
 
-#Percentage change in Total income from year to year
-final['% change in total income']=final['Total income'].pct_change() * 100
-final.loc[final['Income Year'] == 2013, '% change in taxable income'] = np.nan
-final.head()
+#Taxes Paid as a Percentage of Taxable Income, Taxes Paid as a Percentage of Total Income
+final[['Taxes as % of Taxable Income', 'Taxes as % of Total Income']]
 
-#Percentage change in Tax payable from year to year
-final['% change in tax payable']=final['Tax payable'].pct_change() * 100
-final.loc[final['Income Year'] == 2013, '% change in taxable income'] = np.nan
-final.head()
+#Percentage change in Taxable income, Total income and Tax payable from year to year
+final[['Name', 'Income Year', '% change in taxable income', '% change in total income', '% change in tax payable']].head()
 
-#Absolute change in first effective tax rate calculated (tax paid/taxable income) from year to year
-
-final['ETR'] = final['Tax payable']/final['Taxable income']
-final['ETR Change'] = final['ETR'].diff()
-
-final
-
-#Absolute change in second effective tax rate calculated (tax paid/total income) from year to year
-
-final['ETR2'] = final['Tax payable']/final['Total income']
-final['ETR2 Change'] = final['ETR2'].diff()
-
-final
+#Absolute change in first (tax paid/taxable income) and second (tax paid/total income) effective tax rate from year to year
+final[['Name', 'Income Year', 'ETR', 'ETR Change', 'ETR2', 'ETR2 Change']]
 
 """**b.** Years with zero Taxable income and/or zero Tax payable make it difficult to calculate a percentage change as we cannot divide by zero.
    - If a firm had a Taxable income of 0 and now has a positive Taxable income, python will report a percentage change of infinity, 'inf'. The infinity values prevent python from calculating any summary statistics such as an average or a standard deviation. Create a new column that converts any infinity values into missing values. 
@@ -222,13 +161,18 @@ final
 
 """
 
-final.loc[final['% change in taxable income'] == float('inf'), '% change in taxable income'] = np.nan
-final.loc[final['Taxable income'] == 0, '% change in taxable income'] = 0
-final
+# growth_metrics already handles these cases for Taxable income and Tax payable (and Total income):
+#   - a change from 0 to a positive value (infinite) is a missing value
+#   - no income / no tax in both years is a change of 0
+final[['% change in taxable income', '% change in tax payable']].describe()
 
-final.loc[final['% change in tax payable'] == float('inf'), '% change in tax payable'] = np.nan
-final.loc[final['Tax payable'] == 0, '% change in tax payable'] = 0
-final
+from ato_tax.rules import screen, rule_counts
+
+# rather than hiding them, list the firm-years whose line items do not add up
+# (e.g. Taxable income above Total income, or Tax payable far from 30% of Taxable income)
+exceptions = screen(final)
+exceptions.to_csv('exceptions.csv', index = False)
+rule_counts(exceptions)
 
 """**c.** Describe the distributions of the change in effective tax rates and the percentage change in Taxable income, Total income, and Tax payable (i.e. calculate the mean, median, min, max) separately for public and private firms in each year. You may want to transpose the data to make it easier to read."""
 
@@ -274,248 +218,38 @@ S2019PublicTaxInc
 Note- infinity values will not affect these calculations.
 """
 
-#Public - Total Income
-final_public = final.loc[final['Public/Private'] == 'public']
+from ato_tax.cube import roll_up, share_cube, share_table
 
-pub_totinc = []
-pub_totinc_2014 = final_public.loc[final_public['Income Year'] == 2014]
-firms_totinc_2014 = len(pub_totinc_2014[pub_totinc_2014['% change in total income'] > 0])/len(pub_totinc_2014['% change in total income']) * 100
-firms_totinc_2014
-pub_totinc.append(firms_totinc_2014)
-
-pub_totinc_2015 = final_public.loc[final_public['Income Year'] == 2015]
-firms_totinc_2015 = len(pub_totinc_2015[pub_totinc_2015['% change in total income'] > 0])/len(pub_totinc_2015['% change in total income']) * 100
-firms_totinc_2015
-pub_totinc.append(firms_totinc_2015)
-
-pub_totinc_2016 = final_public.loc[final_public['Income Year'] == 2016]
-firms_totinc_2016 = len(pub_totinc_2016[pub_totinc_2016['% change in total income'] > 0])/len(pub_totinc_2016['% change in total income']) * 100
-firms_totinc_2016
-pub_totinc.append(firms_totinc_2016)
-
-pub_totinc_2017 = final_public.loc[final_public['Income Year'] == 2017]
-firms_totinc_2017 = len(pub_totinc_2017[pub_totinc_2017['% change in total income'] > 0])/len(pub_totinc_2017['% change in total income']) * 100
-firms_totinc_2017
-pub_totinc.append(firms_totinc_2017)
-
-pub_totinc_2018 = final_public.loc[final_public['Income Year'] == 2018]
-firms_totinc_2018 = len(pub_totinc_2018[pub_totinc_2018['% change in total income'] > 0])/len(pub_totinc_2018['% change in total income']) * 100
-firms_totinc_2018
-pub_totinc.append(firms_totinc_2018)
-
-pub_totinc_2019 = final_public.loc[final_public['Income Year'] == 2019]
-firms_totinc_2019 = len(pub_totinc_2019[pub_totinc_2019['% change in total income'] > 0])/len(pub_totinc_2019['% change in total income']) * 100
-firms_totinc_2019
-pub_totinc.append(firms_totinc_2019)
-
-pub_totinc
-
-#Private - Total Income
-final_private = final.loc[final['Public/Private'] == 'private']
-
-priv_totinc = []
-priv_totinc_2014 = final_private.loc[final_private['Income Year'] == 2014]
-priv_totinc_2014 = len(priv_totinc_2014[priv_totinc_2014['% change in total income'] > 0])/len(priv_totinc_2014['% change in total income']) * 100
-priv_totinc_2014
-priv_totinc.append(priv_totinc_2014)
-
-priv_totinc_2015 = final_private.loc[final_private['Income Year'] == 2015]
-priv_totinc_2015 = len(priv_totinc_2015[priv_totinc_2015['% change in total income'] > 0])/len(priv_totinc_2015['% change in total income']) * 100
-priv_totinc_2015
-priv_totinc.append(priv_totinc_2015)
-
-priv_totinc_2016 = final_private.loc[final_private['Income Year'] == 2016]
-priv_totinc_2016 = len(priv_totinc_2016[priv_totinc_2016['% change in total income'] > 0])/len(priv_totinc_2016['% change in total income']) * 100
-priv_totinc_2016
-priv_totinc.append(priv_totinc_2016)
-
-priv_totinc_2017 = final_private.loc[final_private['Income Year'] == 2017]
-priv_totinc_2017 = len(priv_totinc_2017[priv_totinc_2017['% change in total income'] > 0])/len(priv_totinc_2017['% change in total income']) * 100
-priv_totinc_2017
-priv_totinc.append(priv_totinc_2017)
-
-priv_totinc_2018 = final_private.loc[final_private['Income Year'] == 2018]
-priv_totinc_2018 = len(priv_totinc_2018[priv_totinc_2018['% change in total income'] > 0])/len(priv_totinc_2018['% change in total income']) * 100
-priv_totinc_2018
-priv_totinc.append(priv_totinc_2018)
-
-priv_totinc_2019 = final_private.loc[final_private['Income Year'] == 2019]
-priv_totinc_2019 = len(priv_totinc_2019[priv_totinc_2019['% change in total income'] > 0])/len(priv_totinc_2019['% change in total income']) * 100
-priv_totinc_2019
-priv_totinc.append(priv_totinc_2019)
-
-priv_totinc
-
-#Public - Taxable Income
-
-pub_taxinc = []
-pub_taxinc_2014 = final_public.loc[final_public['Income Year'] == 2014]
-firms_taxinc_2014 = len(pub_taxinc_2014[pub_taxinc_2014['% change in taxable income'] > 0])/len(pub_taxinc_2014['% change in taxable income']) * 100
-firms_taxinc_2014
-pub_taxinc.append(firms_taxinc_2014)
-
-pub_taxinc_2015 = final_public.loc[final_public['Income Year'] == 2015]
-firms_taxinc_2015 = len(pub_taxinc_2015[pub_taxinc_2015['% change in taxable income'] > 0])/len(pub_taxinc_2015['% change in taxable income']) * 100
-firms_taxinc_2015
-pub_taxinc.append(firms_taxinc_2015)
-
-pub_taxinc_2015 = final_public.loc[final_public['Income Year'] == 2015]
-firms_taxinc_2015 = len(pub_taxinc_2015[pub_taxinc_2015['% change in taxable income'] > 0])/len(pub_taxinc_2015['% change in taxable income']) * 100
-firms_taxinc_2015
-pub_taxinc.append(firms_taxinc_2015)
-
-pub_taxinc_2016 = final_public.loc[final_public['Income Year'] == 2016]
-firms_taxinc_2016 = len(pub_taxinc_2016[pub_taxinc_2016['% change in taxable income'] > 0])/len(pub_taxinc_2016['% change in taxable income']) * 100
-firms_taxinc_2016
-pub_taxinc.append(firms_taxinc_2016)
-
-pub_taxinc_2017 = final_public.loc[final_public['Income Year'] == 2017]
-firms_taxinc_2017 = len(pub_taxinc_2017[pub_taxinc_2017['% change in taxable income'] > 0])/len(pub_taxinc_2017['% change in taxable income']) * 100
-firms_taxinc_2017
-pub_taxinc.append(firms_taxinc_2017)
-
-pub_taxinc_2018 = final_public.loc[final_public['Income Year'] == 2018]
-firms_taxinc_2018 = len(pub_taxinc_2018[pub_taxinc_2018['% change in taxable income'] > 0])/len(pub_taxinc_2018['% change in taxable income']) * 100
-firms_taxinc_2018
-pub_taxinc.append(firms_taxinc_2018)
-
-pub_taxinc_2019 = final_public.loc[final_public['Income Year'] == 2019]
-firms_taxinc_2019 = len(pub_taxinc_2019[pub_taxinc_2019['% change in taxable income'] > 0])/len(pub_taxinc_2019['% change in taxable income']) * 100
-firms_taxinc_2019
-pub_taxinc.append(firms_taxinc_2019)
-
-pub_taxinc
-
-#Private - Taxable Income
-
-final_private = final.loc[final['Public/Private'] == 'private']
-
-priv_taxinc = []
-priv_taxinc_2014 = final_private.loc[final_private['Income Year'] == 2014]
-priv_taxinc_2014 = len(priv_taxinc_2014[priv_taxinc_2014['% change in taxable income'] > 0])/len(priv_taxinc_2014['% change in taxable income']) * 100
-priv_taxinc_2014
-priv_taxinc.append(priv_taxinc_2014)
-
-priv_taxinc_2015 = final_private.loc[final_private['Income Year'] == 2015]
-priv_taxinc_2015 = len(priv_taxinc_2015[priv_taxinc_2015['% change in taxable income'] > 0])/len(priv_taxinc_2015['% change in taxable income']) * 100
-priv_taxinc_2015
-priv_taxinc.append(priv_taxinc_2015)
-
-priv_taxinc_2016 = final_private.loc[final_private['Income Year'] == 2016]
-priv_taxinc_2016 = len(priv_taxinc_2016[priv_taxinc_2016['% change in taxable income'] > 0])/len(priv_taxinc_2016['% change in taxable income']) * 100
-priv_taxinc_2016
-priv_taxinc.append(priv_taxinc_2016)
-
-priv_taxinc_2017 = final_private.loc[final_private['Income Year'] == 2017]
-priv_taxinc_2017 = len(priv_taxinc_2017[priv_taxinc_2017['% change in taxable income'] > 0])/len(priv_taxinc_2017['% change in taxable income']) * 100
-priv_taxinc_2017
-priv_taxinc.append(priv_taxinc_2017)
-
-priv_taxinc_2018 = final_private.loc[final_private['Income Year'] == 2018]
-priv_taxinc_2018 = len(priv_taxinc_2018[priv_taxinc_2018['% change in taxable income'] > 0])/len(priv_taxinc_2018['% change in taxable income']) * 100
-priv_taxinc_2018
-priv_taxinc.append(priv_taxinc_2018)
-
-priv_taxinc_2019 = final_private.loc[final_private['Income Year'] == 2019]
-priv_taxinc_2019 = len(priv_taxinc_2019[priv_taxinc_2019['% change in taxable income'] > 0])/len(priv_taxinc_2019['% change in taxable income']) * 100
-priv_taxinc_2019
-priv_taxinc.append(priv_taxinc_2019)
-
-priv_taxinc
-
-#Public - Tax Payable
-
-pub_taxpay = []
-pub_taxpay_2014 = final_public.loc[final_public['Income Year'] == 2014]
-pub_taxpay_2014 = len(pub_taxpay_2014[pub_taxpay_2014['% change in tax payable'] > 0])/len(pub_taxpay_2014['% change in tax payable']) * 100
-pub_taxpay_2014
-pub_taxpay.append(pub_taxpay_2014)
-
-pub_taxpay_2015 = final_public.loc[final_public['Income Year'] == 2015]
-pub_taxpay_2015 = len(pub_taxpay_2015[pub_taxpay_2015['% change in tax payable'] > 0])/len(pub_taxpay_2015['% change in tax payable']) * 100
-pub_taxpay_2015
-pub_taxpay.append(pub_taxpay_2015)
-
-pub_taxpay_2016 = final_public.loc[final_public['Income Year'] == 2016]
-pub_taxpay_2016 = len(pub_taxpay_2016[pub_taxpay_2016['% change in tax payable'] > 0])/len(pub_taxpay_2016['% change in tax payable']) * 100
-pub_taxpay_2016
-pub_taxpay.append(pub_taxpay_2016)
-
-pub_taxpay_2017 = final_public.loc[final_public['Income Year'] == 2017]
-pub_taxpay_2017 = len(pub_taxpay_2017[pub_taxpay_2017['% change in tax payable'] > 0])/len(pub_taxpay_2017['% change in tax payable']) * 100
-pub_taxpay_2017
-pub_taxpay.append(pub_taxpay_2017)
-
-pub_taxpay_2018 = final_public.loc[final_public['Income Year'] == 2018]
-pub_taxpay_2018 = len(pub_taxpay_2018[pub_taxpay_2018['% change in tax payable'] > 0])/len(pub_taxpay_2018['% change in tax payable']) * 100
-pub_taxpay_2018
-pub_taxpay.append(pub_taxpay_2018)
-
-pub_taxpay_2019 = final_public.loc[final_public['Income Year'] == 2019]
-pub_taxpay_2019 = len(pub_taxpay_2019[pub_taxpay_2019['% change in tax payable'] > 0])/len(pub_taxpay_2019['% change in tax payable']) * 100
-pub_taxpay_2019
-pub_taxpay.append(pub_taxpay_2019)
-
-pub_taxpay
-
-#Private - Tax Payable
-
-priv_taxpay = []
-priv_taxpay_2014 = final_private.loc[final_private['Income Year'] == 2014]
-priv_taxpay_2014 = len(priv_taxpay_2014[priv_taxpay_2014['% change in tax payable'] > 0])/len(priv_taxpay_2014['% change in tax payable']) * 100
-priv_taxpay_2014
-priv_taxpay.append(priv_taxpay_2014)
-
-priv_taxpay_2015 = final_private.loc[final_private['Income Year'] == 2015]
-priv_taxpay_2015 = len(priv_taxpay_2015[priv_taxpay_2015['% change in tax payable'] > 0])/len(priv_taxpay_2015['% change in tax payable']) * 100
-priv_taxpay_2015
-priv_taxpay.append(priv_taxpay_2015)
-
-priv_taxpay_2016 = final_private.loc[final_private['Income Year'] == 2016]
-priv_taxpay_2016 = len(priv_taxpay_2016[priv_taxpay_2016['% change in tax payable'] > 0])/len(priv_taxpay_2016['% change in tax payable']) * 100
-priv_taxpay_2016
-priv_taxpay.append(priv_taxpay_2016)
-
-priv_taxpay_2017 = final_private.loc[final_private['Income Year'] == 2017]
-priv_taxpay_2017 = len(priv_taxpay_2017[priv_taxpay_2017['% change in tax payable'] > 0])/len(priv_taxpay_2017['% change in tax payable']) * 100
-priv_taxpay_2017
-priv_taxpay.append(priv_taxpay_2017)
-
-priv_taxpay_2018 = final_private.loc[final_private['Income Year'] == 2018]
-priv_taxpay_2018 = len(priv_taxpay_2018[priv_taxpay_2018['% change in tax payable'] > 0])/len(priv_taxpay_2018['% change in tax payable']) * 100
-priv_taxpay_2018
-priv_taxpay.append(priv_taxpay_2018)
-
-priv_taxpay_2019 = final_private.loc[final_private['Income Year'] == 2019]
-priv_taxpay_2019 = len(priv_taxpay_2019[priv_taxpay_2019['% change in tax payable'] > 0])/len(priv_taxpay_2019['% change in tax payable']) * 100
-priv_taxpay_2019
-priv_taxpay.append(priv_taxpay_2019)
-
-priv_taxpay
-
-years = [2014, 2015, 2016, 2017, 2018, 2019]
-TotincPub = [60.1904761904762, 58.76068376068376, 41.833333333333336,51.493848857644984, 50.950570342205324, 37.13163064833006]
-TaxincPub = [48.952380952380956, 46.794871794871796, 46.794871794871796, 48.604651162790695, 52.81173594132029, 45.40682414698163, 37.735849056603776]
-TaxpayPub = [47.61904761904761, 44.871794871794876, 44.18604651162791, 52.81173594132029, 42.51968503937008,37.46630727762803]
-
-per_change_public = pd.DataFrame(list(zip(years, TotincPub, TaxincPub, TaxpayPub)),
-               columns =['Years/Public', '% Positive Total Income', '% Positive Tax Income', '% Positive Tax Payable'])
-per_change_public
+# % of firms meeting each condition for every (Public/Private, Income Year) cell, in one grouped pass;
+# #3 reuses the same cube
+cube = share_cube(final)
+changes = cube[cube['Income Year'] > 2013]
 
-years = [2014, 2015, 2016, 2017, 2018, 2019]
-TotincPriv = [65.06550218340611, 65.96858638743456, 61.1764705882353, 70.625, 64.82758620689654,55.79710144927537]
-TaxincPriv = [46.724890829694324, 37.696335078534034, 44.70588235294118, 41.25, 32.41379310344827, 40.57971014492754]
-TaxpayPriv = [44.10480349344978, 38.7434554973822, 43.529411764705884, 41.875, 28.27586206896552, 40.57971014492754]
+growth = ['% Positive Total Income', '% Positive Taxable Income', '% Positive Tax Payable']
+per_change_public = share_table(changes, **{'Public/Private': 'public'})[growth]
+per_change_public
 
-per_change_private = pd.DataFrame(list(zip(years, TotincPriv, TaxincPriv, TaxpayPriv)),
-               columns =['Years/Private', '% Positive Total Income', '% Positive Tax Income', '% Positive Tax Payable'])
+per_change_private = share_table(changes, **{'Public/Private': 'private'})[growth]
 per_change_private
 
 """**e.** Which firm had the largest percentage increase in Total income? Did the firm have a proportionate increase in Taxable income and Taxes Paid?"""
 
-final1 = final
-final1.drop(final1[final1['Income Year'] == 2013].index, inplace = True)
-final1.sort_values('% change in total income', ascending=False)
+# copy without the base year (so that final itself keeps 2013 for #3)
+final1 = final[final['Income Year'] != 2013]
+
+from ato_tax.ranking import top_movers
+
+# the 10 largest increases in total income of each year and firm type (no full sort of final1)
+top_movers(final1, '% change in total income', n = 10)
+
+# and the 10 largest decreases
+top_movers(final1, '% change in total income', n = 10, largest = False)
+
+# the whole history of one firm (e.g. the top mover above) without scanning the panel:
+# the firm index saved with the panel store in part 1 points at the firm's rows in the year files
+firms = panel.firm_index()
+# (no rows when the name is not in the panel)
+firms.history(panel, name = 'The Hong Kong and Shanghai Banking Corporation Limited')
 
 """**f.** Discuss your results from all of the calculations related to #2 including a written discussion regarding your answers to e. What do you conclude in terms of the effect of the new law based on these results?
 
@@ -555,351 +289,25 @@ The company with highest percent increase in total income was The Hong Kong and
 **c.** Calculate the percentage of firms that pay the full statutory tax rate, 30% in each year (define 30% as equal to or above 29.99%). Further bifurcate the calculations based on each firm's filing status.
 """
 
-no_tax = []
-final_2013 = final.loc[final['Income Year'] == 2013]
-firms_no_tax_2013 = len(final_2013[final_2013['Tax payable'] == 0])/len(final_2013['Tax payable']) * 100
-firms_no_tax_2013
-no_tax.append(firms_no_tax_2013)
-
-final_2014 = final.loc[final['Income Year'] == 2014]
-firms_no_tax_2014 = len(final_2014[final_2014['Tax payable'] == 0])/len(final_2014['Tax payable']) * 100
-firms_no_tax_2014
-no_tax.append(firms_no_tax_2014)
-
-final_2015 = final.loc[final['Income Year'] == 2015]
-firms_no_tax_2015 = len(final_2015[final_2015['Tax payable'] == 0])/len(final_2015['Tax payable']) * 100
-firms_no_tax_2015
-no_tax.append(firms_no_tax_2015)
-
-
-final_2016 = final.loc[final['Income Year'] == 2016]
-firms_no_tax_2016 = len(final_2016[final_2016['Tax payable'] == 0])/len(final_2016['Tax payable']) * 100
-firms_no_tax_2016
-no_tax.append(firms_no_tax_2016)
-
-final_2017 = final.loc[final['Income Year'] == 2017]
-firms_no_tax_2017 = len(final_2017[final_2017['Tax payable'] == 0])/len(final_2017['Tax payable']) * 100
-firms_no_tax_2017
-no_tax.append(firms_no_tax_2017)
-
-final_2018 = final.loc[final['Income Year'] == 2018]
-firms_no_tax_2018 = len(final_2018[final_2018['Tax payable'] == 0])/len(final_2018['Tax payable']) * 100
-firms_no_tax_2018
-no_tax.append(firms_no_tax_2018)
-
-final_2019 = final.loc[final['Income Year'] == 2019]
-firms_no_tax_2019 = len(final_2019[final_2019['Tax payable'] == 0])/len(final_2019['Tax payable']) * 100
-firms_no_tax_2019
-no_tax.append(firms_no_tax_2019)
-
-no_tax
-
-no_tax_public = []
-final_2013 = final_public.loc[final_public['Income Year'] == 2013]
-firms_no_tax_2013 = len(final_2013[final_2013['Tax payable'] == 0])/len(final_2013['Tax payable']) * 100
-firms_no_tax_2013
-no_tax_public.append(firms_no_tax_2013)
-
-final_2014 = final_public.loc[final_public['Income Year'] == 2014]
-firms_no_tax_2014 = len(final_2014[final_2014['Tax payable'] == 0])/len(final_2014['Tax payable']) * 100
-firms_no_tax_2014
-no_tax_public.append(firms_no_tax_2014)
-
-final_2015 = final_public.loc[final_public['Income Year'] == 2015]
-firms_no_tax_2015 = len(final_2015[final_2015['Tax payable'] == 0])/len(final_2015['Tax payable']) * 100
-firms_no_tax_2015
-no_tax_public.append(firms_no_tax_2015)
-
-
-final_2016 = final_public.loc[final_public['Income Year'] == 2016]
-firms_no_tax_2016 = len(final_2016[final_2016['Tax payable'] == 0])/len(final_2016['Tax payable']) * 100
-firms_no_tax_2016
-no_tax_public.append(firms_no_tax_2016)
-
-final_2017 = final_public.loc[final_public['Income Year'] == 2017]
-firms_no_tax_2017 = len(final_2017[final_2017['Tax payable'] == 0])/len(final_2017['Tax payable']) * 100
-firms_no_tax_2017
-no_tax_public.append(firms_no_tax_2017)
-
-final_2018 = final_public.loc[final_public['Income Year'] == 2018]
-firms_no_tax_2018 = len(final_2018[final_2018['Tax payable'] == 0])/len(final_2018['Tax payable']) * 100
-firms_no_tax_2018
-no_tax_public.append(firms_no_tax_2018)
-
-final_2019 = final_public.loc[final_public['Income Year'] == 2019]
-firms_no_tax_2019 = len(final_2019[final_2019['Tax payable'] == 0])/len(final_2019['Tax payable']) * 100
-firms_no_tax_2019
-no_tax_public.append(firms_no_tax_2019)
-
-no_tax_public
-
-no_tax_private = []
-final_2013 = final_private.loc[final_private['Income Year'] == 2013]
-firms_no_tax_2013 = len(final_2013[final_2013['Tax payable'] == 0])/len(final_2013['Tax payable']) * 100
-firms_no_tax_2013
-no_tax_private.append(firms_no_tax_2013)
-
-final_2014 = final_private.loc[final_private['Income Year'] == 2014]
-firms_no_tax_2014 = len(final_2014[final_2014['Tax payable'] == 0])/len(final_2014['Tax payable']) * 100
-firms_no_tax_2014
-no_tax_private.append(firms_no_tax_2014)
-
-final_2015 = final_private.loc[final_private['Income Year'] == 2015]
-firms_no_tax_2015 = len(final_2015[final_2015['Tax payable'] == 0])/len(final_2015['Tax payable']) * 100
-firms_no_tax_2015
-no_tax_private.append(firms_no_tax_2015)
-
-
-final_2016 = final_private.loc[final_private['Income Year'] == 2016]
-firms_no_tax_2016 = len(final_2016[final_2016['Tax payable'] == 0])/len(final_2016['Tax payable']) * 100
-firms_no_tax_2016
-no_tax_private.append(firms_no_tax_2016)
-
-final_2017 = final_private.loc[final_private['Income Year'] == 2017]
-firms_no_tax_2017 = len(final_2017[final_2017['Tax payable'] == 0])/len(final_2017['Tax payable']) * 100
-firms_no_tax_2017
-no_tax_private.append(firms_no_tax_2017)
-
-final_2018 = final_private.loc[final_private['Income Year'] == 2018]
-firms_no_tax_2018 = len(final_2018[final_2018['Tax payable'] == 0])/len(final_2018['Tax payable']) * 100
-firms_no_tax_2018
-no_tax_private.append(firms_no_tax_2018)
-
-final_2019 = final_private.loc[final_private['Income Year'] == 2019]
-firms_no_tax_2019 = len(final_2019[final_2019['Tax payable'] == 0])/len(final_2019['Tax payable']) * 100
-firms_no_tax_2019
-no_tax_private.append(firms_no_tax_2019)
-
-no_tax_private
-
-no_tax_inc = []
-final_2013 = final.loc[final['Income Year'] == 2013]
-firms_no_tax_inc_2013 = len(final_2013[final_2013['Taxable income'] == 0])/len(final_2013['Taxable income']) * 100
-firms_no_tax_inc_2013
-no_tax_inc.append(firms_no_tax_inc_2013)
-
-final_2014 = final.loc[final['Income Year'] == 2014]
-firms_no_tax_inc_2014 = len(final_2014[final_2014['Taxable income'] == 0])/len(final_2014['Taxable income']) * 100
-firms_no_tax_inc_2014
-no_tax_inc.append(firms_no_tax_inc_2014)
-
-final_2015 = final.loc[final['Income Year'] == 2015]
-firms_no_tax_inc_2015 = len(final_2015[final_2015['Taxable income'] == 0])/len(final_2015['Taxable income']) * 100
-firms_no_tax_inc_2015
-no_tax_inc.append(firms_no_tax_inc_2015)
-
-final_2016 = final.loc[final['Income Year'] == 2016]
-firms_no_tax_inc_2016 = len(final_2016[final_2016['Taxable income'] == 0])/len(final_2016['Taxable income']) * 100
-firms_no_tax_inc_2016
-no_tax_inc.append(firms_no_tax_inc_2016)
-
-final_2017 = final.loc[final['Income Year'] == 2017]
-firms_no_tax_inc_2017 = len(final_2017[final_2017['Taxable income'] == 0])/len(final_2017['Taxable income']) * 100
-firms_no_tax_inc_2017
-no_tax_inc.append(firms_no_tax_inc_2017)
-
-final_2018 = final.loc[final['Income Year'] == 2018]
-firms_no_tax_inc_2018 = len(final_2018[final_2018['Taxable income'] == 0])/len(final_2018['Taxable income']) * 100
-firms_no_tax_inc_2018
-no_tax_inc.append(firms_no_tax_inc_2018)
-
-final_2019 = final.loc[final['Income Year'] == 2019]
-firms_no_tax_inc_2019 = len(final_2019[final_2019['Taxable income'] == 0])/len(final_2019['Taxable income']) * 100
-firms_no_tax_inc_2019
-no_tax_inc.append(firms_no_tax_inc_2019)
-
-no_tax_inc
-
-no_tax_public_inc = []
-final_2013 = final_public.loc[final_public['Income Year'] == 2013]
-firms_no_tax_inc_2013 = len(final_2013[final_2013['Taxable income'] == 0])/len(final_2013['Taxable income']) * 100
-firms_no_tax_inc_2013
-no_tax_public_inc.append(firms_no_tax_inc_2013)
-
-final_2014 = final_public.loc[final_public['Income Year'] == 2014]
-firms_no_tax_inc_2014 = len(final_2014[final_2014['Taxable income'] == 0])/len(final_2014['Taxable income']) * 100
-firms_no_tax_inc_2014
-no_tax_public_inc.append(firms_no_tax_inc_2014)
-
-final_2015 = final_public.loc[final_public['Income Year'] == 2015]
-firms_no_tax_inc_2015 = len(final_2015[final_2015['Taxable income'] == 0])/len(final_2015['Taxable income']) * 100
-firms_no_tax_inc_2015
-no_tax_public_inc.append(firms_no_tax_inc_2015)
-
-final_2016 = final_public.loc[final_public['Income Year'] == 2016]
-firms_no_tax_inc_2016 = len(final_2016[final_2016['Taxable income'] == 0])/len(final_2016['Taxable income']) * 100
-firms_no_tax_inc_2016
-no_tax_public_inc.append(firms_no_tax_inc_2016)
-
-final_2017 = final_public.loc[final_public['Income Year'] == 2017]
-firms_no_tax_inc_2017 = len(final_2017[final_2017['Taxable income'] == 0])/len(final_2017['Taxable income']) * 100
-firms_no_tax_inc_2017
-no_tax_public_inc.append(firms_no_tax_inc_2017)
-
-final_2018 = final_public.loc[final_public['Income Year'] == 2018]
-firms_no_tax_inc_2018 = len(final_2018[final_2018['Taxable income'] == 0])/len(final_2018['Taxable income']) * 100
-firms_no_tax_inc_2018
-no_tax_public_inc.append(firms_no_tax_inc_2018)
-
-final_2019 = final_public.loc[final_public['Income Year'] == 2019]
-firms_no_tax_inc_2019 = len(final_2019[final_2019['Taxable income'] == 0])/len(final_2019['Taxable income']) * 100
-firms_no_tax_inc_2019
-
-no_tax_public_inc.append(firms_no_tax_inc_2019)
-
-no_tax_public_inc
-
-no_tax_private_inc = []
-final_2013 = final_private.loc[final_private['Income Year'] == 2013]
-firms_no_tax_inc_2013 = len(final_2013[final_2013['Taxable income'] == 0])/len(final_2013['Taxable income']) * 100
-firms_no_tax_inc_2013
-no_tax_private_inc.append(firms_no_tax_inc_2013)
-
-final_2014 = final_private.loc[final_private['Income Year'] == 2014]
-firms_no_tax_inc_2014 = len(final_2014[final_2014['Taxable income'] == 0])/len(final_2014['Taxable income']) * 100
-firms_no_tax_inc_2014
-no_tax_private_inc.append(firms_no_tax_inc_2014)
-
-final_2015 = final_private.loc[final_private['Income Year'] == 2015]
-firms_no_tax_inc_2015 = len(final_2015[final_2015['Taxable income'] == 0])/len(final_2015['Taxable income']) * 100
-firms_no_tax_inc_2015
-no_tax_private_inc.append(firms_no_tax_inc_2015)
-
-final_2016 = final_private.loc[final_private['Income Year'] == 2016]
-firms_no_tax_inc_2016 = len(final_2016[final_2016['Taxable income'] == 0])/len(final_2016['Taxable income']) * 100
-firms_no_tax_inc_2016
-no_tax_private_inc.append(firms_no_tax_inc_2016)
-
-final_2017 = final_private.loc[final_private['Income Year'] == 2017]
-firms_no_tax_inc_2017 = len(final_2017[final_2017['Taxable income'] == 0])/len(final_2017['Taxable income']) * 100
-firms_no_tax_inc_2017
-no_tax_private_inc.append(firms_no_tax_inc_2017)
-
-final_2018 = final_private.loc[final_private['Income Year'] == 2018]
-firms_no_tax_inc_2018 = len(final_2018[final_2018['Taxable income'] == 0])/len(final_2018['Taxable income']) * 100
-firms_no_tax_inc_2018
-no_tax_private_inc.append(firms_no_tax_inc_2018)
-
-final_2019 = final_private.loc[final_private['Income Year'] == 2019]
-firms_no_tax_inc_2019 = len(final_2019[final_2019['Taxable income'] == 0])/len(final_2019['Taxable income']) * 100
-firms_no_tax_inc_2019
-no_tax_private_inc.append(firms_no_tax_inc_2019)
-
-no_tax_private_inc
-
-pay_tax = []
-final_2013 = final.loc[final['Income Year'] == 2013]
-firms_tax_2013 = len(final_2013[final_2013['Tax payable'] >= 30])/len(final_2013['Tax payable']) * 100
-firms_tax_2013
-pay_tax.append(firms_tax_2013)
-
-final_2014 = final.loc[final['Income Year'] == 2014]
-firms_tax_2014 = len(final_2014[final_2014['Tax payable'] >= 30])/len(final_2014['Tax payable']) * 100
-firms_tax_2014
-pay_tax.append(firms_tax_2014)
-
-final_2015 = final.loc[final['Income Year'] == 2015]
-firms_tax_2015 = len(final_2015[final_2015['Tax payable'] >= 30])/len(final_2015['Tax payable']) * 100
-firms_tax_2015
-pay_tax.append(firms_tax_2015)
-
-final_2016 = final.loc[final['Income Year'] == 2016]
-firms_tax_2016 = len(final_2016[final_2016['Tax payable'] >= 30])/len(final_2016['Tax payable']) * 100
-firms_tax_2016
-pay_tax.append(firms_tax_2016)
-
-final_2017 = final.loc[final['Income Year'] == 2017]
-firms_tax_2017 = len(final_2017[final_2017['Tax payable'] >= 30])/len(final_2017['Tax payable']) * 100
-firms_tax_2017
-pay_tax.append(firms_tax_2017)
-
-final_2018 = final.loc[final['Income Year'] == 2018]
-firms_tax_2018 = len(final_2018[final_2018['Tax payable'] >= 30])/len(final_2018['Tax payable']) * 100
-firms_tax_2018
-pay_tax.append(firms_tax_2018)
-
-final_2019 = final.loc[final['Income Year'] == 2019]
-firms_tax_2019 = len(final_2019[final_2019['Tax payable'] >= 30])/len(final_2019['Tax payable']) * 100
-firms_tax_2019
-pay_tax.append(firms_tax_2019)
-
-pay_tax
-
-pay_public_tax = []
-final_2013 = final_public.loc[final_public['Income Year'] == 2013]
-firms_tax_2013 = len(final_2013[final_2013['Tax payable'] >= 30])/len(final_2013['Tax payable']) * 100
-firms_tax_2013
-pay_public_tax.append(firms_tax_2013)
-
-final_2014 = final_public.loc[final_public['Income Year'] == 2014]
-firms_tax_2014 = len(final_2014[final_2014['Tax payable'] >= 30])/len(final_2014['Tax payable']) * 100
-firms_tax_2014
-pay_public_tax.append(firms_tax_2014)
-
-final_2015 = final_public.loc[final_public['Income Year'] == 2015]
-firms_tax_2015 = len(final_2015[final_2015['Tax payable'] >= 30])/len(final_2015['Tax payable']) * 100
-firms_tax_2015
-pay_public_tax.append(firms_tax_2015)
-
-final_2016 = final_public.loc[final_public['Income Year'] == 2016]
-firms_tax_2016 = len(final_2016[final_2016['Tax payable'] >= 30])/len(final_2016['Tax payable']) * 100
-firms_tax_2016
-pay_public_tax.append(firms_tax_2016)
-
-final_2017 = final_public.loc[final_public['Income Year'] == 2017]
-firms_tax_2017 = len(final_2017[final_2017['Tax payable'] >= 30])/len(final_2017['Tax payable']) * 100
-firms_tax_2017
-pay_public_tax.append(firms_tax_2017)
-
-final_2018 = final_public.loc[final_public['Income Year'] == 2018]
-firms_tax_2018 = len(final_2018[final_2018['Tax payable'] >= 30])/len(final_2018['Tax payable']) * 100
-firms_tax_2018
-pay_public_tax.append(firms_tax_2018)
-
-final_2019 = final_public.loc[final_public['Income Year'] == 2019]
-firms_tax_2019 = len(final_2019[final_2019['Tax payable'] >= 30])/len(final_2019['Tax payable']) * 100
-firms_tax_2019
-pay_public_tax.append(firms_tax_2019)
-
-pay_public_tax
-
-pay_private_tax = []
-final_2013 = final_private.loc[final_private['Income Year'] == 2013]
-firms_tax_2013 = len(final_2013[final_2013['Tax payable'] >= 30])/len(final_2013['Tax payable']) * 100
-firms_tax_2013
-pay_private_tax.append(firms_tax_2013)
-
-final_2014 = final_private.loc[final_private['Income Year'] == 2014]
-firms_tax_2014 = len(final_2014[final_2014['Tax payable'] >= 30])/len(final_2014['Tax payable']) * 100
-firms_tax_2014
-pay_private_tax.append(firms_tax_2014)
-
-final_2015 = final_private.loc[final_private['Income Year'] == 2015]
-firms_tax_2015 = len(final_2015[final_2015['Tax payable'] >= 30])/len(final_2015['Tax payable']) * 100
-firms_tax_2015
-pay_private_tax.append(firms_tax_2015)
-
-final_2016 = final_private.loc[final_private['Income Year'] == 2016]
-firms_tax_2016 = len(final_2016[final_2016['Tax payable'] >= 30])/len(final_2016['Tax payable']) * 100
-firms_tax_2016
-pay_private_tax.append(firms_tax_2016)
-
-final_2017 = final_private.loc[final_private['Income Year'] == 2017]
-firms_tax_2017 = len(final_2017[final_2017['Tax payable'] >= 30])/len(final_2017['Tax payable']) * 100
-firms_tax_2017
-pay_private_tax.append(firms_tax_2017)
-
-final_2018 = final_private.loc[final_private['Income Year'] == 2018]
-firms_tax_2018 = len(final_2018[final_2018['Tax payable'] >= 30])/len(final_2018['Tax payable']) * 100
-firms_tax_2018
-pay_private_tax.append(firms_tax_2018)
-
-final_2019 = final_private.loc[final_private['Income Year'] == 2019]
-firms_tax_2019 = len(final_2019[final_2019['Tax payable'] >= 30])/len(final_2019['Tax payable']) * 100
-firms_tax_2019
-pay_private_tax.append(firms_tax_2019)
-
-pay_private_tax
+# the cube of #2d (all firms, and public / private firms) for no tax payable, no taxable income and full statutory rate
+all_firms = share_table(roll_up(cube))
+public_firms = share_table(cube, **{'Public/Private': 'public'})
+private_firms = share_table(cube, **{'Public/Private': 'private'})
+
+no_tax = all_firms['% No Tax Payable'].tolist()
+no_tax_public = public_firms['% No Tax Payable'].tolist()
+no_tax_private = private_firms['% No Tax Payable'].tolist()
+no_tax, no_tax_public, no_tax_private
+
+no_tax_inc = all_firms['% No Taxable Income'].tolist()
+no_tax_public_inc = public_firms['% No Taxable Income'].tolist()
+no_tax_private_inc = private_firms['% No Taxable Income'].tolist()
+no_tax_inc, no_tax_public_inc, no_tax_private_inc
+
+pay_tax = all_firms['% Full Statutory Rate'].tolist()
+pay_public_tax = public_firms['% Full Statutory Rate'].tolist()
+pay_private_tax = private_firms['% Full Statutory Rate'].tolist()
+pay_tax, pay_public_tax, pay_private_tax
 
 """**d.**	Plot the percentage of firms that report no taxable income, no tax payable and the full statutory tax rate in each year on three separate axes.
 
@@ -962,77 +370,19 @@ Thus, there is a direct negative correlation between public and private companie
 **a.** Calculate the average (both mean and median) effective tax rate in each year for each type of firm (public, private, large and small).
 """
 
-Tax_payable_2013 = final.loc[final['Income Year'] == 2013, 'Tax payable']
-Tax_payable_2014 = final.loc[final['Income Year'] == 2014, 'Tax payable']
-Tax_payable_2015 = final.loc[final['Income Year'] == 2015, 'Tax payable']
-Tax_payable_2016 = final.loc[final['Income Year'] == 2016, 'Tax payable']
-Tax_payable_2017 = final.loc[final['Income Year'] == 2017, 'Tax payable']
-Tax_payable_2018 = final.loc[final['Income Year'] == 2018, 'Tax payable']
-Tax_payable_2019 = final.loc[final['Income Year'] == 2019, 'Tax payable']
-
-# ETR Mean of public firm
-
-#first find the final_public with tax payable and taxable income values
-final_public = final.loc[final['Public/Private'] == 'Public']
-final_public.dropna(subset=['Tax payable', 'Taxable income'], how='all')
-
-
-#ETR = tax payable / taxable income and the mean in each year
-final_public['ETR_2013'] = Tax_payable_2013 / final_public['Taxable income'].mean()
-final_public['ETR_2014'] = Tax_payable_2014 / final_public['Taxable income'].mean()
-final_public['ETR_2015'] = Tax_payable_2015 / final_public['Taxable income'].mean()
-final_public['ETR_2016'] = Tax_payable_2016 / final_public['Taxable income'].mean()
-final_public['ETR_2017'] = Tax_payable_2017 / final_public['Taxable income'].mean()
-final_public['ETR_2018'] = Tax_payable_2018 / final_public['Taxable income'].mean()
-final_public['ETR_2019'] = Tax_payable_2019 / final_public['Taxable income'].mean()
+from ato_tax.etr import etr_table
 
-# ETR Mean of private firm
+# ETR = tax payable / taxable income of each firm (firms without taxable income are left out)
+# one row per year, firm type and statistic: mean, median, trimmed mean and weighted (total tax / total taxable income)
+etr = etr_table(final)
+etr.pivot_table(index = 'Income Year', columns = ['Public/Private', 'statistic'], values = 'ETR')
 
-#first find the final_public with tax payable and taxable income values
-final_public = final.loc[final['Public/Private'] == 'Private']
-final_public.dropna(subset=['Tax payable', 'Taxable income'], how='all')
+from ato_tax.bootstrap import etr_intervals, deduction_intervals
 
-
-#ETR = tax payable / taxable income and the mean in each year
-final_private['ETR_2013'] = Tax_payable_2013 / final_private['Taxable income'].mean()
-final_private['ETR_2014'] = Tax_payable_2014 / final_private['Taxable income'].mean()
-final_private['ETR_2015'] = Tax_payable_2015 / final_private['Taxable income'].mean()
-final_private['ETR_2016'] = Tax_payable_2016 / final_private['Taxable income'].mean()
-final_private['ETR_2017'] = Tax_payable_2017 / final_private['Taxable income'].mean()
-final_private['ETR_2018'] = Tax_payable_2018 / final_private['Taxable income'].mean()
-final_private['ETR_2019'] = Tax_payable_2019 / final_private['Taxable income'].mean()
-
-# ETR Median of public firm
-
-#first find the final_public with tax payable and taxable income values
-final_public = final.loc[final['Public/Private'] == 'Public']
-final_public.dropna(subset=['Tax payable', 'Taxable income'], how='all')
-
-
-#ETR = tax payable / taxable income and the mean in each year
-final_public['ETR_2013'] = Tax_payable_2013 / final_public['Taxable income'].median()
-final_public['ETR_2014'] = Tax_payable_2014 / final_public['Taxable income'].median()
-final_public['ETR_2015'] = Tax_payable_2015 / final_public['Taxable income'].median()
-final_public['ETR_2016'] = Tax_payable_2016 / final_public['Taxable income'].median()
-final_public['ETR_2017'] = Tax_payable_2017 / final_public['Taxable income'].median()
-final_public['ETR_2018'] = Tax_payable_2018 / final_public['Taxable income'].median()
-final_public['ETR_2019'] = Tax_payable_2019 / final_public['Taxable income'].median()
-
-# ETR Median of private firm
-
-#first find the final_public with tax payable and taxable income values
-final_public = final.loc[final['Public/Private'] == 'Private']
-final_public.dropna(subset=['Tax payable', 'Taxable income'], how='all')
-
-
-#ETR = tax payable / taxable income and the mean in each year
-final_private['ETR_2013'] = Tax_payable_2013 / final_private['Taxable income'].median()
-final_private['ETR_2014'] = Tax_payable_2014 / final_private['Taxable income'].median()
-final_private['ETR_2015'] = Tax_payable_2015 / final_private['Taxable income'].median()
-final_private['ETR_2016'] = Tax_payable_2016 / final_private['Taxable income'].median()
-final_private['ETR_2017'] = Tax_payable_2017 / final_private['Taxable income'].median()
-final_private['ETR_2018'] = Tax_payable_2018 / final_private['Taxable income'].median()
-final_private['ETR_2019'] = Tax_payable_2019 / final_private['Taxable income'].median()
+# 95% bootstrap intervals of the mean and median ETR: firms are resampled within each year and firm type
+# a fixed seed gives the same intervals on every run
+etr_ci = etr_intervals(final, replicates = 10000, seed = 0)
+etr_ci
 
 """**b.** Plot your results using an scatterplot. Try out different ways to portray the third, fourth variables - average type (mean or median), firm type (public or private)."""
 
@@ -1046,26 +396,18 @@ topleft = fig.add_subplot(1, 2, 1)
 
 topright = fig.add_subplot(1, 2, 2)
 
+# read the averages from the ETR table
+etr_wide = etr.pivot_table(index = 'Income Year', columns = ['Public/Private', 'statistic'], values = 'ETR')
 
-final[final_public['Public/Private'] == 'Public'].plot(x='Income Year', y='Public/Private', kind='scatter', ax= topleft, \
-                                          title = 'Firm Type: Public', color = 'tab:blue', label = 'ETR Mean')
-    
-final[final_private['Public/Private'] == 'Private'].plot(x='Income Year', y='Public/Private', kind='scatter', ax= topright, \
-                                         title = 'Firm Type: Private',  color = 'tab:blue', label = 'ETR Mean' )
-
-
-
-final[final_public['Public/Private'] == 'Public'].plot(x='Income Year', y='Public/Private', kind='scatter', ax= topleft, \
-                                          title = 'Firm Type: Public', color = 'tab:orange', label = 'ETR Median')
-    
-final[final_private['Public/Private'] == 'Private'].plot(x='Income Year', y='Public/Private', kind='scatter', ax= topright, \
-                                          title = 'Firm Type: Private',  color = 'tab:orange', label = 'ETR Median')
-    
-
+for ax, firm_type in [(topleft, 'public'), (topright, 'private')]:
+    ax.scatter(etr_wide.index, etr_wide[(firm_type, 'mean')], color = 'tab:blue', label = 'ETR Mean')
+    ax.scatter(etr_wide.index, etr_wide[(firm_type, 'median')], color = 'tab:orange', label = 'ETR Median')
+    ax.set_title('Firm Type: ' + firm_type.title())
+    ax.legend()
 
 #label x and y axis
-topleft.set(xlabel='Income Year', ylabel='Firm Type')
-topright.set(xlabel='Income Year', ylabel='Firm Type')
+topleft.set(xlabel='Income Year', ylabel='ETR')
+topright.set(xlabel='Income Year', ylabel='ETR')
 
 
 #overall figure title
@@ -1105,49 +447,34 @@ Where ``Total income - Taxable income = Tax Deductions Claimed``
 **a.** Calculate the total tax deductions claimed as a percentage of total income for each firm in each year.
 """
 
-Taxable_income_2013 = final.loc[final['Income Year'] == 2013, 'Taxable income']
-Taxable_income_2014 = final.loc[final['Income Year'] == 2014, 'Taxable income']
-Taxable_income_2015 = final.loc[final['Income Year'] == 2015, 'Taxable income']
-Taxable_income_2016 = final.loc[final['Income Year'] == 2016, 'Taxable income']
-Taxable_income_2017 = final.loc[final['Income Year'] == 2017, 'Taxable income']
-Taxable_income_2018 = final.loc[final['Income Year'] == 2018, 'Taxable income']
-Taxable_income_2019 = final.loc[final['Income Year'] == 2019, 'Taxable income']
-
-Tax_deductions_claimed = (final['Total income'] - final['Taxable income'])/final['Total income']
+from ato_tax.etr import deduction_share, deduction_table
 
-final['Tax deductions claimed_2013'] = (final['Total income'] - final['Taxable income'])/final['Total income']
-final['Tax deductions claimed_2014'] = (final['Total income'] - final['Taxable income'])/final['Total income']
-final['Tax deductions claimed_2015'] = (final['Total income'] - final['Taxable income'])/final['Total income']
-final['Tax deductions claimed_2016'] = (final['Total income'] - final['Taxable income'])/final['Total income']
-final['Tax deductions claimed_2017'] = (final['Total income'] - final['Taxable income'])/final['Total income']
-final['Tax deductions claimed_2018'] = (final['Total income'] - final['Taxable income'])/final['Total income']
-final['Tax deductions claimed_2019'] = (final['Total income'] - final['Taxable income'])/final['Total income']
+final['Tax deductions claimed'] = deduction_share(final)
+final[['Name', 'Income Year', 'Tax deductions claimed']]
 
 """**b.** Find the mean and median of the ratio you just calculated in each year. Further bifurcate your results for public and private firms."""
 
-final['Tax deductions claimed_2013'] = (final['Total income'] - final['Taxable income'])/final['Total income'].mean()
-final['Tax deductions claimed_2014'] = (final['Total income'] - final['Taxable income'])/final['Total income'].mean()
-final['Tax deductions claimed_2015'] = (final['Total income'] - final['Taxable income'])/final['Total income'].mean()
-final['Tax deductions claimed_2016'] = (final['Total income'] - final['Taxable income'])/final['Total income'].mean()
-final['Tax deductions claimed_2017'] = (final['Total income'] - final['Taxable income'])/final['Total income'].mean()
-final['Tax deductions claimed_2018'] = (final['Total income'] - final['Taxable income'])/final['Total income'].mean()
-final['Tax deductions claimed_2019'] = (final['Total income'] - final['Taxable income'])/final['Total income'].mean()
-
-final['Tax deductions claimed_2013'] = (final['Total income'] - final['Taxable income'])/final['Total income'].median()
-final['Tax deductions claimed_2014'] = (final['Total income'] - final['Taxable income'])/final['Total income'].median()
-final['Tax deductions claimed_2015'] = (final['Total income'] - final['Taxable income'])/final['Total income'].median()
-final['Tax deductions claimed_2016'] = (final['Total income'] - final['Taxable income'])/final['Total income'].median()
-final['Tax deductions claimed_2017'] = (final['Total income'] - final['Taxable income'])/final['Total income'].median()
-final['Tax deductions claimed_2018'] = (final['Total income'] - final['Taxable income'])/final['Total income'].median()
-final['Tax deductions claimed_2019'] = (final['Total income'] - final['Taxable income'])/final['Total income'].median()
+deductions = deduction_table(final, statistics = ['mean', 'median'])
+deductions_wide = deductions.pivot_table(index = 'Income Year', columns = ['Public/Private', 'statistic'], values = 'Deductions')
+deductions_wide
+
+deductions_ci = deduction_intervals(final, replicates = 10000, seed = 0)
+deductions_ci
 
 """**c.** Create the same plot you did for #4b except plot tax deductions as a percentage of total income instead of ETRs."""
 
-final[final_private['Public/Private'] == 'Private'].plot(x='Income Year', y='Public/Private', kind='scatter', \
-                                          title = 'Firm Type: Private',  color = 'tab:orange', label = 'Total income')
+fig= plt.figure(figsize = (10,15))
+topleft = fig.add_subplot(1, 2, 1)
+topright = fig.add_subplot(1, 2, 2)
 
-final[final_public['Public/Private'] == 'Public'].plot(x='Income Year', y='Public/Private', kind='scatter', \
-                                          title = 'Firm Type: Public',  color = 'tab:orange', label = 'Total income')
+for ax, firm_type in [(topleft, 'public'), (topright, 'private')]:
+    ax.scatter(deductions_wide.index, deductions_wide[(firm_type, 'mean')], color = 'tab:blue', label = 'Deductions Mean')
+    ax.scatter(deductions_wide.index, deductions_wide[(firm_type, 'median')], color = 'tab:orange', label = 'Deductions Median')
+    ax.set(title = 'Firm Type: ' + firm_type.title(), xlabel = 'Income Year', ylabel = 'Tax deductions / Total income')
+    ax.legend()
+
+fig.suptitle("Average (both mean and median) tax deductions as a percentage of total income in each year for each type of firm")
+plt.tight_layout()
 
 """**d.** Create the following visualization:
 
@@ -1167,42 +494,38 @@ final[final_public['Public/Private'] == 'Public'].plot(x='Income Year', y='Publi
 fig= plt.figure(figsize = (10,15))
 
 # add axes of equal sizes
-# one row, two columns
-topleft = fig.add_subplot(1, 2, 1)
+# two rows, two columns
+topleft = fig.add_subplot(2, 2, 1)
 
-topright = fig.add_subplot(1, 2, 2)
+topright = fig.add_subplot(2, 2, 2)
 
 bottomleft = fig.add_subplot(2, 2, 3)
 
 bottomright = fig.add_subplot(2, 2, 4)
 
-
-final[final_public['Public/Private'] == 'Public'].plot(x='ETR', y='Public/Private', kind='scatter', ax= topleft, \
-                                          title = 'Firm Type: Public', color = 'tab:blue', label = 'ETR Mean')
-    
-final[final_private['Public/Private'] == 'Private'].plot(x='Income Year', y='Public/Private', kind='scatter', ax= topright, \
-                                         title = 'Firm Type: Private',  color = 'tab:blue', label = 'ETR Mean' )
-
-
-
-final[final_public['Public/Private'] == 'Public'].plot(x='ETR', y='Public/Private', kind='scatter', ax= bottomleft, \
-                                          title = 'Firm Type: Public', color = 'tab:blue', label = 'ETR Median')
-    
-final[final_private['Public/Private'] == 'Private'].plot(x='Income Year', y='Public/Private', kind='scatter', ax= bottomright, \
-                                         title = 'Firm Type: Private',  color = 'tab:blue', label = 'ETR Median' )
-
-
-#label x and y axis
-topleft.set(xlabel='ETR', ylabel='Firm Type')
-topright.set(xlabel='ETR', ylabel='Firm Type')
+# first row means, second row medians; ETRs on the left, deductions on the right
+for row, statistic in [((topleft, topright), 'mean'), ((bottomleft, bottomright), 'median')]:
+    for firm_type, color in [('public', 'tab:blue'), ('private', 'tab:orange')]:
+        row[0].scatter(etr_wide.index, etr_wide[(firm_type, statistic)], color = color, label = firm_type.title())
+        row[1].scatter(deductions_wide.index, deductions_wide[(firm_type, statistic)], color = color, label = firm_type.title())
+    row[0].set(title = 'ETR ' + statistic.title(), xlabel = 'Income Year', ylabel = 'ETR')
+    row[1].set(title = 'Tax deductions / Total income ' + statistic.title(), xlabel = 'Income Year', ylabel = 'Deductions')
+    row[0].legend()
+    row[1].legend()
 
 
 #overall figure title
-fig.suptitle("ETRs in one axes and median tax deductions as a percentage of total income on the other")
+fig.suptitle("ETRs in one axes and tax deductions as a percentage of total income on the other")
 
 
 plt.tight_layout()
 
+from ato_tax.figures import render_figures
+
+# all of the part II figures as PNG and SVG files in figures/, each drawn off screen in its own
+# worker process from the aggregated tables (the ETR distribution is binned, not drawn point by point)
+render_figures(final, 'figures', formats = ['png', 'svg'])
+
 """**e.** Form a conclusion related to the data calculated and visualized in this step. What do you notice?
 
 Once again, an opposite trend from public and private firms.
@@ -0,0 +1,6 @@
+"""Helpers for the Australian Tax Return Data case (part I and part II).
+
+The notebooks in the repository root call into these modules so that the
+heavy lifting (loading the ATO workbooks, reshaping and summarising the
+panel) can be reused outside of Colab.
+"""
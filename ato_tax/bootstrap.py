@@ -0,0 +1,95 @@
+"""Bootstrap confidence intervals for the ETR and deduction statistics.
+
+Firms are resampled with replacement within each (Income Year, Public/Private)
+cell. Every batch of replicates is one (replicates, firms) index matrix, so a
+statistic is a single NumPy reduction along the rows; cells are shared out over
+a process pool. Each cell draws from its own `SeedSequence`, derived from the
+seed and the cell's key, so a cell's interval does not depend on which other
+cells are in the panel or on the number of workers.
+"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from common.parallel import map_processes
+
+# upper bound on the number of resampled values held in memory per batch
+BATCH_VALUES = 2 ** 22
+
+REDUCERS = {'mean': lambda samples: samples.mean(axis = 1),
+            'median': lambda samples: np.median(samples, axis = 1)}
+
+
+def cell_seed(seed, cell):
+    """The `SeedSequence` of one cell, e.g. cell_seed(0, (2014, 'public'))."""
+    return np.random.SeedSequence(seed, spawn_key = [zlib.crc32(str(value).encode()) for value in cell])
+
+
+def bootstrap(values, statistics = ('mean', 'median'), replicates = 10000, level = 0.95, seed = None):
+    """Point estimates and percentile intervals of `statistics` over `values`.
+
+    Returns a list of (statistic, estimate, low, high). `seed` is anything
+    `np.random.default_rng` accepts.
+    """
+    for statistic in statistics:
+        if statistic not in REDUCERS:
+            raise ValueError('unknown statistic %r' % statistic)
+    values = np.asarray(values, dtype = 'float64')
+    n = len(values)
+    if n == 0:
+        return [(statistic, np.nan, np.nan, np.nan) for statistic in statistics]
+
+    rng = np.random.default_rng(seed)
+    batch = max(1, BATCH_VALUES // n)
+    replicated = {statistic: np.empty(replicates) for statistic in statistics}
+    for start in range(0, replicates, batch):
+        stop = min(start + batch, replicates)
+        samples = values[rng.integers(0, n, size = (stop - start, n))]
+        for statistic in statistics:
+            replicated[statistic][start:stop] = REDUCERS[statistic](samples)
+
+    tail = (1 - level) / 2 * 100
+    results = []
+    for statistic in statistics:
+        low, high = np.percentile(replicated[statistic], [tail, 100 - tail])
+        results.append((statistic, REDUCERS[statistic](values[np.newaxis])[0], low, high))
+    return results
+
+
+def bootstrap_table(numerator, denominator, keys, statistics = ('mean', 'median'), replicates = 10000,
+                    level = 0.95, seed = 0, max_workers = None, name = 'value'):
+    """Bootstrap intervals of numerator / denominator for every cell of `keys`.
+
+    Rows are selected as in `etr.ratio_table` (denominator above zero). Returns
+    a tidy frame with the key columns, 'statistic', `name` (the estimate on the
+    panel itself), 'low', 'high' and 'firms'. `max_workers` defaults to the
+    number of CPUs; 1 runs every cell in the calling process.
+    """
+    valid = (denominator > 0).to_numpy() & numerator.notna().to_numpy()
+    ratio = numerator.to_numpy(dtype = 'float64')[valid] / denominator.to_numpy(dtype = 'float64')[valid]
+    keys = keys[valid]
+
+    cells = []
+    for cell, positions in keys.groupby(list(keys.columns), observed = True, sort = True).indices.items():
+        cells.append((cell if isinstance(cell, tuple) else (cell,), ratio[positions]))
+    results = map_processes(bootstrap, [(values, statistics, replicates, level, cell_seed(seed, cell))
+                               for cell, values in cells], max_workers)
+
+    rows = []
+    for (cell, values), cell_results in zip(cells, results):
+        for result in cell_results:
+            rows.append(cell + result + (len(values),))
+    return pd.DataFrame(rows, columns = list(keys.columns) + ['statistic', name, 'low', 'high', 'firms'])
+
+
+def etr_intervals(panel, by = ('Income Year', 'Public/Private'), **options):
+    """Bootstrap intervals of the mean and median ETR per year and filing status."""
+    return bootstrap_table(panel['Tax payable'], panel['Taxable income'], panel[list(by)],
+                           name = 'ETR', **options)
+
+
+def deduction_intervals(panel, by = ('Income Year', 'Public/Private'), **options):
+    """Bootstrap intervals of tax deductions as a share of total income."""
+    return bootstrap_table(panel['Total income'] - panel['Taxable income'], panel['Total income'],
+                           panel[list(by)], name = 'Deductions', **options)
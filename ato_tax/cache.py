@@ -0,0 +1,106 @@
+"""On-disk cache of parsed workbook sheets.
+
+The ATO workbooks never change once published, so a parsed sheet is stored
+as a Parquet file keyed by the workbook's content hash, the sheet name and
+the loader options. A changed workbook hashes differently and is parsed
+again; old entries are evicted least recently used first once the cache
+grows past `max_bytes`.
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from common.files import file_digest
+
+
+class SheetCache:
+    """Parquet cache of parsed sheets stored under `root`."""
+
+    def __init__(self, root = '.ato_cache', max_bytes = 512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def key(self, path, sheet_name, options = None):
+        """Return the cache key of `sheet_name` in the workbook at `path`."""
+        parts = [file_digest(path), repr(sheet_name), json.dumps(options or {}, sort_keys = True, default = str)]
+        return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key + '.parquet')
+
+    def get(self, key):
+        """Return the cached frame for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            df = pd.read_parquet(path)
+        except (OSError, ValueError):
+            return None
+        # bump the modification time so that eviction is least recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return df
+
+    def put(self, key, df):
+        """Store `df` under `key`; frames Parquet cannot hold are skipped."""
+        os.makedirs(self.root, exist_ok = True)
+        path = self._path(key)
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            df.to_parquet(tmp)
+        except (ImportError, TypeError, ValueError):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        os.replace(tmp, path)
+        self.evict()
+
+    def entries(self):
+        """Return (mtime, size, path) for every cached sheet, oldest first."""
+        entries = []
+        if not os.path.isdir(self.root):
+            return entries
+        for name in os.listdir(self.root):
+            if not name.endswith('.parquet'):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        """Remove least recently used sheets until the cache fits `max_bytes`."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def read(self, path, sheet_name, parse, options = None):
+        """Return `parse(path, sheet_name, **options)`, from the cache when possible."""
+        options = options or {}
+        key = self.key(path, sheet_name, options)
+        df = self.get(key)
+        if df is None:
+            df = parse(path, sheet_name, **options)
+            self.put(key, df)
+        return df
+
+    def clear(self):
+        """Remove every cached sheet."""
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
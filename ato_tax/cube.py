@@ -0,0 +1,82 @@
+"""Share of firms meeting a condition, per filing status and income year.
+
+Part II #2d and #3 count, for every (Public/Private, Income Year) cell, the
+percentage of firms with e.g. an increase in total income or no tax payable.
+`share_cube` evaluates any number of such predicates over the whole panel
+once and aggregates all of them in a single groupby.
+"""
+import pandas as pd
+
+# the 30% statutory rate, with 29.99% and above counting as paying it
+FULL_RATE = 0.2999
+
+# predicate name -> function of the panel returning a boolean Series
+PREDICATES = {
+    '% Positive Total Income': lambda df: df['% change in total income'] > 0,
+    '% Positive Taxable Income': lambda df: df['% change in taxable income'] > 0,
+    '% Positive Tax Payable': lambda df: df['% change in tax payable'] > 0,
+    '% No Tax Payable': lambda df: df['Tax payable'] == 0,
+    '% No Taxable Income': lambda df: df['Taxable income'] == 0,
+    # paying the statutory rate on a positive taxable income, i.e. claiming no tax
+    # credits; the notebooks tested Tax payable >= 30 (dollars), which nearly
+    # every firm passes, so these shares are lower than the ones they printed
+    '% Full Statutory Rate': lambda df: (df['Taxable income'] > 0)
+                                        & (df['Tax payable'] >= FULL_RATE * df['Taxable income']),
+}
+
+# the share metrics that only depend on the firm-year itself, not on its previous year
+LEVEL_PREDICATES = {name: PREDICATES[name]
+                    for name in ('% No Tax Payable', '% No Taxable Income', '% Full Statutory Rate')}
+
+
+def share_cube(panel, predicates = None, by = ('Public/Private', 'Income Year')):
+    """Return the % of firms satisfying each predicate in every `by` cell.
+
+    `predicates` maps a name to a function taking the panel and returning a
+    boolean Series (default `PREDICATES`). A firm with a missing value fails
+    the predicate but still counts towards the cell. The result is tidy: one
+    row per cell and predicate with the `by` columns, 'metric', 'share' (in %)
+    and 'firms' (the number of firm-years in the cell).
+    """
+    predicates = PREDICATES if predicates is None else predicates
+    by = list(by)
+    flags = pd.DataFrame({name: predicate(panel).fillna(False).to_numpy(dtype = bool)
+                          for name, predicate in predicates.items()}, index = panel.index)
+    flags['firms'] = 1
+    flags[by] = panel[by]
+
+    cells = flags.groupby(by, observed = True, sort = True)
+    firms = cells['firms'].sum()
+    shares = cells[list(predicates)].mean() * 100
+
+    cube = shares.reset_index().melt(id_vars = by, var_name = 'metric', value_name = 'share')
+    return cube.merge(firms.reset_index(), on = by)
+
+
+def roll_up(cube, by = ('Income Year',)):
+    """Combine the cells of a `share_cube` result into coarser `by` cells.
+
+    The shares of the cells are weighted by their firms, so the result is the
+    `share_cube` of the same panel over `by` without going over it again.
+    """
+    by = list(by)
+    weighted = cube.assign(share = cube['share'] * cube['firms'])
+    cells = weighted.groupby(by + ['metric'], observed = True, sort = False)[['share', 'firms']].sum()
+    cells['share'] = cells['share'] / cells['firms']
+    cells = cells.reset_index()
+    cells['metric'] = pd.Categorical(cells['metric'], categories = cube['metric'].unique())
+    cells = cells.sort_values(['metric'] + by, ignore_index = True)
+    cells['metric'] = cells['metric'].astype(cube['metric'].dtype)
+    return cells[by + ['metric', 'share', 'firms']]
+
+
+def share_table(cube, index = 'Income Year', **selection):
+    """Pivot a `share_cube` result to one column per metric.
+
+    `selection` picks cells, e.g. `share_table(cube, **{'Public/Private': 'public'})`.
+    """
+    for column, value in selection.items():
+        cube = cube[cube[column] == value]
+    table = cube.pivot(index = index, columns = 'metric', values = 'share')
+    table.columns.name = None
+    return table[[metric for metric in cube['metric'].unique()]]
@@ -0,0 +1,94 @@
+"""Effective tax rate (and deduction ratio) statistics per year and filing status.
+
+Instead of broadcasting one constant column per year and statistic onto every
+firm-year row, the statistics are returned as a small tidy table with one row
+per (Income Year, Public/Private, statistic). Medians and trimmed means use
+`np.partition` (selection) rather than sorting each cell.
+"""
+import numpy as np
+import pandas as pd
+
+STATISTICS = ('mean', 'median', 'trimmed_mean', 'weighted')
+
+
+def firm_etr(panel):
+    """Tax payable / Taxable income of every firm-year, missing without taxable income."""
+    return _ratio(panel['Tax payable'], panel['Taxable income'])
+
+
+def deduction_share(panel):
+    """Tax deductions claimed (Total income - Taxable income) as a share of Total income."""
+    return _ratio(panel['Total income'] - panel['Taxable income'], panel['Total income'])
+
+
+def _ratio(numerator, denominator):
+    return (numerator / denominator).where(denominator > 0)
+
+
+def _median(values):
+    n = len(values)
+    if n == 0:
+        return np.nan
+    k = n // 2
+    if n % 2:
+        return np.partition(values, k)[k]
+    part = np.partition(values, (k - 1, k))
+    return (part[k - 1] + part[k]) / 2
+
+
+def _trimmed_mean(values, trim):
+    n = len(values)
+    cut = int(n * trim)
+    if n - 2 * cut <= 0:
+        return np.nan
+    if cut == 0:
+        return values.mean()
+    # the middle n - 2 * cut values, in no particular order
+    return np.partition(values, (cut, n - cut - 1))[cut:n - cut].mean()
+
+
+def ratio_table(numerator, denominator, keys, statistics = STATISTICS, trim = 0.1, name = 'value'):
+    """Statistics of numerator / denominator for every cell of `keys`.
+
+    `keys` is a DataFrame of grouping columns aligned with the two Series.
+    Rows with a denominator of zero or less are left out. 'weighted' is the
+    cell's total numerator over its total denominator and 'trimmed_mean'
+    drops the lowest and highest `trim` share of the ratios. Returns a tidy
+    frame with the key columns, 'statistic', `name` and 'firms'.
+    """
+    valid = (denominator > 0).to_numpy() & numerator.notna().to_numpy()
+    num = numerator.to_numpy(dtype = 'float64')[valid]
+    den = denominator.to_numpy(dtype = 'float64')[valid]
+    ratio = num / den
+    keys = keys[valid]
+
+    rows = []
+    cells = keys.groupby(list(keys.columns), observed = True, sort = True).indices
+    for cell, positions in cells.items():
+        cell = cell if isinstance(cell, tuple) else (cell,)
+        values = ratio[positions]
+        for statistic in statistics:
+            if statistic == 'mean':
+                value = values.mean()
+            elif statistic == 'median':
+                value = _median(values)
+            elif statistic == 'trimmed_mean':
+                value = _trimmed_mean(values, trim)
+            elif statistic == 'weighted':
+                value = num[positions].sum() / den[positions].sum()
+            else:
+                raise ValueError('unknown statistic %r' % statistic)
+            rows.append(cell + (statistic, value, len(values)))
+    return pd.DataFrame(rows, columns = list(keys.columns) + ['statistic', name, 'firms'])
+
+
+def etr_table(panel, statistics = STATISTICS, by = ('Income Year', 'Public/Private'), trim = 0.1):
+    """ETR (tax payable / taxable income) statistics per year and filing status."""
+    return ratio_table(panel['Tax payable'], panel['Taxable income'], panel[list(by)],
+                       statistics, trim, 'ETR')
+
+
+def deduction_table(panel, statistics = STATISTICS, by = ('Income Year', 'Public/Private'), trim = 0.1):
+    """Statistics of tax deductions as a share of total income per year and filing status."""
+    return ratio_table(panel['Total income'] - panel['Taxable income'], panel['Total income'],
+                       panel[list(by)], statistics, trim, 'Deductions')
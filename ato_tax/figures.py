@@ -0,0 +1,166 @@
+"""Off-screen rendering of the part II figures.
+
+The figures are drawn from small pre-aggregated tables, never from the
+firm-year rows: the ETR and deduction averages come from `etr`, the shares
+from `cube` and the ETR distribution is binned into a (year, ETR) histogram
+before it is drawn. Every figure is rendered in its own worker process on the
+Agg canvas (no display needed) and written as PNG and/or SVG.
+
+Usage:
+    python -m ato_tax.figures <panel store> <output directory> [png|svg ...]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from common.parallel import map_processes
+
+from .cube import LEVEL_PREDICATES, roll_up, share_cube, share_table
+from .etr import deduction_table, etr_table, firm_etr
+
+FILING_STATUSES = ('public', 'private')
+
+# ETR bins of the distribution figure; higher ETRs are drawn in the last bin
+ETR_BINS = np.linspace(0, 0.6, 61)
+
+
+def _wide(table, value):
+    return table.pivot_table(index = 'Income Year', columns = ['Public/Private', 'statistic'],
+                             values = value, observed = True)
+
+
+def figure_data(panel):
+    """Aggregate `panel` into the small tables the figures are drawn from."""
+    data = {'etr': _wide(etr_table(panel, statistics = ['mean', 'median']), 'ETR'),
+            'deductions': _wide(deduction_table(panel, statistics = ['mean', 'median']), 'Deductions')}
+
+    cube = share_cube(panel, LEVEL_PREDICATES)
+    shares = {'all': share_table(roll_up(cube))}
+    for status in FILING_STATUSES:
+        shares[status] = share_table(cube, **{'Public/Private': status})
+    data['shares'] = shares
+
+    etr = firm_etr(panel).clip(upper = ETR_BINS[-1]).to_numpy()
+    years = np.sort(panel['Income Year'].unique()).astype('int64')
+    year_edges = np.r_[years, years[-1] + 1] - 0.5 if len(years) else np.array([0.0, 1.0])
+    density = {}
+    for status in FILING_STATUSES:
+        rows = (panel['Public/Private'] == status).to_numpy() & ~np.isnan(etr)
+        density[status], _, _ = np.histogram2d(panel['Income Year'].to_numpy()[rows], etr[rows],
+                                               bins = [year_edges, ETR_BINS])
+    data['density'] = {'years': years, 'counts': density}
+    return data
+
+
+def _averages(fig, table, ylabel, title):
+    axes = fig.subplots(1, 2, sharey = True)
+    for ax, status in zip(axes, FILING_STATUSES):
+        if (status, 'mean') in table.columns:
+            ax.scatter(table.index, table[(status, 'mean')], color = 'tab:blue', label = 'Mean')
+            ax.scatter(table.index, table[(status, 'median')], color = 'tab:orange', label = 'Median')
+        ax.set(title = 'Firm Type: ' + status.title(), xlabel = 'Income Year', ylabel = ylabel)
+        ax.legend()
+    fig.suptitle(title)
+
+
+def draw_etr_averages(fig, data):
+    _averages(fig, data['etr'], 'ETR',
+              'Average (both mean and median) effective tax rate in each year for each type of firm')
+
+
+def draw_deduction_averages(fig, data):
+    _averages(fig, data['deductions'], 'Tax deductions / Total income',
+              'Average (both mean and median) tax deductions as a percentage of total income')
+
+
+def draw_etr_and_deductions(fig, data):
+    axes = fig.subplots(2, 2)
+    for row, statistic in zip(axes, ('mean', 'median')):
+        for ax, (name, table) in zip(row, [('ETR', data['etr']), ('Deductions', data['deductions'])]):
+            for status, color in zip(FILING_STATUSES, ('tab:blue', 'tab:orange')):
+                if (status, statistic) in table.columns:
+                    ax.scatter(table.index, table[(status, statistic)], color = color, label = status.title())
+            ax.set(title = '%s %s' % (name, statistic.title()), xlabel = 'Income Year', ylabel = name)
+            ax.legend()
+    fig.suptitle('ETRs and tax deductions as a percentage of total income')
+
+
+def draw_shares(fig, data):
+    axes = fig.subplots(1, len(LEVEL_PREDICATES), sharey = True)
+    for ax, metric in zip(axes, LEVEL_PREDICATES):
+        for group, table in data['shares'].items():
+            ax.plot(table.index, table[metric], marker = 'o', label = group.title() + ' Firms')
+        ax.set(title = metric, xlabel = 'Income Year')
+        ax.legend()
+    axes[0].set_ylabel('% of firms')
+
+
+def draw_etr_density(fig, data):
+    years, counts = data['density']['years'], data['density']['counts']
+    axes = fig.subplots(1, 2, sharey = True)
+    for ax, status in zip(axes, FILING_STATUSES):
+        if len(years):
+            mesh = ax.pcolormesh(np.r_[years, years[-1] + 1] - 0.5, ETR_BINS, counts[status].T, cmap = 'viridis')
+            fig.colorbar(mesh, ax = ax, label = 'firms')
+        ax.set(title = 'Firm Type: ' + status.title(), xlabel = 'Income Year', ylabel = 'ETR')
+    fig.suptitle('Distribution of firm ETRs in each year (ETRs of %d%% and above in the top bin)' % (ETR_BINS[-1] * 100))
+
+
+# figure name -> (draw function, size in inches)
+FIGURES = {'etr_averages': (draw_etr_averages, (12, 5)),
+           'deduction_averages': (draw_deduction_averages, (12, 5)),
+           'etr_and_deductions': (draw_etr_and_deductions, (12, 10)),
+           'shares': (draw_shares, (15, 5)),
+           'etr_density': (draw_etr_density, (12, 5))}
+
+
+def render_figure(name, data, directory, formats = ('png',)):
+    """Draw one of the `FIGURES` off screen and save it; returns (paths, seconds)."""
+    # a plain Figure on the Agg canvas: no pyplot, so the caller's backend is left alone
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    start = time.perf_counter()
+    draw, size = FIGURES[name]
+    fig = Figure(figsize = size)
+    FigureCanvasAgg(fig)
+    draw(fig, data)
+    fig.tight_layout()
+    paths = []
+    for fmt in formats:
+        path = os.path.join(directory, '%s.%s' % (name, fmt))
+        fig.savefig(path, format = fmt)
+        paths.append(path)
+    return paths, time.perf_counter() - start
+
+
+def render_figures(panel, directory, names = None, formats = ('png', 'svg'), max_workers = None):
+    """Render the part II figures of `panel` into `directory`, one worker process per figure.
+
+    Returns a frame with the files written and the seconds spent on each
+    figure (aggregating the panel is timed as 'aggregate').
+    """
+    names = list(FIGURES) if names is None else list(names)
+    os.makedirs(directory, exist_ok = True)
+    start = time.perf_counter()
+    data = figure_data(panel)
+    aggregated = time.perf_counter() - start
+
+    results = map_processes(render_figure, [(name, data, directory, tuple(formats)) for name in names], max_workers)
+    timings = pd.DataFrame({'figure': ['aggregate'] + names,
+                            'files': [''] + [', '.join(paths) for paths, seconds in results],
+                            'seconds': [aggregated] + [seconds for paths, seconds in results]})
+    return timings
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    from .store import PanelStore
+
+    timings = render_figures(PanelStore(sys.argv[1]).to_pandas(), sys.argv[2], formats = sys.argv[3:] or ('png', 'svg'))
+    for figure, files, seconds in timings.itertuples(index = False):
+        print('%-20s %8.3f s  %s' % (figure, seconds, files))
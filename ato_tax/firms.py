@@ -0,0 +1,170 @@
+"""Firm history lookups without scanning the panel.
+
+`final[final['Name'] == ...]` compares every row. The panel store writes the
+rows of every income year ordered by ABN, so a firm's rows in a year file are
+one contiguous range. `FirmIndex` keeps, for every ABN (looked up through a
+dict), the year files and row ranges holding it, and the ABNs under every
+normalized name; a history is then read from the memory mapped year files,
+slice by slice. The panel is keyed by ABN and name, so a range may hold two
+rows when an ABN filed under two names in a year.
+
+The panel store keeps the index of its panel (`PanelStore.firm_index`) and
+`append_income_year` adds the ranges of a new income year with `append`,
+without reading the other years.
+
+    panel = PanelStore('part1.panel')
+    panel.firm_index().history(panel, name = 'HSBC Bank Australia Ltd')
+"""
+import re
+
+import numpy as np
+import pyarrow as pa
+
+# spelling variants of the same legal words
+_ABBREVIATIONS = {'LIMITED': 'LTD',
+                  'PROPRIETARY': 'PTY',
+                  'COMPANY': 'CO',
+                  'CORPORATION': 'CORP',
+                  '&': 'AND'}
+
+_TOKEN = re.compile(r'[A-Z0-9]+|&')
+
+
+def normalize_name(name):
+    """Upper case, punctuation dropped and legal words abbreviated.
+
+    'Hsbc Bank Australia Limited.' -> 'HSBC BANK AUSTRALIA LTD'
+    """
+    tokens = _TOKEN.findall(str(name).upper())
+    return ' '.join(_ABBREVIATIONS.get(token, token) for token in tokens)
+
+
+def sort_by_year_and_abn(panel):
+    """Return `panel` in the row order of the panel store: by income year, then ABN."""
+    return panel.sort_values(['Income Year', 'ABN'], ignore_index = True, kind = 'stable')
+
+
+def _ranges(abns):
+    # (ABN, start, stop) of every run of equal ABNs in an ABN-sorted array
+    starts = np.flatnonzero(np.r_[True, abns[1:] != abns[:-1]]) if len(abns) else np.empty(0, dtype = 'int64')
+    stops = np.r_[starts[1:], len(abns)].astype('int64')
+    return abns[starts], starts, stops
+
+
+def _name_pairs(panel):
+    pairs = panel[['Name', 'ABN']].drop_duplicates()
+    return [normalize_name(name) for name in pairs['Name']], pairs['ABN'].to_numpy(dtype = 'int64')
+
+
+class FirmIndex:
+    """Row ranges of every ABN in the year files of a panel store, and the ABNs of every normalized name.
+
+    The ranges of ABN `abns[i]` are `years`, `starts` and `stops` from
+    `indptr[i]` to `indptr[i + 1]`, by year.
+    """
+
+    def __init__(self, abns, indptr, years, starts, stops, name_keys, name_abns):
+        self.abns = np.asarray(abns, dtype = 'int64')
+        self.indptr = np.asarray(indptr, dtype = 'int64')
+        self.years = np.asarray(years, dtype = 'int64')
+        self.starts = np.asarray(starts, dtype = 'int64')
+        self.stops = np.asarray(stops, dtype = 'int64')
+        self._positions = dict(zip(self.abns.tolist(), range(len(self.abns))))
+        self._names = {}
+        for name, abn in zip(np.asarray(name_keys, dtype = str).tolist(),
+                             np.asarray(name_abns, dtype = 'int64').tolist()):
+            abns = self._names.setdefault(name, [])
+            if abn not in abns:
+                abns.append(abn)
+        # one (name, ABN) pair each, however often a firm was appended
+        pairs = [(name, abn) for name, abns in self._names.items() for abn in abns]
+        self.name_keys = np.array([name for name, abn in pairs], dtype = str)
+        self.name_abns = np.array([abn for name, abn in pairs], dtype = 'int64')
+
+    @classmethod
+    def _from_ranges(cls, abns, years, starts, stops, name_keys, name_abns):
+        # group the ranges by ABN, each ABN's by year
+        order = np.lexsort((years, abns))
+        unique, counts = np.unique(abns[order], return_counts = True)
+        return cls(unique, np.r_[0, np.cumsum(counts)], years[order], starts[order], stops[order],
+                   name_keys, name_abns)
+
+    @classmethod
+    def build(cls, panel):
+        """Index a panel in the order of `sort_by_year_and_abn`, as the store writes it.
+
+        Row ranges count from the first row of their income year.
+        """
+        years = panel['Income Year'].to_numpy(dtype = 'int64')
+        abns = panel['ABN'].to_numpy(dtype = 'int64')
+        if (np.diff(years) < 0).any() or (np.diff(abns)[years[1:] == years[:-1]] < 0).any():
+            raise ValueError('panel is not sorted by Income Year and ABN')
+        # ABNs, years, starts and stops of the ranges, one array per income year
+        columns = [[np.empty(0, dtype = 'int64')] for _ in range(4)]
+        bounds = np.flatnonzero(np.r_[True, years[1:] != years[:-1], True]) if len(years) else []
+        for first, last in zip(bounds[:-1], bounds[1:]):
+            range_abns, starts, stops = _ranges(abns[first:last])
+            for column, values in zip(columns, (range_abns, np.full(len(starts), years[first]), starts, stops)):
+                column.append(values)
+        return cls._from_ranges(*[np.concatenate(column) for column in columns], *_name_pairs(panel))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle = False) as arrays:
+            return cls(arrays['abns'], arrays['indptr'], arrays['years'], arrays['starts'], arrays['stops'],
+                       arrays['name_keys'], arrays['name_abns'])
+
+    def save(self, path):
+        np.savez(path, abns = self.abns, indptr = self.indptr, years = self.years, starts = self.starts,
+                 stops = self.stops, name_keys = self.name_keys, name_abns = self.name_abns)
+
+    def __len__(self):
+        return len(self.abns)
+
+    def __contains__(self, abn):
+        return int(abn) in self._positions
+
+    def ranges(self, abn):
+        """(income year, slice of the year file) of every year `abn` has rows in."""
+        position = self._positions[int(abn)]
+        entries = range(self.indptr[position], self.indptr[position + 1])
+        return [(int(self.years[i]), slice(int(self.starts[i]), int(self.stops[i]))) for i in entries]
+
+    def find(self, name):
+        """ABNs filed under `name` (compared after `normalize_name`), possibly none."""
+        return list(self._names.get(normalize_name(name), []))
+
+    def history(self, store, abn = None, name = None):
+        """Every firm-year of one ABN, or of all ABNs filed under `name`, read from `store`.
+
+        `store` is the `PanelStore` the index belongs to; only the ranges of
+        the firm are read from its year files. A `name` that is not in the
+        index gives an empty frame; an unknown `abn` raises KeyError.
+        """
+        if (abn is None) == (name is None):
+            raise ValueError('pass either an abn or a name')
+        abns = [abn] if abn is not None else self.find(name)
+        tables = [store.table(year).slice(rows.start, rows.stop - rows.start)
+                  for abn in abns for year, rows in self.ranges(abn)]
+        if not tables:
+            tables = [store.table(store.years[0]).slice(0, 0)]
+        return pa.concat_tables(tables).to_pandas()
+
+    def append(self, year, rows):
+        """Return the index with the income `year` added, or replaced if it is indexed already.
+
+        `rows` are the rows of the year's file, in ABN order. Only the ranges
+        of the year are computed; the other years are not read.
+        """
+        abns = rows['ABN'].to_numpy(dtype = 'int64')
+        if (np.diff(abns) < 0).any():
+            raise ValueError('rows are not sorted by ABN')
+        kept = self.years != year
+        owners = np.repeat(self.abns, np.diff(self.indptr))
+        new_abns, starts, stops = _ranges(abns)
+        name_keys, name_abns = _name_pairs(rows)
+        return FirmIndex._from_ranges(np.r_[owners[kept], new_abns],
+                                      np.r_[self.years[kept], np.full(len(starts), year, dtype = 'int64')],
+                                      np.r_[self.starts[kept], starts], np.r_[self.stops[kept], stops],
+                                      np.r_[self.name_keys, np.asarray(name_keys, dtype = str)],
+                                      np.r_[self.name_abns, name_abns])
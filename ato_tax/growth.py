@@ -0,0 +1,77 @@
+"""Per-firm year to year growth metrics of the firm-year panel (part II #2).
+
+`final['Taxable income'].pct_change()` runs down the whole frame, so every
+firm's first year is compared with the previous firm's last year. Here the
+panel is ordered by ABN and income year once and every change is only taken
+between consecutive years of the same ABN.
+
+Zero and missing bases:
+- a change needs the firm's previous income year, otherwise it is missing
+- a % change from zero is missing (it would be infinite), unless the value
+  stays at zero, which is a change of 0
+- an effective tax rate with a zero (loss) denominator is missing
+"""
+import numpy as np
+import pandas as pd
+
+# column holding the % change of each metric
+PERCENT_CHANGES = {'Taxable income': '% change in taxable income',
+                   'Total income': '% change in total income',
+                   'Tax payable': '% change in tax payable'}
+
+
+def _rate(numerator, denominator):
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def _percent_change(current, previous, has_previous):
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        change = (current - previous) / previous * 100
+    change = np.where(previous == 0, np.where(current == 0, 0.0, np.nan), change)
+    return np.where(has_previous, change, np.nan)
+
+
+def growth_metrics(panel):
+    """Return the part II #2 metrics of every firm-year, aligned with `panel`.
+
+    Columns: 'Taxes as % of Taxable Income', 'Taxes as % of Total Income',
+    the % change in Taxable income, Total income and Tax payable, 'ETR'
+    (tax payable / taxable income), 'ETR Change', 'ETR2' (tax payable /
+    total income) and 'ETR2 Change'.
+    """
+    abn = panel['ABN'].to_numpy()
+    year = panel['Income Year'].to_numpy().astype('int64')
+    order = np.lexsort((year, abn))
+    abn, year = abn[order], year[order]
+
+    # row i can be compared with row i - 1 when it is the next year of the same firm
+    has_previous = np.zeros(len(order), dtype = bool)
+    has_previous[1:] = (abn[1:] == abn[:-1]) & (year[1:] - year[:-1] == 1)
+
+    def previous(values):
+        shifted = np.empty_like(values)
+        shifted[:1] = np.nan
+        shifted[1:] = values[:-1]
+        return shifted
+
+    values = {metric: panel[metric].to_numpy(dtype = 'float64')[order] for metric in PERCENT_CHANGES}
+    etr = _rate(values['Tax payable'], values['Taxable income'])
+    etr2 = _rate(values['Tax payable'], values['Total income'])
+
+    sorted_columns = {'Taxes as % of Taxable Income': etr * 100,
+                      'Taxes as % of Total Income': etr2 * 100}
+    for metric, column in PERCENT_CHANGES.items():
+        sorted_columns[column] = _percent_change(values[metric], previous(values[metric]), has_previous)
+    sorted_columns['ETR'] = etr
+    sorted_columns['ETR Change'] = np.where(has_previous, etr - previous(etr), np.nan)
+    sorted_columns['ETR2'] = etr2
+    sorted_columns['ETR2 Change'] = np.where(has_previous, etr2 - previous(etr2), np.nan)
+
+    # back to the row order of the panel
+    columns = {}
+    for column, sorted_values in sorted_columns.items():
+        unsorted = np.empty_like(sorted_values)
+        unsorted[order] = sorted_values
+        columns[column] = unsorted
+    return pd.DataFrame(columns, index = panel.index)
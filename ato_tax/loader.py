@@ -0,0 +1,219 @@
+"""Loading of the ATO corporate tax transparency workbooks.
+
+Parsing the workbooks with openpyxl is CPU bound, so every (workbook, sheet)
+pair is parsed in its own worker process and the results are collected in
+the original order. Most rows fall below the income threshold, so the
+filters are applied while the rows are streamed out of the sheet and only
+the rows that are kept ever become part of a DataFrame.
+"""
+import os
+
+import openpyxl
+import pandas as pd
+
+from common.parallel import map_processes
+
+from .panel import year_suffix
+
+# All public firms with total income over $100M are disclosed but private firms
+# only above $200M, so every year is filtered at $200M to keep them comparable
+INCOME_THRESHOLD = 200000000
+
+# 2014-15 and 2015-16 keep the on-time filings on a sheet named after the year,
+# later workbooks keep them (next to the late filings) on the second sheet
+YEAR_NAMED_SHEETS = ('2014-15', '2015-16')
+
+# the first (2013-14) workbook has one sheet per filing status
+BASE_YEAR_SHEETS = {'public': 'December', 'private': 'March'}
+
+
+def income_year_of(path):
+    """Return the income year ('2014-15') a workbook relates to."""
+    return os.path.basename(path)[0:7]
+
+
+def sheet_for(income_year):
+    """Return the sheet holding the income tax details for `income_year`."""
+    if income_year in YEAR_NAMED_SHEETS:
+        return income_year
+    return 1
+
+
+def parse_sheet(path, sheet_name):
+    """Parse a single sheet of a workbook into a DataFrame."""
+    return pd.read_excel(path, sheet_name = sheet_name)
+
+
+def stream_sheet(path, sheet_name, min_total_income = None, require_abn = False, income_year = None):
+    """Parse a sheet row by row, keeping only the rows that pass the filters.
+
+    - `min_total_income`: drop rows whose 'Total income $' is below it
+    - `require_abn`: drop rows without an ABN
+    - `income_year`: drop late filings, i.e. rows whose 'Income year' differs
+      (ignored for sheets without an 'Income year' column)
+
+    The first row of the sheet holds the column names, as in `pd.read_excel`.
+    """
+    wb = openpyxl.load_workbook(path, read_only = True, data_only = True)
+    try:
+        if isinstance(sheet_name, int):
+            ws = wb.worksheets[sheet_name]
+        else:
+            ws = wb[sheet_name]
+        rows = ws.iter_rows(values_only = True)
+        header = list(next(rows, ()))
+        while header and header[-1] is None:
+            header.pop()
+        width = len(header)
+        income = header.index('Total income $') if min_total_income is not None else None
+        abn = header.index('ABN') if require_abn else None
+        year = header.index('Income year') if income_year is not None and 'Income year' in header else None
+
+        kept = []
+        for row in rows:
+            row = row[:width]
+            if income is not None:
+                value = row[income] if income < len(row) else None
+                if not isinstance(value, (int, float)) or not value >= min_total_income:
+                    continue
+            if abn is not None and (abn >= len(row) or row[abn] is None or row[abn] == ''):
+                continue
+            if year is not None and (year >= len(row) or row[year] != income_year):
+                continue
+            if all(value is None for value in row):
+                continue
+            if len(row) < width:
+                row = row + (None,) * (width - len(row))
+            kept.append(row)
+    finally:
+        wb.close()
+
+    df = pd.DataFrame.from_records(kept, columns = header)
+    for column in ('ABN', 'Total income $', 'Taxable income $', 'Tax payable $'):
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors = 'coerce')
+    return df
+
+
+def read_sheet(path, sheet_name, cache = None, **filters):
+    """Parse a sheet, going through `cache` (a `SheetCache`) when one is given.
+
+    With `filters` (see `stream_sheet`) the sheet is streamed and filtered
+    while it is read, otherwise it is parsed whole with `pd.read_excel`.
+    """
+    parse = stream_sheet if filters else parse_sheet
+    if cache is None:
+        return parse(path, sheet_name, **filters)
+    return cache.read(path, sheet_name, parse, filters)
+
+
+def _suffix_columns(df, year):
+    return df.rename(columns = {'Total income $' : 'Total income_' + year,
+                                'Taxable income $' : 'Taxable income_' + year,
+                                'Tax payable $' : 'Tax payable_' + year})
+
+
+def clean_income_year(df, income_year, threshold = INCOME_THRESHOLD):
+    """Apply the part I cleaning rules to one year of data.
+
+    Keeps firms with `threshold` ($200M) or more in total income (all firms
+    when it is None) and an ABN, and suffixes the three tax columns with the
+    year ('Total income_14') so the years can be told apart once they are merged.
+    """
+    if income_year in YEAR_NAMED_SHEETS:
+        df['Income year'] = income_year
+    year = income_year[2:4]
+    if threshold is not None:
+        df = df[df['Total income $'] >= threshold].reset_index(drop = True)
+    df = df.dropna(subset = ['ABN'])
+    return _suffix_columns(df, year)
+
+
+def above_threshold(frame, threshold = INCOME_THRESHOLD):
+    """The rows of a year suffixed frame ('Total income_14') with `threshold` or more in total income."""
+    income = frame['Total income_' + year_suffix(frame)]
+    return frame[income >= threshold].reset_index(drop = True)
+
+
+def split_income_year(path, cache = None, threshold = INCOME_THRESHOLD):
+    """Parse the workbook at `path` once, returning (income year, df, without_abn).
+
+    `df` is the cleaned year of `read_income_year` and `without_abn` the rows
+    it leaves out for a missing ABN, with the same threshold and late filing
+    rules and the same year suffixed columns, for matching the firms by name
+    (see `resolve`). The threshold and late filing rules are pushed down into
+    the reader; the rows are split on the ABN afterwards.
+    """
+    income_year = income_year_of(path)
+    df = read_sheet(path, sheet_for(income_year), cache, min_total_income = threshold, income_year = income_year)
+    missing = df['ABN'].isna().to_numpy()
+    without_abn = df[missing].reset_index(drop = True)
+    if income_year in YEAR_NAMED_SHEETS:
+        without_abn['Income year'] = income_year
+    # the missing ABNs made the column float, the others are whole numbers
+    df = df[~missing].reset_index(drop = True).astype({'ABN': 'int64'})
+    df = clean_income_year(df, income_year, threshold)
+    return income_year, df, _suffix_columns(without_abn, income_year[2:4])
+
+
+def read_income_year(path, cache = None, threshold = INCOME_THRESHOLD):
+    """Parse and clean the workbook at `path`, returning (income year, df)."""
+    income_year, df, _ = split_income_year(path, cache, threshold)
+    return income_year, df
+
+
+def read_without_abn(path, cache = None, threshold = INCOME_THRESHOLD):
+    """The rows of the workbook at `path` that `read_income_year` drops for a missing ABN."""
+    return split_income_year(path, cache, threshold)[2]
+
+
+def _read_sheet(path, sheet_name, cache, filters):
+    return read_sheet(path, sheet_name, cache, **filters)
+
+
+def read_sheets(sheets, max_workers = None, cache = None, **filters):
+    """Parse a list of (path, sheet name) pairs, one worker process per sheet.
+
+    `max_workers` defaults to the number of CPUs; 1 parses everything in the
+    calling process. `filters` are passed on to `stream_sheet`. Frames are
+    returned in the order of `sheets`.
+    """
+    return map_processes(_read_sheet, [(path, sheet_name, cache, filters) for path, sheet_name in sheets], max_workers)
+
+
+def load_income_years(files, max_workers = None, cache = None, threshold = INCOME_THRESHOLD, without_abn = False):
+    """Parse and clean the yearly workbooks in parallel.
+
+    Returns the `dict_df` used in part I: cleaned frames keyed by income year
+    ('2014-15'), in the order of `files`. Sheets already in `cache` are read
+    back from it instead of being parsed again. With `without_abn`, returns
+    (dict_df, the rows without an ABN keyed the same way), both from the same
+    pass over every sheet (see `split_income_year`).
+    """
+    results = map_processes(split_income_year, [(file, cache, threshold) for file in files], max_workers)
+    frames = {income_year: df for income_year, df, _ in results}
+    if not without_abn:
+        return frames
+    return frames, {income_year: rows for income_year, _, rows in results}
+
+
+def read_base_year(path, max_workers = None, cache = None, threshold = INCOME_THRESHOLD):
+    """Parse the public and private sheets of the base (2013-14) workbook.
+
+    Returns the `df_public_private` of part I: both sheets stacked with a
+    'Public/Private' column, firms without an ABN (or below `threshold`, unless
+    it is None) left out and the tax columns suffixed with the year ('_13').
+    """
+    filters = {'require_abn': True}
+    if threshold is not None:
+        filters['min_total_income'] = threshold
+    frames = read_sheets([(path, sheet_name) for sheet_name in BASE_YEAR_SHEETS.values()],
+                         max_workers, cache, **filters)
+    return stack_base_year(*frames, income_year = income_year_of(path))
+
+
+def stack_base_year(public, private, income_year = '2013-14'):
+    """Stack the public and private sheets of the base year as `read_base_year` does."""
+    df = pd.concat([public, private], keys = list(BASE_YEAR_SHEETS)).reset_index(level = 0)
+    df = df.rename(columns = {'level_0': 'Public/Private'}).reset_index(drop = True)
+    return _suffix_columns(df, income_year[2:4])
@@ -0,0 +1,78 @@
+"""Wide merge of the yearly ATO frames onto the base year.
+
+Chaining `pd.merge(df_merge, dict_df[year], how = 'left', on = ['Name', 'ABN'])`
+copies the whole, growing frame once per year. `wide_merge` instead looks up
+the base firms in every yearly frame through an integer ABN index and builds
+all the year columns in a single pass.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+KEYS = ['Name', 'ABN']
+
+
+def chained_merge(base, frames):
+    """Left merge `frames` onto `base` one after another (the part I loop)."""
+    df_merge = base
+    for frame in frames:
+        df_merge = pd.merge(df_merge, frame, how = 'left', on = KEYS)
+    return df_merge
+
+
+def _abn_codes(abn):
+    # ABNs are read as floats when a sheet has missing values, missing ABNs
+    # get -1 so that they never match
+    abn = pd.to_numeric(abn, errors = 'coerce').to_numpy(dtype = 'float64', na_value = np.nan)
+    missing = np.isnan(abn)
+    codes = np.where(missing, -1, abn).astype('int64')
+    return codes, missing
+
+
+def _positions(base_codes, base_missing, base_names, frame):
+    """Row of `frame` matching each base firm, -1 when there is none."""
+    codes, missing = _abn_codes(frame['ABN'])
+    index = pd.Index(codes[~missing])
+    if not index.is_unique:
+        return None
+    found = index.get_indexer(base_codes)
+    hit = (found >= 0) & ~base_missing
+    positions = np.full(len(base_codes), -1, dtype = 'int64')
+    positions[hit] = np.flatnonzero(~missing)[found[hit]]
+    # a firm only matches when the name agrees as well
+    names = frame['Name'].to_numpy()
+    matched = positions >= 0
+    same = np.zeros(len(positions), dtype = bool)
+    same[matched] = names[positions[matched]] == base_names[matched]
+    positions[~same] = -1
+    return positions
+
+
+def wide_merge(base, frames):
+    """Left join every frame in `frames` onto `base` on Name and ABN.
+
+    Gives the same result as `chained_merge`. Falls back to it when a yearly
+    frame lists the same ABN twice or two frames share a value column, since
+    the merge then duplicates rows or suffixes the columns.
+    """
+    frames = list(frames)
+    base = base.reset_index(drop = True)
+    seen = set(base.columns)
+    for frame in frames:
+        values = [column for column in frame.columns if column not in KEYS]
+        if seen.intersection(values):
+            return chained_merge(base, frames)
+        seen.update(values)
+
+    base_codes, base_missing = _abn_codes(base['ABN'])
+    base_names = base['Name'].to_numpy()
+    columns = {}
+    for frame in frames:
+        positions = _positions(base_codes, base_missing, base_names, frame)
+        if positions is None:
+            return chained_merge(base, frames)
+        for column in frame.columns:
+            if column not in KEYS:
+                columns[column] = take(frame[column].array, positions, allow_fill = True)
+
+    return pd.concat([base, pd.DataFrame(columns, index = base.index)], axis = 1)
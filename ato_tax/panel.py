@@ -0,0 +1,75 @@
+"""Long (firm-year) panel of the ATO tax data.
+
+Part I gets to the panel by widening the data, melting it and pivoting it
+back. `build_panel` gets to the same frame by stacking the yearly frames and
+keeping only the firms of the base (2013-14) year through a semi-join.
+"""
+import pandas as pd
+
+from .schema import enforce_panel_schema
+
+METRICS = ['Total income', 'Taxable income', 'Tax payable']
+KEYS = ['Name', 'ABN', 'Public/Private', 'Income Year']
+PANEL_COLUMNS = KEYS + METRICS
+
+
+def year_suffix(frame):
+    """Return the two digit year suffix ('14') of the tax columns in `frame`."""
+    for column in frame.columns:
+        if isinstance(column, str) and column.startswith('Total income_'):
+            return column[len('Total income_'):]
+    raise ValueError('frame has no "Total income_<year>" column')
+
+
+def _stack(frame, suffix):
+    # one year of data with the suffix stripped from the tax columns
+    long = frame[['Name', 'ABN'] + [metric + '_' + suffix for metric in METRICS]]
+    long.columns = ['Name', 'ABN'] + METRICS
+    return long.assign(**{'Income Year': 2000 + int(suffix)})
+
+
+def year_rows(frame, firms):
+    """Return the rows of one later year for the base `firms`.
+
+    `firms` holds the Name, ABN and Public/Private of the base year firms; the
+    semi-join on them also brings in the filing status.
+    """
+    year = _stack(frame, year_suffix(frame))
+    return year.merge(firms, how = 'inner', on = ['Name', 'ABN'])
+
+
+def tidy_panel(panel):
+    """Average duplicate firm-years, sort and set the panel dtypes (see `schema`)."""
+    panel = panel.dropna(subset = METRICS, how = 'all')
+    if panel.duplicated(subset = KEYS).any():
+        # firms listed twice in a year are averaged, as pivot_table does
+        panel = panel.groupby(KEYS, as_index = False, sort = False)[METRICS].mean()
+    panel = panel.sort_values(KEYS, ignore_index = True)
+    return enforce_panel_schema(panel[PANEL_COLUMNS])
+
+
+def fill_undisclosed(panel):
+    """Set the blank Taxable income and Tax payable fields to zero.
+
+    The ATO leaves negative taxable incomes and zero tax liabilities blank.
+    """
+    panel[['Tax payable', 'Taxable income']] = panel[['Tax payable', 'Taxable income']].fillna(0)
+    return panel
+
+
+def build_panel(base, frames):
+    """Stack the base year and the yearly frames into the firm-year panel.
+
+    `base` is the first year with its 'Public/Private' column, `frames` the
+    later years; all of them with year suffixed tax columns ('Tax payable_14').
+    Only firms (Name and ABN) present in `base` are kept and they take their
+    filing status from it. Returns one row per firm, status and year with the
+    columns `PANEL_COLUMNS`, as the melt/pivot_table round trip would.
+    """
+    base = base.dropna(subset = ['Name', 'ABN'])
+    firms = base[['Name', 'ABN', 'Public/Private']].drop_duplicates()
+
+    stacked = [_stack(base, year_suffix(base)).assign(**{'Public/Private': base['Public/Private']})]
+    for frame in frames:
+        stacked.append(year_rows(frame, firms))
+    return tidy_panel(pd.concat(stacked, ignore_index = True))
@@ -0,0 +1,49 @@
+"""Largest and smallest values of a metric per year and filing status.
+
+`final1.sort_values('% change in total income')` sorts the whole panel to
+look at its first rows. `top_movers` only selects the `n` largest (or
+smallest) values of every cell with `np.argpartition`, which is linear in
+the size of the cell, and sorts just those.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _select(values, n, largest):
+    # positions of the n largest / smallest values, best first
+    keys = -values if largest else values
+    if len(keys) > n:
+        chosen = np.argpartition(keys, n - 1)[:n]
+    else:
+        chosen = np.arange(len(keys))
+    return chosen[np.argsort(keys[chosen], kind = 'stable')]
+
+
+def top_movers(panel, metric, n = 10, by = ('Income Year', 'Public/Private'), largest = True):
+    """The `n` firm-years with the largest (or smallest) `metric` in every `by` cell.
+
+    Missing values are never selected. Returns the selected panel rows, cell
+    by cell and best first, with a 'rank' column starting at 1.
+    """
+    if n < 1:
+        raise ValueError('n must be at least 1')
+    values = panel[metric].to_numpy(dtype = 'float64')
+    valid = np.flatnonzero(~np.isnan(values))
+    by = list(by)
+
+    positions, ranks = [], []
+    if by:
+        cells = panel.iloc[valid][by].groupby(by, observed = True, sort = True).indices.values()
+    else:
+        cells = [np.arange(len(valid))]
+    for cell in cells:
+        rows = valid[cell]
+        chosen = rows[_select(values[rows], n, largest)]
+        positions.append(chosen)
+        ranks.append(np.arange(1, len(chosen) + 1))
+
+    if not positions:
+        return panel.iloc[:0].assign(rank = pd.Series(dtype = 'int64'))
+    movers = panel.iloc[np.concatenate(positions)].copy()
+    movers['rank'] = np.concatenate(ranks)
+    return movers
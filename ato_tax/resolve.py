@@ -0,0 +1,165 @@
+"""Matching rows without an ABN to known firms by name.
+
+Part I drops every row without an ABN, so a firm whose ABN is blank in one
+year loses that year. `NameIndex` matches such rows to the firms of the
+panel on their normalized names (see `firms.normalize_name`):
+
+- names are compared as sets of character 3-grams, the confidence of a match
+  is the Jaccard similarity of the two sets (1.0 for the same normalized name)
+- candidates come from an inverted index from 3-gram to names, stored as two
+  flat arrays (CSR); 3-grams shared by many names ('PTY', 'LTD') are left out
+  of it, so a query only ever looks at names sharing a rare 3-gram with it and
+  matching stays far below comparing all pairs
+- a name with the same normalized form is found through a dict first, so
+  names made only of common 3-grams still match themselves
+"""
+import numpy as np
+import pandas as pd
+
+from .firms import normalize_name
+
+# 3-grams found in more than this share of the names are not used to find candidates
+MAX_GRAM_SHARE = 0.01
+
+# candidates scored exactly per query, the most similar on their rare 3-grams
+CANDIDATES = 20
+
+
+def trigrams(name):
+    """The set of character 3-grams of the normalized `name`, padded with a space."""
+    name = ' %s ' % normalize_name(name)
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+
+def _csr(lists, dtype = 'int32'):
+    # a list of integer lists as (indptr, flat values)
+    indptr = np.zeros(len(lists) + 1, dtype = 'int64')
+    np.cumsum([len(values) for values in lists], out = indptr[1:])
+    values = np.fromiter((value for values in lists for value in values), dtype = dtype, count = indptr[-1])
+    return indptr, values
+
+
+class NameIndex:
+    """Inverted 3-gram index over the names of known firms."""
+
+    def __init__(self, names, abns):
+        self.names = list(names)
+        self.abns = np.asarray(abns, dtype = 'int64')
+        self.vocabulary = {}
+        grams = [sorted(self.vocabulary.setdefault(gram, len(self.vocabulary)) for gram in trigrams(name))
+                 for name in self.names]
+        # forward index: the sorted 3-gram ids of every name
+        self.name_indptr, self.name_grams = _csr(grams)
+
+        # inverted index: the names holding every 3-gram, without the common ones
+        order = np.argsort(self.name_grams, kind = 'stable')
+        name_ids = np.repeat(np.arange(len(self.names), dtype = 'int32'), np.diff(self.name_indptr))
+        counts = np.bincount(self.name_grams, minlength = len(self.vocabulary))
+        self.gram_indptr = np.zeros(len(self.vocabulary) + 1, dtype = 'int64')
+        np.cumsum(counts, out = self.gram_indptr[1:])
+        self.postings = name_ids[order]
+        self.rare = counts <= max(1, MAX_GRAM_SHARE * len(self.names))
+        self.rare_counts = np.bincount(name_ids, weights = self.rare[self.name_grams],
+                                       minlength = len(self.names)).astype('int64')
+
+        # positions of every normalized name
+        self.exact = {}
+        for position, name in enumerate(self.names):
+            self.exact.setdefault(normalize_name(name), []).append(position)
+
+    @classmethod
+    def from_panel(cls, panel):
+        """Index the distinct (Name, ABN) pairs of a panel or yearly frame."""
+        firms = panel[['Name', 'ABN']].dropna().drop_duplicates()
+        return cls(firms['Name'].astype(str), firms['ABN'])
+
+    def __len__(self):
+        return len(self.names)
+
+    def match(self, name, limit = 1):
+        """The `limit` best matches of `name` as (position, confidence), best first."""
+        exact = [(position, 1.0) for position in self.exact.get(normalize_name(name), [])]
+        if len(exact) >= limit:
+            return exact[:limit]
+        query = trigrams(name)
+        size = len(query)
+        grams = np.array(sorted(self.vocabulary[gram] for gram in query if gram in self.vocabulary), dtype = 'int32')
+        rare = grams[self.rare[grams]]
+        if not len(rare):
+            return exact
+        candidates = np.concatenate([self.postings[self.gram_indptr[gram]:self.gram_indptr[gram + 1]]
+                                     for gram in rare])
+        candidates, shared = np.unique(candidates, return_counts = True)
+        if len(candidates) > CANDIDATES:
+            # Jaccard similarity over the rare 3-grams only, to pick the ones worth scoring
+            estimate = shared / (len(rare) + self.rare_counts[candidates] - shared)
+            candidates = candidates[np.argpartition(-estimate, CANDIDATES - 1)[:CANDIDATES]]
+
+        scored = []
+        for candidate in candidates:
+            their = self.name_grams[self.name_indptr[candidate]:self.name_indptr[candidate + 1]]
+            common = np.intersect1d(grams, their, assume_unique = True).size
+            scored.append((common / (size + len(their) - common), int(candidate)))
+        scored.sort(key = lambda item: (-item[0], item[1]))
+        found = [position for position, _ in exact]
+        return exact + [(candidate, confidence) for confidence, candidate in scored
+                        if candidate not in found][:limit - len(exact)]
+
+    def resolve(self, names):
+        """Best match of every name: a frame with 'Name', 'matched Name', 'ABN' and 'confidence'."""
+        rows = []
+        for name in names:
+            found = self.match(name)
+            if found:
+                candidate, confidence = found[0]
+                rows.append((name, self.names[candidate], self.abns[candidate], confidence))
+            else:
+                rows.append((name, None, np.nan, 0.0))
+        return pd.DataFrame(rows, columns = ['Name', 'matched Name', 'ABN', 'confidence'])
+
+
+# what became of a row without an ABN
+STATUSES = ['matched', 'below cut-off', 'ABN already in the frame', 'ABN matched more than once']
+
+
+def resolve_missing_abns(frame, index, min_confidence = 0.9):
+    """Match the rows of `frame` without an ABN to firms of `index`.
+
+    Returns those rows with 'confidence' and 'status' (one of `STATUSES`)
+    columns. The 'matched' rows are renamed to the matched firm and given its
+    ABN, so that they join on Name and ABN like any other row. A match below
+    `min_confidence` is not used, nor one to an ABN the frame already has a
+    row for, nor one to an ABN that several rows matched: these rows keep
+    their name and a missing ABN.
+    """
+    missing = frame[frame['ABN'].isna()].copy()
+    matches = index.resolve(missing['Name'].astype(str))
+    matches.index = missing.index
+    confident = matches['confidence'] >= min_confidence
+    known = matches['ABN'].isin(frame['ABN'].dropna())
+    # only the matches that would be used can clash, a discarded guess does not count
+    usable = confident & ~known
+    repeated = pd.Series(False, index = matches.index)
+    repeated[usable] = matches.loc[usable, 'ABN'].duplicated(keep = False)
+    status = np.select([~confident, known, repeated], STATUSES[1:], default = STATUSES[0])
+    keep = status == STATUSES[0]
+
+    missing['confidence'] = matches['confidence']
+    missing['status'] = pd.Categorical(status, categories = STATUSES)
+    missing.loc[keep, 'Name'] = matches.loc[keep, 'matched Name']
+    missing.loc[keep, 'ABN'] = matches.loc[keep, 'ABN']
+    return missing
+
+
+def resolve_income_year(frame, without_abn, index, income_year, min_confidence = 0.9):
+    """Add the rows of `without_abn` that `resolve_missing_abns` matches to `frame`.
+
+    `frame` and `without_abn` are the cleaned rows of one income year and the
+    rows it dropped for a missing ABN (see `loader.split_income_year`); only
+    the latter of `income_year` are matched. Returns the extended frame and
+    the number of rows without an ABN by status.
+    """
+    without_abn = without_abn[without_abn['Income year'] == income_year].drop('Income year', axis = 1)
+    resolved = resolve_missing_abns(pd.concat([frame, without_abn]), index, min_confidence)
+    matched = resolved[resolved['status'] == STATUSES[0]].drop(['confidence', 'status'], axis = 1)
+    return pd.concat([frame, matched], ignore_index = True), resolved['status'].value_counts(sort = False)
@@ -0,0 +1,83 @@
+"""Consistency rules for the firm-year panel.
+
+The three disclosed line items are tied together: taxable income is total
+income less deductions, and tax payable is 30% of taxable income less tax
+credits. Firm-years breaking these relationships usually point at a data
+problem (or a very unusual firm) and show up later as inf / NaN ratios.
+
+Rules are declarative: an ID mapped to a description and a vectorized
+predicate over a chunk of the panel. `screen` runs every rule over the panel
+chunk by chunk, so memory use and rows per second do not depend on the size
+of the panel, and returns one exceptions row per violating firm-year and rule.
+"""
+import numpy as np
+import pandas as pd
+
+from .panel import KEYS, METRICS
+
+STATUTORY_RATE = 0.30
+
+# ETRs further than this from the statutory rate are flagged
+RATE_TOLERANCE = 0.15
+
+CHUNK_SIZE = 1000000
+
+
+# rule ID -> (description, function of a panel chunk returning a boolean Series)
+RULES = {
+    'TAXABLE_ABOVE_TOTAL': ('Taxable income is greater than Total income',
+                            lambda chunk: chunk['Taxable income'] > chunk['Total income']),
+    'TAX_WITHOUT_TAXABLE': ('Tax payable without a positive Taxable income',
+                            lambda chunk: (chunk['Tax payable'] > 0) & (chunk['Taxable income'] <= 0)),
+    'TAX_ABOVE_TAXABLE': ('Tax payable is greater than Taxable income',
+                          lambda chunk: (chunk['Taxable income'] > 0) & (chunk['Tax payable'] > chunk['Taxable income'])),
+    'RATE_FAR_FROM_STATUTORY': ('Tax payable is more than %d points away from %d%% of Taxable income'
+                                % (RATE_TOLERANCE * 100, STATUTORY_RATE * 100),
+                                lambda chunk: (chunk['Taxable income'] > 0)
+                                              & ((chunk['Tax payable'] / chunk['Taxable income'] - STATUTORY_RATE).abs()
+                                                 > RATE_TOLERANCE)),
+    'NEGATIVE_TAX': ('Tax payable is negative',
+                     lambda chunk: chunk['Tax payable'] < 0),
+    'MISSING_VALUE': ('Total income, Taxable income or Tax payable is missing',
+                      lambda chunk: chunk[METRICS].isna().any(axis = 1)),
+}
+
+
+def chunks(panel, chunk_size = CHUNK_SIZE):
+    """Split `panel` into consecutive row chunks of at most `chunk_size` rows."""
+    for start in range(0, len(panel), chunk_size):
+        yield panel.iloc[start:start + chunk_size]
+
+
+def screen(panel, rules = None, chunk_size = CHUNK_SIZE):
+    """Return the exceptions table: one row per firm-year breaking a rule.
+
+    `panel` is a DataFrame (screened in chunks of `chunk_size` rows) or any
+    iterable of panel frames, e.g. one per income year. `rules` maps a rule ID
+    to (description, predicate), default `RULES`; a missing value never
+    breaks a rule other than MISSING_VALUE. Columns: 'rule', 'row' (the
+    index label of the firm-year in `panel`) and the panel keys and metrics.
+    """
+    rules = RULES if rules is None else rules
+    frames = chunks(panel, chunk_size) if isinstance(panel, pd.DataFrame) else panel
+
+    found = []
+    for chunk in frames:
+        for rule, (description, predicate) in rules.items():
+            hits = np.flatnonzero(predicate(chunk).fillna(False).to_numpy(dtype = bool))
+            if len(hits):
+                rows = chunk.iloc[hits][[column for column in KEYS + METRICS if column in chunk.columns]]
+                found.append(rows.assign(rule = rule).rename_axis('row').reset_index())
+    if not found:
+        return pd.DataFrame(columns = ['rule', 'row'] + KEYS + METRICS)
+    exceptions = pd.concat(found, ignore_index = True)
+    exceptions['rule'] = pd.Categorical(exceptions['rule'], categories = list(rules))
+    return exceptions[['rule'] + [column for column in exceptions.columns if column != 'rule']]
+
+
+def rule_counts(exceptions, rules = None):
+    """Number of violating firm-years per rule, with the rule descriptions."""
+    rules = RULES if rules is None else rules
+    counts = exceptions['rule'].value_counts(sort = False).reindex(list(rules), fill_value = 0)
+    return pd.DataFrame({'description': [rules[rule][0] for rule in counts.index],
+                         'firm-years': counts.to_numpy()}, index = counts.index.rename('rule'))
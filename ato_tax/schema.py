@@ -0,0 +1,57 @@
+"""Column types of the firm-year panel.
+
+Firm names and the filing status repeat on every firm-year row, so they are
+stored as categoricals; the ABN is an integer (missing ABNs never reach the
+panel), the income year a small integer and the money columns float64.
+"""
+import pandas as pd
+
+# alphabetical, so that sorting on the status keeps the order of plain strings
+FILING_STATUS = pd.CategoricalDtype(['private', 'public'])
+
+PANEL_DTYPES = {'Name': 'category',
+                'ABN': 'int64',
+                'Public/Private': FILING_STATUS,
+                'Income Year': 'int16',
+                'Total income': 'float64',
+                'Taxable income': 'float64',
+                'Tax payable': 'float64'}
+
+# how part I used to keep the panel: python strings and a float ABN
+LEGACY_DTYPES = {'Name': object,
+                 'ABN': 'float64',
+                 'Public/Private': object,
+                 'Income Year': 'int64'}
+
+
+def enforce_panel_schema(panel):
+    """Return `panel` with the `PANEL_DTYPES` column types.
+
+    Raises ValueError when a key column has missing values or a filing
+    status other than 'public' / 'private', rather than silently coercing it.
+    """
+    missing = [column for column in ('Name', 'ABN', 'Income Year')
+               if column in panel.columns and panel[column].isna().any()]
+    if missing:
+        raise ValueError('panel has missing values in %s' % ', '.join(missing))
+    if 'Public/Private' in panel.columns:
+        unknown = set(panel['Public/Private'].dropna().unique()) - set(FILING_STATUS.categories)
+        if unknown:
+            raise ValueError('unknown filing status %s' % ', '.join(sorted(map(str, unknown))))
+    dtypes = {column: dtype for column, dtype in PANEL_DTYPES.items() if column in panel.columns}
+    return panel.astype(dtypes)
+
+
+def memory_report(panel):
+    """Compare the memory footprint of `panel` with and without the schema.
+
+    Returns bytes per column (deep, so python strings are counted) for the
+    old object/float layout and the typed layout, plus a total row.
+    """
+    legacy = panel.astype({column: dtype for column, dtype in LEGACY_DTYPES.items() if column in panel.columns})
+    typed = enforce_panel_schema(panel)
+    report = pd.DataFrame({'before': legacy.memory_usage(index = False, deep = True),
+                           'after': typed.memory_usage(index = False, deep = True)})
+    report.loc['Total'] = report.sum()
+    report['saved %'] = (1 - report['after'] / report['before']) * 100
+    return report
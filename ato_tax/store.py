@@ -0,0 +1,231 @@
+"""Columnar on-disk store of the firm-year panel.
+
+Part I used to hand the panel to part II as a pickle, which has to be read
+back whole. The store is a directory with one uncompressed Arrow IPC file per
+income year and a `manifest.json` holding the format version and the column
+schema. Opening it only reads the manifest; the year files are memory mapped
+on first use, without reading or copying them. A column is converted to pandas
+the first time it is asked for and kept: joining its years into one Series
+copies the values once, so ask for the columns you need rather than the panel.
+
+New income years are added with `append_income_year`, which parses only the
+new workbook and writes only that year's file. The manifest records which
+workbooks (by content hash) are already in the store.
+
+The rows of a year file are ordered by ABN, and the store keeps the
+`firms.FirmIndex` of its panel (the row ranges of every firm in the year
+files) in `firms.npz`, so a firm's history is read without scanning the
+panel. `append_income_year` adds the new year to it rather than rebuilding it.
+
+Usage:
+    python -m ato_tax.store <store directory> <workbook> [<workbook> ...]
+"""
+import json
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+
+from common.files import file_digest
+
+from .firms import FirmIndex, sort_by_year_and_abn
+from .loader import above_threshold, split_income_year
+from .panel import fill_undisclosed, tidy_panel, year_rows
+from .resolve import NameIndex, resolve_income_year
+
+FORMAT = 'ato-panel'
+VERSION = 2
+MANIFEST = 'manifest.json'
+FIRM_INDEX = 'firms.npz'
+
+
+def _year_file(year):
+    return '%d.arrow' % year
+
+
+def _write_manifest(root, manifest):
+    path = os.path.join(root, MANIFEST)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent = 2, sort_keys = True)
+    os.replace(tmp, path)
+
+
+def _write_year(root, year, table):
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'ato-panel-version'] = str(VERSION).encode()
+    table = table.replace_schema_metadata(metadata)
+    path = os.path.join(root, _year_file(year))
+    with pa.OSFile(path + '.tmp', 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(path + '.tmp', path)
+
+
+def _write_firm_index(root, firms):
+    path = os.path.join(root, FIRM_INDEX)
+    with open(path + '.tmp', 'wb') as f:
+        firms.save(f)
+    os.replace(path + '.tmp', path)
+
+
+def _workbook_entry(path):
+    return {'income_year': os.path.basename(path)[0:7], 'sha256': file_digest(path)}
+
+
+def _storage_schema(panel):
+    # categorical codes are stored as int32 in every year file, whatever the
+    # number of categories, so that the years can be read back as one column
+    schema = pa.Schema.from_pandas(panel, preserve_index = False)
+    for i, field in enumerate(schema):
+        if pa.types.is_dictionary(field.type):
+            schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), field.type.value_type)))
+    return schema
+
+
+def write_panel(panel, root, workbooks = ()):
+    """Write the firm-year `panel` to the store directory `root`.
+
+    Every income year goes to its own file so that years can be read, and
+    later added, independently; its rows are ordered by ABN. `workbooks` are
+    the files the panel was built from; they are recorded in the manifest. The
+    firm index of the panel is written along with it. An existing store at
+    `root` is replaced.
+    """
+    os.makedirs(root, exist_ok = True)
+    panel = sort_by_year_and_abn(panel)
+    schema = _storage_schema(panel)
+    years = {}
+    for year, frame in panel.groupby('Income Year', sort = True, observed = True):
+        table = pa.Table.from_pandas(frame, schema = schema, preserve_index = False)
+        _write_year(root, int(year), table)
+        years[str(int(year))] = _year_file(int(year))
+    for name in os.listdir(root):
+        if name.endswith('.arrow') and name not in years.values():
+            os.remove(os.path.join(root, name))
+    _write_firm_index(root, FirmIndex.build(panel))
+    _write_manifest(root, {'format': FORMAT,
+                           'version': VERSION,
+                           'schema': [{'name': field.name, 'type': str(field.type)} for field in schema],
+                           'years': years,
+                           'workbooks': {os.path.basename(path): _workbook_entry(path) for path in workbooks}})
+    return PanelStore(root)
+
+
+def append_income_year(root, path, cache = None):
+    """Add the income year of the workbook at `path` to the store at `root`.
+
+    The workbook goes through the same ABN, late filing, name resolution and
+    threshold rules as in part I: its rows without an ABN are matched by name
+    to the base year firms (`resolve.resolve_income_year`) before the year is
+    cut at $200M, and the number of these rows by status is recorded under
+    the manifest's 'resolution'. The store only holds the base year firms
+    above the threshold, so unlike part I a name is not matched against the
+    smaller ones. Only firms of the store's base year are kept. The earlier
+    year files are left untouched. Returns False when the workbook is already
+    in the store, True otherwise. A republished workbook (same income year,
+    new content) replaces the year it was previously stored under. The ranges
+    of the new year replace its old ones in the store's firm index (see
+    `FirmIndex.append`).
+    """
+    store = PanelStore(root)
+    entry = _workbook_entry(path)
+    workbooks = store.manifest.get('workbooks', {})
+    if any(known['sha256'] == entry['sha256'] for known in workbooks.values()):
+        return False
+
+    income_year, frame, without_abn = split_income_year(path, cache, threshold = None)
+    year = 2000 + int(income_year[2:4])
+    base_year = store.years[0]
+    if year <= base_year:
+        raise ValueError('%s is not later than the base year %d of %s' % (path, base_year, root))
+
+    firms = store.to_pandas(['Name', 'ABN', 'Public/Private'], years = [base_year]).drop_duplicates()
+    frame, resolution = resolve_income_year(frame, without_abn, NameIndex.from_panel(firms), income_year)
+    frame = above_threshold(frame)
+    rows = sort_by_year_and_abn(fill_undisclosed(tidy_panel(year_rows(frame, firms))))
+    schema = store.table(base_year).schema
+    table = pa.Table.from_pandas(rows[schema.names], schema = schema, preserve_index = False)
+    index = store.firm_index().append(year, rows)
+    _write_year(root, year, table)
+    _write_firm_index(root, index)
+
+    manifest = dict(store.manifest)
+    manifest['years'] = dict(manifest['years'], **{str(year): _year_file(year)})
+    manifest['workbooks'] = {name: known for name, known in workbooks.items()
+                             if known['income_year'] != income_year}
+    manifest['workbooks'][os.path.basename(path)] = entry
+    manifest['resolution'] = dict(manifest.get('resolution', {}),
+                                  **{income_year: {str(status): int(count) for status, count in resolution.items()}})
+    _write_manifest(root, manifest)
+    return True
+
+
+class PanelStore:
+    """Read access to a panel written with `write_panel`.
+
+    `store['Tax payable']` returns a column as a Series and `store.to_pandas()`
+    the whole panel (or some of its columns or years) as a DataFrame.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        with open(os.path.join(root, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format') != FORMAT:
+            raise ValueError('%s is not an ATO panel store' % root)
+        if self.manifest.get('version') != VERSION:
+            raise ValueError('%s has panel store version %s, expected %d'
+                             % (root, self.manifest.get('version'), VERSION))
+        self._tables = {}
+        self._columns = {}
+
+    @property
+    def columns(self):
+        return [field['name'] for field in self.manifest['schema']]
+
+    @property
+    def years(self):
+        return sorted(int(year) for year in self.manifest['years'])
+
+    def table(self, year):
+        """Return the memory mapped Arrow table of one income year."""
+        if year not in self._tables:
+            path = os.path.join(self.root, self.manifest['years'][str(year)])
+            # the table's buffers point into the map, which stays open with them
+            self._tables[year] = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        return self._tables[year]
+
+    def __len__(self):
+        return sum(self.table(year).num_rows for year in self.years)
+
+    def __getitem__(self, column):
+        if column not in self._columns:
+            if column not in self.columns:
+                raise KeyError(column)
+            chunks = pa.chunked_array([chunk for year in self.years
+                                       for chunk in self.table(year).column(column).chunks],
+                                      type = self.table(self.years[0]).schema.field(column).type)
+            self._columns[column] = chunks.to_pandas().rename(column)
+        return self._columns[column]
+
+    def firm_index(self):
+        """The `FirmIndex` of the panel: the row ranges of every ABN in the year files."""
+        return FirmIndex.load(os.path.join(self.root, FIRM_INDEX))
+
+    def to_pandas(self, columns = None, years = None):
+        """Return the panel, or some of its `columns` and `years`, as a DataFrame."""
+        columns = list(columns) if columns is not None else self.columns
+        if years is None:
+            return pd.DataFrame({column: self[column] for column in columns})
+        tables = [self.table(year).select(columns) for year in sorted(years)]
+        return pa.concat_tables(tables).to_pandas()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    for workbook in sys.argv[2:]:
+        added = append_income_year(sys.argv[1], workbook)
+        print('%s: %s' % (workbook, 'added' if added else 'already in the store'))
@@ -0,0 +1,39 @@
+"""Yearly totals of the firm-year panel (the `ato` table of part II #1).
+
+All metrics come out of a single groupby over the panel, so asking for more
+years does not mean more passes over the data.
+"""
+import pandas as pd
+
+
+def percent_change(values):
+    # change from the previous row in %, 0 for the first row
+    change = (values / values.shift() - 1) * 100
+    change.iloc[:1] = 0
+    return change
+
+
+def yearly_summary(panel, years = None):
+    """Return the `ato` table: per income year totals and their changes.
+
+    Columns:
+    - tax_payable: total tax payable
+    - percent_change: % change in tax_payable from the previous year
+    - Total_income: total income
+    - percent_tax_payable: tax_payable as a % of Total_income
+    - Percent_change_tax_payable: % change in percent_tax_payable
+
+    `years` restricts (and orders) the table; a year with no firms has zero
+    totals. Changes are relative to the previous row and 0 for the first row.
+    """
+    totals = panel.groupby('Income Year', sort = True, observed = True)[['Tax payable', 'Total income']].sum()
+    if years is not None:
+        totals = totals.reindex(list(years), fill_value = 0)
+
+    ato = pd.DataFrame({'years': totals.index.astype('int64'),
+                        'tax_payable': totals['Tax payable'].to_numpy()})
+    ato['percent_change'] = percent_change(ato['tax_payable'])
+    ato['Total_income'] = totals['Total income'].to_numpy()
+    ato['percent_tax_payable'] = ato['tax_payable'] / ato['Total_income'] * 100
+    ato['Percent_change_tax_payable'] = percent_change(ato['percent_tax_payable'])
+    return ato
@@ -0,0 +1,103 @@
+"""Part II summary metrics over a range of income thresholds.
+
+Part I keeps a firm-year when the firm had at least $200M in total income in
+the base year and in that year, i.e. when the smaller of the two incomes (the
+firm-year's income floor) reaches the threshold. On the unfiltered panel the
+rows of every year are sorted once by that floor, highest first; the totals of
+any threshold are then a prefix of running sums, found with a binary search.
+A sweep over 100 thresholds costs about as much as a single one.
+
+    everything = unfiltered_panel(base, frames)
+    sweep = threshold_sweep(everything, [100e6, 200e6, 250e6, 500e6])
+
+where `base` and `frames` are the base year and the cleaned yearly frames of
+part I read without the threshold (`loader.load_income_years(...,
+threshold = None)`). At $200M the sweep gives back `summary.yearly_summary`
+of the part I panel as long as both come from the same frames.
+"""
+import numpy as np
+import pandas as pd
+
+from .cube import LEVEL_PREDICATES
+from .panel import build_panel, fill_undisclosed
+from .summary import percent_change
+
+_TOTALS = {'tax_payable': 'Tax payable', 'Total_income': 'Total income', 'Taxable_income': 'Taxable income'}
+
+
+def unfiltered_panel(base, frames):
+    """Build the firm-year panel of part I without the income threshold.
+
+    `base` and `frames` are the base year and the later years as part I
+    cleans them (ABNs, late filings, public firms with a blank field, names
+    resolved), only not cut at $200M; the panel is built from them with the
+    same rules.
+    """
+    return fill_undisclosed(build_panel(base, frames))
+
+
+def income_floor(panel):
+    """The smaller of each firm-year's Total income and its firm's base year Total income.
+
+    Missing for firms without a base year row.
+    """
+    base_year = panel['Income Year'].min()
+    base = panel.loc[panel['Income Year'] == base_year, ['Name', 'ABN', 'Total income']]
+    base = base.groupby(['Name', 'ABN'], observed = True, as_index = False)['Total income'].max()
+    base_income = panel[['Name', 'ABN']].merge(base, how = 'left', on = ['Name', 'ABN'])['Total income']
+    floor = np.minimum(base_income.to_numpy(dtype = 'float64'), panel['Total income'].to_numpy(dtype = 'float64'))
+    return pd.Series(floor, index = panel.index, name = 'income floor')
+
+
+def threshold_sweep(panel, thresholds, by = ('Income Year',), predicates = None):
+    """Part II yearly totals and shares of the firms kept at each threshold.
+
+    `panel` is the unfiltered panel (see `unfiltered_panel`) and `predicates`
+    maps share names to predicates as in `cube` (default `LEVEL_PREDICATES`).
+    Returns one row per threshold and `by` cell with 'firms', the
+    `summary.yearly_summary` columns (changes are taken along 'Income Year'
+    within each threshold and filing status) and the % of firms meeting each
+    predicate. Cells without any firm at a threshold have zero totals.
+    """
+    predicates = LEVEL_PREDICATES if predicates is None else predicates
+    by = list(by)
+    thresholds = np.sort(np.asarray(thresholds, dtype = 'float64'))
+    floor = income_floor(panel).to_numpy()
+
+    # one column per running sum: firm count, money totals and predicate counts
+    values = np.column_stack([np.ones(len(panel))]
+                             + [np.nan_to_num(panel[column].to_numpy(dtype = 'float64')) for column in _TOTALS.values()]
+                             + [predicate(panel).fillna(False).to_numpy(dtype = 'float64')
+                                for predicate in predicates.values()])
+    valid = ~np.isnan(floor)
+
+    results = []
+    cells = panel.loc[valid, by].groupby(by, observed = True, sort = True).indices
+    positions_of_valid = np.flatnonzero(valid)
+    for cell, positions in cells.items():
+        positions = positions_of_valid[positions]
+        order = positions[np.argsort(-floor[positions], kind = 'stable')]
+        sums = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values[order], axis = 0)])
+        # number of firm-years whose floor reaches each threshold
+        kept = len(order) - np.searchsorted(floor[order][::-1], thresholds, side = 'left')
+        cell_rows = pd.DataFrame(sums[kept], columns = ['firms'] + list(_TOTALS) + list(predicates))
+        cell_rows.insert(0, 'threshold', thresholds)
+        for column, value in zip(by, cell if isinstance(cell, tuple) else (cell,)):
+            cell_rows[column] = value
+        results.append(cell_rows)
+
+    sweep = pd.concat(results, ignore_index = True)
+    sweep['firms'] = sweep['firms'].astype('int64')
+    for name in predicates:
+        sweep[name] = (sweep[name] / sweep['firms'] * 100).where(sweep['firms'] > 0, 0)
+    sweep['percent_tax_payable'] = sweep['tax_payable'] / sweep['Total_income'] * 100
+
+    series = ['threshold'] + [column for column in by if column != 'Income Year']
+    sweep = sweep.sort_values(series + ['Income Year'] if 'Income Year' in by else series, ignore_index = True)
+    if 'Income Year' in by:
+        changes = sweep.groupby(series, sort = False)
+        sweep['percent_change'] = changes['tax_payable'].transform(percent_change)
+        sweep['Percent_change_tax_payable'] = changes['percent_tax_payable'].transform(percent_change)
+    columns = ['threshold'] + by + ['firms', 'tax_payable', 'percent_change', 'Total_income', 'percent_tax_payable',
+                                    'Percent_change_tax_payable', 'Taxable_income'] + list(predicates)
+    return sweep[[column for column in columns if column in sweep.columns]]
@@ -0,0 +1,42 @@
+"""Wall-clock scaling of the parallel ATO workbook loader.
+
+Usage:
+    python benchmarks/bench_parallel_load.py [data directory] [max workers]
+
+Times `load_income_years` over the yearly workbooks found in the data
+directory (default: current directory) with 1, 2, ... N worker processes.
+"""
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ato_tax.loader import load_income_years
+
+
+def main(argv):
+    data_dir = argv[1] if len(argv) > 1 else '.'
+    max_workers = int(argv[2]) if len(argv) > 2 else (os.cpu_count() or 1)
+
+    files = sorted(glob.glob(os.path.join(data_dir, '*-corporate-report-of-entity-tax-information.xlsx')))
+    # the first year is loaded separately in part I
+    files = [file for file in files if not os.path.basename(file).startswith('2013-14')]
+    if not files:
+        sys.exit('no corporate-report workbooks found in ' + data_dir)
+
+    print('%d workbooks, %d CPUs' % (len(files), os.cpu_count() or 1))
+    print('%8s %10s %8s' % ('workers', 'seconds', 'speedup'))
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        load_income_years(files, max_workers = workers)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = elapsed
+        print('%8d %10.2f %7.2fx' % (workers, elapsed, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
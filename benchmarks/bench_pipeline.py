@@ -0,0 +1,142 @@
+"""Time and memory of every stage of the part I / part II tax pipeline.
+
+Usage:
+    python benchmarks/bench_pipeline.py [4k|100k|1m|number of rows] [max workers]
+
+Runs the pipeline over synthetic workbooks (see `synthetic_workbooks.py`,
+generated once into .bench_data/<rows>/) stage by stage:
+
+- load: stream every sheet into a frame, unfiltered
+- filter: $200M threshold, missing ABNs and late filings
+- join: wide merge of the later years onto the base year
+- reshape: firm-year panel with the undisclosed fields set to zero
+- metrics: part II yearly summary, growth metrics, share cube and ETR table
+
+Each stage's wall time and peak memory (resident set size) is printed and
+appended to bench_pipeline.jsonl, together with the change from the previous
+run of the same size, so that regressions show up between runs.
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ato_tax.cube import share_cube
+from ato_tax.etr import etr_table
+from ato_tax.growth import growth_metrics
+from ato_tax.loader import (BASE_YEAR_SHEETS, INCOME_THRESHOLD, clean_income_year, income_year_of, read_sheets,
+                            sheet_for)
+from ato_tax.merge import wide_merge
+from ato_tax.panel import build_panel, fill_undisclosed
+from ato_tax.summary import yearly_summary
+from synthetic_workbooks import parse_size, write_workbooks
+
+RESULTS = 'bench_pipeline.jsonl'
+
+
+def load(base_path, paths, max_workers):
+    sheets = [(base_path, sheet_name) for sheet_name in BASE_YEAR_SHEETS.values()]
+    sheets += [(path, sheet_for(income_year_of(path))) for path in paths]
+    # an empty filter streams the whole sheet, like part I but without pushing the filters down
+    frames = read_sheets(sheets, max_workers, min_total_income = None)
+    years = [income_year_of(path) for path in paths]
+    return frames[:len(BASE_YEAR_SHEETS)], dict(zip(years, frames[len(BASE_YEAR_SHEETS):]))
+
+
+def filter_years(base_frames, year_frames):
+    base = pd.concat([frame.dropna(subset = ['ABN']) for frame in base_frames], keys = list(BASE_YEAR_SHEETS))
+    base = base[base['Total income $'] >= INCOME_THRESHOLD].reset_index(level = 0)
+    base = base.rename(columns = {'level_0': 'Public/Private', 'Total income $': 'Total income_13',
+                                  'Taxable income $': 'Taxable income_13', 'Tax payable $': 'Tax payable_13'})
+    frames = {}
+    for income_year, frame in year_frames.items():
+        frame = clean_income_year(frame, income_year)
+        frames[income_year] = frame[frame['Income year'] == income_year].drop('Income year', axis = 1)
+    return base.reset_index(drop = True), frames
+
+
+def metrics(panel):
+    panel = panel.join(growth_metrics(panel))
+    return yearly_summary(panel), share_cube(panel), etr_table(panel)
+
+
+def peak_rss_mb():
+    # high-water mark of this process and of the largest worker process (kB on Linux)
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak / 1024
+
+
+def run_stage(name, func, *args):
+    # tracemalloc would slow the openpyxl parsing down several times, so memory is the
+    # growth of the peak resident set size instead
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    result = func(*args)
+    seconds = time.perf_counter() - start
+    after = peak_rss_mb()
+    return result, {'stage': name, 'seconds': seconds, 'peak_mb': after, 'peak_growth_mb': after - before}
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output = True, text = True,
+                              cwd = os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ''
+
+
+def previous_run(n_rows):
+    if not os.path.exists(RESULTS):
+        return {}
+    with open(RESULTS) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    runs = [run for run in runs if run['rows'] == n_rows]
+    return {stage['stage']: stage for stage in runs[-1]['stages']} if runs else {}
+
+
+def main(argv):
+    n_rows = parse_size(argv[1]) if len(argv) > 1 else parse_size('4k')
+    max_workers = int(argv[2]) if len(argv) > 2 else None
+
+    data_dir = os.path.join('.bench_data', str(n_rows))
+    paths = sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir)) if os.path.isdir(data_dir) else []
+    if len(paths) < 7:
+        print('writing synthetic workbooks to %s' % data_dir)
+        paths = write_workbooks(data_dir, n_rows)
+    base_path, paths = paths[0], paths[1:]
+
+    stages = []
+    (base_frames, year_frames), stage = run_stage('load', load, base_path, paths, max_workers)
+    stages.append(stage)
+    (base, frames), stage = run_stage('filter', filter_years, base_frames, year_frames)
+    stages.append(stage)
+    _, stage = run_stage('join', wide_merge, base, frames.values())
+    stages.append(stage)
+    panel, stage = run_stage('reshape', lambda: fill_undisclosed(build_panel(base, frames.values())))
+    stages.append(stage)
+    _, stage = run_stage('metrics', metrics, panel)
+    stages.append(stage)
+
+    before = previous_run(n_rows)
+    print('%d rows, %d firm-years in the panel' % (n_rows, len(panel)))
+    print('%-8s %10s %10s %12s %10s' % ('stage', 'seconds', 'peak MB', 'peak grew MB', 'vs last'))
+    for stage in stages:
+        last = before.get(stage['stage'])
+        change = '%+9.1f%%' % ((stage['seconds'] / last['seconds'] - 1) * 100) if last else ''
+        print('%-8s %10.3f %10.1f %12.1f %10s' % (stage['stage'], stage['seconds'], stage['peak_mb'],
+                                                  stage['peak_growth_mb'], change))
+
+    with open(RESULTS, 'a') as f:
+        f.write(json.dumps({'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': _commit(), 'rows': n_rows,
+                            'panel_rows': len(panel), 'stages': stages}) + '\n')
+
+
+if __name__ == '__main__':
+    main(sys.argv)
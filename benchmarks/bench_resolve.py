@@ -0,0 +1,89 @@
+"""Build and query time of the 3-gram name index as the number of firms grows.
+
+Usage:
+    python benchmarks/bench_resolve.py [largest number of firms]
+
+Every tenth firm is queried with its name misspelled (one letter changed),
+truncated (last word dropped) or with its words reordered; the few queries
+that turn into the name of another firm are left out, so that no query has
+an exact match after normalization and every one goes through the 3-gram
+candidates. 'found %' is the share of queries whose best match is the firm
+they were made from. Before timing, `check_namesakes` makes sure that a weak
+match guessing the same firm as an exact one does not make the exact one
+ambiguous.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ato_tax.firms import normalize_name
+from ato_tax.resolve import NameIndex, resolve_missing_abns
+
+
+def make_names(n_firms, seed = 0):
+    rng = np.random.default_rng(seed)
+    letters = list('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+    words = np.array([''.join(rng.choice(letters, rng.integers(3, 9))) for _ in range(max(1000, n_firms // 5))])
+    suffixes = np.array([' PTY LTD', ' LIMITED', ' HOLDINGS PTY LTD', ' GROUP'])
+    return [' '.join(rng.choice(words, rng.integers(1, 4))) + rng.choice(suffixes) for _ in range(n_firms)]
+
+
+def make_queries(names, step = 10, seed = 1):
+    # (position of the firm, query) pairs
+    rng = np.random.default_rng(seed)
+    known = {normalize_name(name) for name in names}
+    queries = []
+    for i in range(0, len(names), step):
+        words = names[i].split()
+        if i // step % 3 == 0:
+            word = words[0]
+            at = rng.integers(len(word))
+            words[0] = word[:at] + ('Q' if word[at] == 'X' else 'X') + word[at + 1:]
+        elif i // step % 3 == 1:
+            words = words[:-1]
+        else:
+            words = words[1:] + words[:1]
+        query = ' '.join(words).lower()
+        if normalize_name(query) not in known:
+            queries.append((i, query))
+    return queries
+
+
+def check_namesakes():
+    index = NameIndex(['Qantas Airways Ltd', 'BHP Group Ltd', 'Telstra Corporation Ltd'], [1, 2, 3])
+    frame = pd.DataFrame({'Name': ['Qantas Airways Ltd.', 'Qantas Freight Services'], 'ABN': [np.nan, np.nan]})
+    resolved = resolve_missing_abns(frame, index)
+    assert resolved['status'].tolist() == ['matched', 'below cut-off'], resolved
+    assert resolved['ABN'].tolist()[0] == 1 and resolved['Name'].tolist()[0] == 'Qantas Airways Ltd'
+    # two confident matches to the same firm are still ambiguous
+    frame.loc[1, 'Name'] = 'QANTAS AIRWAYS LIMITED'
+    resolved = resolve_missing_abns(frame, index)
+    assert resolved['status'].tolist() == ['ABN matched more than once'] * 2, resolved
+
+
+def main(argv):
+    check_namesakes()
+    largest = int(argv[1]) if len(argv) > 1 else 100000
+    print('%10s %10s %10s %14s %10s' % ('firms', 'build s', 'queries', 'per query ms', 'found %'))
+    n_firms = 1000
+    while n_firms <= largest:
+        names = make_names(n_firms)
+        start = time.perf_counter()
+        index = NameIndex(names, np.arange(n_firms))
+        built = time.perf_counter() - start
+        firms, queries = zip(*make_queries(names))
+        start = time.perf_counter()
+        resolved = index.resolve(queries)
+        matched = time.perf_counter() - start
+        found = (resolved['matched Name'] == pd.Series([names[i] for i in firms])).mean() * 100
+        print('%10d %10.3f %10d %14.3f %10.1f' % (n_firms, built, len(queries), matched / len(queries) * 1000, found))
+        n_firms *= 10
+
+
+if __name__ == '__main__':
+    main(sys.argv)
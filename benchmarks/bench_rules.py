@@ -0,0 +1,50 @@
+"""Throughput of the panel consistency screen from thousands to millions of rows.
+
+Usage:
+    python benchmarks/bench_rules.py [largest number of rows]
+
+Rows per second should stay roughly flat as the panel grows.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ato_tax.rules import screen
+
+
+def make_panel(n_rows, seed = 0):
+    rng = np.random.default_rng(seed)
+    total = rng.uniform(2e8, 2e9, n_rows)
+    # a few percent of the firm-years break a rule
+    taxable = total * rng.uniform(-0.05, 1.02, n_rows)
+    tax = np.clip(taxable, 0, None) * rng.choice([0.0, 0.1, 0.3], n_rows, p = [0.02, 0.02, 0.96])
+    return pd.DataFrame({'Name': pd.Categorical.from_codes(rng.integers(0, 1000, n_rows),
+                                                           ['FIRM %d PTY LTD' % i for i in range(1000)]),
+                         'ABN': 10 ** 10 + rng.integers(0, n_rows, n_rows),
+                         'Public/Private': pd.Categorical.from_codes(rng.integers(0, 2, n_rows), ['private', 'public']),
+                         'Income Year': rng.integers(2013, 2020, n_rows).astype('int16'),
+                         'Total income': total,
+                         'Taxable income': taxable,
+                         'Tax payable': tax})
+
+
+def main(argv):
+    largest = int(argv[1]) if len(argv) > 1 else 10 ** 7
+    print('%12s %10s %12s %14s' % ('rows', 'seconds', 'exceptions', 'rows/s'))
+    n_rows = 10 ** 4
+    while n_rows <= largest:
+        panel = make_panel(n_rows)
+        start = time.perf_counter()
+        exceptions = screen(panel)
+        seconds = time.perf_counter() - start
+        print('%12d %10.3f %12d %14.0f' % (n_rows, seconds, len(exceptions), n_rows / seconds))
+        n_rows *= 10
+
+
+if __name__ == '__main__':
+    main(sys.argv)
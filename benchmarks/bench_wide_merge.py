@@ -0,0 +1,63 @@
+"""Chained pd.merge vs the single-pass wide merge at 7, 20 and 50 years.
+
+Usage:
+    python benchmarks/bench_wide_merge.py [number of firms]
+
+The yearly frames are synthetic: every year covers a random 85% of the base
+firms plus some firms that are not in the base year.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ato_tax.merge import chained_merge, wide_merge
+
+
+def make_frames(n_firms, n_years, seed = 0):
+    rng = np.random.default_rng(seed)
+    names = np.array(['FIRM %d PTY LTD' % i for i in range(2 * n_firms)], dtype = object)
+    abns = 10 ** 10 + np.arange(2 * n_firms) * 7
+    base = pd.DataFrame({'Public/Private': rng.choice(['public', 'private'], n_firms),
+                         'Name': names[:n_firms],
+                         'ABN': abns[:n_firms].astype(float),
+                         'Total income_13': rng.uniform(2e8, 2e9, n_firms),
+                         'Taxable income_13': rng.uniform(0, 5e8, n_firms),
+                         'Tax payable_13': rng.uniform(0, 1e8, n_firms)})
+    frames = []
+    for year in range(n_years):
+        rows = rng.permutation(np.concatenate([rng.choice(n_firms, int(n_firms * 0.85), replace = False),
+                                               rng.choice(np.arange(n_firms, 2 * n_firms), n_firms // 10, replace = False)]))
+        suffix = '_%02d' % (14 + year)
+        frames.append(pd.DataFrame({'Name': names[rows],
+                                    'ABN': abns[rows],
+                                    'Total income' + suffix: rng.uniform(2e8, 2e9, len(rows)),
+                                    'Taxable income' + suffix: rng.uniform(0, 5e8, len(rows)),
+                                    'Tax payable' + suffix: rng.uniform(0, 1e8, len(rows))}))
+    return base, frames
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv):
+    n_firms = int(argv[1]) if len(argv) > 1 else 20000
+    print('%d base firms' % n_firms)
+    print('%6s %12s %12s %8s' % ('years', 'chained s', 'wide s', 'speedup'))
+    for n_years in (7, 20, 50):
+        base, frames = make_frames(n_firms, n_years)
+        expected, chained = timed(chained_merge, base, frames)
+        result, wide = timed(wide_merge, base, frames)
+        pd.testing.assert_frame_equal(result, expected)
+        print('%6d %12.3f %12.3f %7.1fx' % (n_years, chained, wide, chained / wide))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,65 @@
+"""Parsing time and memory of the YEARBUILT column, string route against numeric.
+
+Usage:
+    python benchmarks/bench_year_built.py [largest number of rows]
+
+The scripts used to parse the year built with
+`astype(str).str[0:4]` and `pd.to_datetime(format = '%Y')`, which gives a
+64-bit timestamp per row; `nyc_sales.schema.parse_year_built` validates the
+numbers directly and keeps them as a nullable int16. The years are drawn like
+the rolling sales ones (float64, with blanks and 0 for unknown years) and
+both results are checked to agree on every year from 1700 on.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from nyc_sales.schema import parse_year_built
+
+
+def make_years(n_rows, seed = 0):
+    rng = np.random.default_rng(seed)
+    years = rng.integers(1800, 2022, n_rows).astype('float64')
+    unknown = rng.random(n_rows)
+    years[unknown < 0.08] = 0
+    years[unknown > 0.97] = np.nan
+    return pd.Series(years, name = 'YEARBUILT')
+
+
+def string_route(years):
+    return pd.to_datetime(years.astype(str).str[0:4], format = '%Y', errors = 'coerce')
+
+
+def timed(func, years, repeat = 3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(years)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main(argv):
+    largest = int(argv[1]) if len(argv) > 1 else 10000000
+    print('%10s %12s %12s %9s %12s %12s' % ('rows', 'string s', 'numeric s', 'speedup', 'string MB', 'numeric MB'))
+    n_rows = 100000
+    while n_rows <= largest:
+        years = make_years(n_rows)
+        before, string_seconds = timed(string_route, years)
+        after, numeric_seconds = timed(parse_year_built, years)
+        assert (before.dt.year.astype('Int16').where(before.dt.year >= 1700) == after).fillna(True).all()
+        assert before.where(before.dt.year >= 1700).isna().equals(after.isna())
+        print('%10d %12.3f %12.3f %8.1fx %12.1f %12.1f' % (n_rows, string_seconds, numeric_seconds,
+                                                           string_seconds / numeric_seconds,
+                                                           before.memory_usage(index = False) / 1e6,
+                                                           after.memory_usage(index = False) / 1e6))
+        n_rows *= 10
+
+
+if __name__ == '__main__':
+    main(sys.argv)
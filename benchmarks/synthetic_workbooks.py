@@ -0,0 +1,131 @@
+"""Synthetic ATO corporate report workbooks for benchmarking the tax pipeline.
+
+Usage:
+    python benchmarks/synthetic_workbooks.py <output directory> [4k|100k|1m|number of rows]
+
+Writes the seven workbooks part I reads (2013-14 to 2019-20) with the same
+file names, sheet names and columns as the published ones:
+
+- 2013-14: public firms on 'December', private firms on 'March'
+- 2014-15, 2015-16: on-time filings on a sheet named after the year
+- 2016-17 on: 'Income tax details' as the second sheet, with an 'Income year'
+  column and late filings of the previous year mixed in
+
+Total incomes start at the $100M disclosure threshold, blank taxable incomes
+stand for losses and blank tax payable for no tax, and a few rows have no ABN.
+The rows are spread evenly over the seven years.
+"""
+import itertools
+import os
+import sys
+
+import numpy as np
+import openpyxl
+
+SIZES = {'4k': 4000, '100k': 100000, '1m': 1000000}
+
+FIRST_YEAR = 2013
+N_YEARS = 7
+
+HEADER = ['Name', 'ABN', 'Total income $', 'Taxable income $', 'Tax payable $']
+
+# share of rows without an ABN, of late filings in the later sheets and of private firms
+MISSING_ABN = 0.02
+LATE_FILINGS = 0.05
+PRIVATE = 0.2
+
+
+def workbook_name(year):
+    return '%d-%s-corporate-report-of-entity-tax-information.xlsx' % (year, str(year + 1)[2:])
+
+
+def income_year(year):
+    return '%d-%s' % (year, str(year + 1)[2:])
+
+
+class Firms:
+    """A pool of firms with a stable name, ABN, filing status and income level."""
+
+    def __init__(self, n_firms, rng):
+        self.rng = rng
+        self.names = np.array(['SYNTHETIC %s %d PTY LTD' % (word, i) for i, word in
+                               enumerate(rng.choice(['MINING', 'RETAIL', 'ENERGY', 'FINANCE', 'HOLDINGS'], n_firms))])
+        self.abns = 10 ** 10 + rng.permutation(n_firms * 10)[:n_firms]
+        self.private = rng.random(n_firms) < PRIVATE
+        # long tailed incomes above the $100M disclosure threshold
+        self.level = 1e8 + rng.lognormal(np.log(2e8), 1.2, n_firms)
+
+    def rows(self, firms, year_label = None):
+        """Rows of one sheet for the firm positions `firms`."""
+        rng = self.rng
+        n = len(firms)
+        total = (self.level[firms] * rng.lognormal(0, 0.15, n)).round()
+        taxable = (total * rng.uniform(-0.2, 0.5, n)).round()
+        # tax credits take some firms below the 30% rate
+        tax = (taxable * np.where(rng.random(n) < 0.6, 0.3, rng.uniform(0, 0.3, n))).round()
+        abn = self.abns[firms].astype(object)
+        abn[rng.random(n) < MISSING_ABN] = None
+        for i in range(n):
+            row = [self.names[firms[i]], abn[i], float(total[i]),
+                   float(taxable[i]) if taxable[i] > 0 else None,
+                   float(tax[i]) if tax[i] > 0 else None]
+            if year_label is not None:
+                row.append(year_label)
+            yield row
+
+
+def _write(path, sheets):
+    # write only mode streams the rows to disk instead of building the workbook in memory
+    wb = openpyxl.Workbook(write_only = True)
+    info = wb.create_sheet('Information')
+    info.append(['Synthetic corporate report of entity tax information'])
+    for title, header, rows in sheets:
+        ws = wb.create_sheet(title)
+        ws.append(header)
+        for row in rows:
+            ws.append(row)
+    wb.save(path)
+
+
+def write_workbooks(directory, n_rows, seed = 0):
+    """Write the seven workbooks with about `n_rows` rows in total; returns their paths."""
+    rng = np.random.default_rng(seed)
+    per_year = max(1, n_rows // N_YEARS)
+    # about 85% of the firms file in any given year
+    firms = Firms(int(per_year / 0.85) + 1, rng)
+    n_firms = len(firms.names)
+    os.makedirs(directory, exist_ok = True)
+
+    paths = []
+    for year in range(FIRST_YEAR, FIRST_YEAR + N_YEARS):
+        path = os.path.join(directory, workbook_name(year))
+        filing = np.sort(rng.choice(n_firms, min(per_year, n_firms), replace = False))
+        if year == FIRST_YEAR:
+            public, private = filing[~firms.private[filing]], filing[firms.private[filing]]
+            sheets = [('December', HEADER, firms.rows(public)), ('March', HEADER, firms.rows(private))]
+        elif income_year(year) in ('2014-15', '2015-16'):
+            sheets = [(income_year(year), HEADER, firms.rows(filing))]
+        else:
+            late = int(len(filing) * LATE_FILINGS)
+            on_time = firms.rows(filing[late:], income_year(year))
+            late_rows = firms.rows(filing[:late], income_year(year - 1))
+            sheets = [('Income tax details', HEADER + ['Income year'], itertools.chain(late_rows, on_time))]
+        _write(path, sheets)
+        paths.append(path)
+    return paths
+
+
+def parse_size(size):
+    return SIZES[size.lower()] if size.lower() in SIZES else int(size)
+
+
+def main(argv):
+    if len(argv) < 2:
+        sys.exit(__doc__)
+    n_rows = parse_size(argv[2]) if len(argv) > 2 else SIZES['4k']
+    for path in write_workbooks(argv[1], n_rows):
+        print(path)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
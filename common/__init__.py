@@ -0,0 +1,4 @@
+"""Helpers shared by the project packages (`ato_tax`, `nyc_sales`).
+
+Nothing in here knows about a particular data set.
+"""
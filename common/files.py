@@ -0,0 +1,18 @@
+"""Content hashes of source files.
+
+Stores and caches key what they hold by the content of the workbooks it
+came from, so that a renamed file is still recognised and a republished
+one is not.
+"""
+import hashlib
+
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    """Return the sha256 hex digest of the file at `path`."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
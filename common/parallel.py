@@ -0,0 +1,24 @@
+"""Running independent jobs in worker processes.
+
+Parsing workbooks (ATO tax reports, NYC rolling sales), resampling and
+rendering figures are CPU bound, so the jobs are spread over processes; the
+results come back in the order of the jobs.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def map_processes(func, args, max_workers = None):
+    """Return `[func(*arg) for arg in args]`, computed in up to `max_workers` processes.
+
+    `max_workers` defaults to the number of CPUs. A pool is only started when
+    there is more than one worker and more than one job to share; otherwise
+    the jobs run in the calling process.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(args))
+    if max_workers <= 1:
+        return [func(*arg) for arg in args]
+    with ProcessPoolExecutor(max_workers = max_workers) as pool:
+        return list(pool.map(func, *zip(*args)))
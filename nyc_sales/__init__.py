@@ -0,0 +1,5 @@
+"""Helpers for the NYC rolling sales case (the pandemic and regression analyses).
+
+The scripts in the repository root call into these modules to load the
+yearly `{year}_{borough}.xlsx` rolling sales workbooks.
+"""
@@ -0,0 +1,162 @@
+"""Counts, sums, means and shares of the sales over any grouping dimensions.
+
+Descriptive Question #1 used to cut the tax class 2 sales into one frame per
+borough and period with chained `.loc` filters and count each of them.
+`crosstab` groups the rows once on all the dimensions and sums everything it
+needs (rows, and the sum and number of values of every value column) in that
+single pass; the margins are then added up from the cells, never from the
+rows again.
+
+`SalesCube` runs the same over a `SalesStore`, reading only the columns and
+rows the dimensions, values and filters need, and keeps the results keyed by
+filters and dimensions so that asking again is free.
+"""
+import collections
+import itertools
+import json
+
+import numpy as np
+import pandas as pd
+
+from .schema import borough_names
+from .store import SalesStore
+
+# sales from this year on are post Covid
+COVID_YEAR = 2020
+
+TOTAL = 'Total'
+
+
+def covid_period(years):
+    """'Pre Covid' / 'Post Covid' for sale years before / from `COVID_YEAR`."""
+    years = years.to_numpy(dtype = 'float64', na_value = np.nan)
+    periods = np.where(years < COVID_YEAR, 'Pre Covid', 'Post Covid').astype(object)
+    periods[np.isnan(years)] = None
+    return pd.Series(periods, dtype = object)
+
+
+# dimensions derived from a stored column: name -> (column, function of the column)
+DIMENSIONS = {
+    'Pre/Post Covid': ('saleyear', covid_period),
+    'Borough': ('BOROUGH', borough_names),
+}
+
+
+def dimension(sales, name):
+    """The values of dimension `name`: a column of `sales` or one of the `DIMENSIONS`."""
+    if name in sales.columns:
+        return sales[name]
+    if name in DIMENSIONS:
+        column, derive = DIMENSIONS[name]
+        return derive(sales[column]).set_axis(sales.index).rename(name)
+    raise KeyError(name)
+
+
+def _source_columns(dims, values):
+    columns = [DIMENSIONS[dim][0] if dim in DIMENSIONS else dim for dim in dims] + list(values)
+    return list(dict.fromkeys(columns))
+
+
+def crosstab(sales, dims, values = (), margins = True):
+    """Counts and shares of the rows of `sales` per cell of `dims`, with sums and means of `values`.
+
+    Returns one row per cell with the `dims` columns, 'count', 'share' (of all
+    the rows of `sales`, between 0 and 1) and '<value> sum' / '<value> mean'
+    (over the non-missing values) for every value column. With `margins`, the
+    subtotals over every subset of the dimensions follow, with 'Total' in
+    the dimensions added up. Rows with a missing dimension are left out of
+    the cells but not of the shares' denominator, so the shares then add up
+    to less than 1, as with counting the cells by hand.
+    """
+    dims, values = list(dims), list(values)
+    if not dims:
+        raise ValueError('crosstab needs at least one dimension')
+    frame = pd.DataFrame({dim: dimension(sales, dim) for dim in dims}, index = sales.index)
+    sums = []
+    for value in values:
+        numbers = pd.to_numeric(sales[value], errors = 'coerce').astype('float64')
+        frame[value + ' sum'] = numbers.fillna(0)
+        frame[value + ' n'] = numbers.notna().astype('int64')
+        sums += [value + ' sum', value + ' n']
+    frame['count'] = 1
+
+    # the single pass over the rows; everything below works on the cells
+    cells = frame.groupby(dims, observed = True, sort = True)[['count'] + sums].sum().reset_index()
+    tables = [cells]
+    if margins:
+        tables[0] = cells.astype({dim: object for dim in dims})
+        for size in range(len(dims) - 1, -1, -1):
+            for kept in itertools.combinations(dims, size):
+                if kept:
+                    subtotal = cells.groupby(list(kept), observed = True, sort = True)[['count'] + sums].sum()
+                    subtotal = subtotal.reset_index().astype({dim: object for dim in kept})
+                else:
+                    subtotal = cells[['count'] + sums].sum().to_frame().T
+                for dim in dims:
+                    if dim not in kept:
+                        subtotal[dim] = TOTAL
+                tables.append(subtotal[dims + ['count'] + sums])
+    cube = pd.concat(tables, ignore_index = True)
+
+    cube['share'] = cube['count'] / len(frame)
+    for value in values:
+        cube[value + ' mean'] = cube[value + ' sum'] / cube[value + ' n'].where(cube[value + ' n'] > 0)
+    columns = dims + ['count', 'share'] + [value + ' ' + stat for value in values for stat in ('sum', 'mean')]
+    return cube[columns].astype({'count': 'int64'})
+
+
+def _totals_last(labels):
+    return [label for label in labels if label != TOTAL] + [label for label in labels if label == TOTAL]
+
+
+def crosstab_table(cube, index, columns, statistic = 'share'):
+    """Pivot a `crosstab` result to `index` x `columns` cells of one `statistic`.
+
+    Other dimensions of the cube must be at their totals (or the cube must
+    not have any). The 'Total' row and column, if present, come last.
+    """
+    others = [dim for dim in cube.columns[:list(cube.columns).index('count')] if dim not in (index, columns)]
+    for dim in others:
+        cube = cube[cube[dim] == TOTAL]
+    table = cube.pivot(index = index, columns = columns, values = statistic)
+    table = table.loc[_totals_last(table.index), _totals_last(table.columns)]
+    table.columns.name = None
+    return table
+
+
+class SalesCube:
+    """Cached crosstabs over the sales store at `root`.
+
+    The store's manifest is read on every call and the workbooks' content
+    hashes are part of the cache key, so results computed before the store was
+    updated are never returned. At most `max_entries` results are kept,
+    least recently used first out.
+    """
+
+    def __init__(self, root, max_entries = 64):
+        self.root = root
+        self.max_entries = max_entries
+        self._cache = collections.OrderedDict()
+
+    def key(self, store, dims, values, filters, margins):
+        """The cache key of a crosstab: store contents, filters, dimensions, values and margins."""
+        contents = sorted((name, workbook['sha256']) for name, workbook in store.manifest['workbooks'].items())
+        return json.dumps([contents, filters, list(dims), list(values), margins], default = str)
+
+    def crosstab(self, dims, values = (), filters = None, margins = True):
+        """`crosstab` of the sales matching `filters` (see `SalesStore.query`)."""
+        store = SalesStore(self.root)
+        key = self.key(store, dims, values, filters, margins)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key].copy()
+        sales = store.query(_source_columns(dims, values), filters)
+        cube = crosstab(sales, dims, values, margins)
+        self._cache[key] = cube
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last = False)
+        return cube.copy()
+
+    def clear(self):
+        """Forget every cached result."""
+        self._cache.clear()
@@ -0,0 +1,132 @@
+"""Loading of the NYC Department of Finance rolling sales workbooks.
+
+The workbooks start with a few title rows whose number changed over the
+years (4 rows above the column names in 2018-19, 6 from 2020), so the header
+row is found by scanning the top of the sheet for the BOROUGH and SALE PRICE
+columns instead of being hard-coded per year. Every workbook is parsed in its
+own worker process and the results are collected in the original order.
+"""
+import os
+import re
+
+import openpyxl
+import pandas as pd
+
+from common.parallel import map_processes
+
+from .schema import enforce_sales_schema
+
+# file names use the borough name, the data the borough number (its position + 1)
+BOROUGHS = ('manhattan', 'bronx', 'brooklyn', 'queens', 'statenisland')
+
+# how far down the sheet the column names are looked for
+HEADER_SCAN_ROWS = 30
+HEADER_MARKERS = ('BOROUGH', 'SALEPRICE')
+
+# the columns of `nyc_db`, with the line breaks and spaces taken out of the names;
+# EASE-MENT is left out, it is empty in every year
+COLUMNS = ['BOROUGH', 'NEIGHBORHOOD', 'BUILDINGCLASSCATEGORY', 'BLOCK', 'LOT',
+           'ADDRESS', 'APARTMENTNUMBER', 'ZIPCODE', 'RESIDENTIALUNITS', 'COMMERCIALUNITS',
+           'TOTALUNITS', 'LANDSQUAREFEET', 'GROSSSQUAREFEET', 'YEARBUILT', 'TAXCLASSATTIMEOFSALE',
+           'BUILDINGCLASSATTIMEOFSALE', 'SALEPRICE', 'SALEDATE']
+
+# cells that are not numbers (a stray '-' in SALE PRICE) become missing before
+# the schema gives the columns their types
+NUMERIC_COLUMNS = ['BOROUGH', 'BLOCK', 'LOT', 'ZIPCODE', 'RESIDENTIALUNITS', 'COMMERCIALUNITS', 'TOTALUNITS',
+                   'LANDSQUAREFEET', 'GROSSSQUAREFEET', 'YEARBUILT', 'TAXCLASSATTIMEOFSALE', 'SALEPRICE']
+
+FILE_PATTERN = re.compile(r'^(\d{4})_([a-z]+)\.xlsx$')
+
+
+def normalize_column(name):
+    """'SALE\\nPRICE' -> 'SALEPRICE', as the scripts rename the columns."""
+    return re.sub(r'\s+', '', str(name)).upper() if name is not None else ''
+
+
+def sales_files(directory = '.', years = None, boroughs = None):
+    """Return the `{year}_{borough}.xlsx` workbooks in `directory`, by year and borough.
+
+    `years` and `boroughs` restrict the files returned; by default every
+    workbook following the naming scheme is.
+    """
+    found = []
+    for name in os.listdir(directory):
+        match = FILE_PATTERN.match(name)
+        if match is None:
+            continue
+        year, borough = int(match.group(1)), match.group(2)
+        if years is not None and year not in years:
+            continue
+        if boroughs is not None and borough not in boroughs:
+            continue
+        order = BOROUGHS.index(borough) if borough in BOROUGHS else len(BOROUGHS)
+        found.append((year, order, borough, os.path.join(directory, name)))
+    return [path for _, _, _, path in sorted(found)]
+
+
+def find_header(rows, max_rows = HEADER_SCAN_ROWS):
+    """Consume `rows` up to the column names; returns (position, names).
+
+    Raises ValueError when none of the first `max_rows` rows holds all the
+    `HEADER_MARKERS`.
+    """
+    for position, row in enumerate(rows):
+        if position >= max_rows:
+            break
+        names = [normalize_column(value) for value in row]
+        if all(marker in names for marker in HEADER_MARKERS):
+            while names and names[-1] == '':
+                names.pop()
+            return position, names
+    raise ValueError('no row with %s in the first %d rows' % (' and '.join(HEADER_MARKERS), max_rows))
+
+
+def read_sales(path):
+    """Parse one rolling sales workbook into a frame with the `COLUMNS`.
+
+    The sheet is streamed once: the title rows are skipped, the header row is
+    detected and blank rows are dropped. Columns a year does not have are
+    left empty. The columns get the types of `schema.SALES_DTYPES`, with the
+    building class letter and the sale year added.
+    """
+    wb = openpyxl.load_workbook(path, read_only = True, data_only = True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only = True)
+        try:
+            _, header = find_header(rows)
+        except ValueError as e:
+            raise ValueError('%s: %s' % (path, e)) from None
+        width = len(header)
+        kept = []
+        for row in rows:
+            row = row[:width]
+            if all(value is None or value == '' for value in row):
+                continue
+            if len(row) < width:
+                row = row + (None,) * (width - len(row))
+            kept.append(row)
+    finally:
+        wb.close()
+
+    df = pd.DataFrame.from_records(kept, columns = header)
+    df = df.loc[:, ~df.columns.duplicated()].reindex(columns = COLUMNS)
+    for column in NUMERIC_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors = 'coerce').astype('float64')
+    df['SALEDATE'] = pd.to_datetime(df['SALEDATE'], errors = 'coerce')
+    try:
+        return enforce_sales_schema(df)
+    except ValueError as e:
+        raise ValueError('%s: %s' % (path, e)) from None
+
+
+def load_sales(files, max_workers = None):
+    """Parse the rolling sales workbooks in parallel and stack them into `nyc_db`.
+
+    `max_workers` defaults to the number of CPUs; 1 parses everything in the
+    calling process. The rows keep the order of `files`.
+    """
+    files = list(files)
+    if not files:
+        raise ValueError('no rolling sales workbooks to load')
+    frames = map_processes(read_sales, [(path,) for path in files], max_workers)
+    return pd.concat(frames, ignore_index = True)
@@ -0,0 +1,128 @@
+"""Column types of the NYC rolling sales.
+
+The scripts used to turn the borough, block, lot, zip code and tax class into
+python strings ('1.0') and filter on those. Here they are small integers
+(nullable, the workbooks have blanks), the sale date is a datetime parsed
+once by the loader, with the sale year next to it, and the letter of the
+building class ('A' for one family homes) is a categorical with a fixed set
+of categories, so that filters compare integer codes.
+
+The year built is a plain Int16 year rather than a timestamp made from its
+string form; the workbooks use 0 for an unknown year, which becomes missing
+like any other year outside `EARLIEST_YEAR_BUILT` to the current year.
+"""
+import datetime
+import string
+
+import numpy as np
+import pandas as pd
+
+BOROUGH_NAMES = {1: 'Manhattan', 2: 'Bronx', 3: 'Brooklyn', 4: 'Queens', 5: 'Staten Island'}
+
+# every letter, so that the codes are the same whichever classes a year has
+BUILDING_CLASS_LETTER = pd.CategoricalDtype(list(string.ascii_uppercase))
+
+EARLIEST_YEAR_BUILT = 1700
+
+SALES_DTYPES = {'BOROUGH': 'Int8',
+                'BLOCK': 'Int32',
+                'LOT': 'Int32',
+                'ZIPCODE': 'Int32',
+                'YEARBUILT': 'Int16',
+                'TAXCLASSATTIMEOFSALE': 'Int8',
+                'BUILDINGCLASSLETTER': BUILDING_CLASS_LETTER,
+                'saleyear': 'Int16'}
+
+# the columns the scripts used to convert with astype(str)
+LEGACY_STRING_COLUMNS = ['BOROUGH', 'BLOCK', 'LOT', 'ZIPCODE', 'TAXCLASSATTIMEOFSALE']
+
+
+def building_class_letter(classes):
+    """The first letter of the building classes ('A5' -> 'A') as a `BUILDING_CLASS_LETTER` categorical.
+
+    Only the distinct classes are sliced; the rows just look their letter up.
+    """
+    classes = pd.Categorical(classes)
+    letters = pd.Categorical(pd.Index(classes.categories).astype(str).str.strip().str[:1].str.upper(),
+                             dtype = BUILDING_CLASS_LETTER)
+    codes = np.where(classes.codes >= 0, np.asarray(letters.codes)[classes.codes], -1)
+    return pd.Categorical.from_codes(codes, dtype = BUILDING_CLASS_LETTER)
+
+
+def parse_year_built(values, earliest = EARLIEST_YEAR_BUILT, latest = None):
+    """Turn the year built column into whole years as a nullable Int16 Series.
+
+    Numbers and numeric strings ('1920', 1920.0) are kept when they are whole
+    years from `earliest` to `latest` (default the current year); 0, blanks
+    and anything else become missing.
+    """
+    if latest is None:
+        latest = datetime.date.today().year
+    years = pd.to_numeric(pd.Series(values), errors = 'coerce').to_numpy(dtype = 'float64', na_value = np.nan)
+    with np.errstate(invalid = 'ignore'):
+        valid = (years >= earliest) & (years <= latest) & (years % 1 == 0)
+    parsed = pd.arrays.IntegerArray(np.where(valid, years, 0).astype('int16'), ~valid)
+    return pd.Series(parsed, index = getattr(values, 'index', None), name = getattr(values, 'name', None))
+
+
+def building_age(sales, year = None):
+    """Age of the buildings in years, at the sale (by default) or in `year`.
+
+    Derived when needed rather than stored; missing when the year built is,
+    and negative for units sold before the building was finished.
+    """
+    at = sales['saleyear'] if year is None else year
+    return (at - sales['YEARBUILT']).astype('Int16').rename('BUILDINGAGE')
+
+
+def enforce_sales_schema(sales):
+    """Return `sales` with the `SALES_DTYPES` column types.
+
+    Adds the building class letter when the building class is there, and the
+    sale year when the sale date is. Years built outside the valid range
+    become missing (see `parse_year_built`). Raises ValueError when another
+    integer column holds fractions or a borough code is not 1-5, rather than
+    silently coercing it.
+    """
+    sales = sales.copy()
+    if 'YEARBUILT' in sales.columns:
+        sales['YEARBUILT'] = parse_year_built(sales['YEARBUILT'])
+    if 'BUILDINGCLASSATTIMEOFSALE' in sales.columns and 'BUILDINGCLASSLETTER' not in sales.columns:
+        sales['BUILDINGCLASSLETTER'] = building_class_letter(sales['BUILDINGCLASSATTIMEOFSALE'])
+    if 'SALEDATE' in sales.columns and 'saleyear' not in sales.columns:
+        sales['saleyear'] = sales['SALEDATE'].dt.year
+
+    for column, dtype in SALES_DTYPES.items():
+        if column not in sales.columns or isinstance(dtype, pd.CategoricalDtype):
+            continue
+        values = pd.to_numeric(sales[column], errors = 'coerce')
+        if (values.dropna() % 1 != 0).any():
+            raise ValueError('%s has values that are not whole numbers' % column)
+    if 'BOROUGH' in sales.columns:
+        unknown = set(sales['BOROUGH'].dropna().astype('int64')) - set(BOROUGH_NAMES)
+        if unknown:
+            raise ValueError('unknown borough code %s' % ', '.join(map(str, sorted(unknown))))
+    dtypes = {column: dtype for column, dtype in SALES_DTYPES.items() if column in sales.columns}
+    return sales.astype(dtypes)
+
+
+def borough_names(codes):
+    """Map borough codes (1-5) to their names ('Manhattan')."""
+    return codes.map(BOROUGH_NAMES).astype(object)
+
+
+def memory_report(sales):
+    """Compare the memory footprint of the key columns as strings and as typed columns.
+
+    Returns bytes per column (deep, so python strings are counted) with the
+    columns converted with astype(str) from the float64 the workbooks load
+    as, as the scripts did, and with the schema, plus a total row.
+    """
+    columns = [column for column in LEGACY_STRING_COLUMNS if column in sales.columns]
+    legacy = sales[columns].astype('float64').astype(str)
+    typed = enforce_sales_schema(sales[columns])
+    report = pd.DataFrame({'before': legacy.memory_usage(index = False, deep = True),
+                           'after': typed.memory_usage(index = False, deep = True)})
+    report.loc['Total'] = report.sum()
+    report['saved %'] = (1 - report['after'] / report['before']) * 100
+    return report
@@ -0,0 +1,227 @@
+"""Parquet store of the NYC rolling sales, partitioned by sale year and borough.
+
+The store is a directory of Parquet files laid out as
+`sale_year=2020/borough=1/<workbook>.parquet`, one file per source workbook
+and partition, plus a `manifest.json` holding the format version and, for
+every workbook, its content hash and the files it was written to.
+
+Within a file the rows are sorted by tax class and sale date and written in
+row groups of `ROW_GROUP_SIZE` rows with min/max statistics, so a query
+like "Manhattan, tax class 2, 2020-2021" only opens the matching partition
+directories and, inside them, only the row groups whose statistics overlap
+the filter.
+
+Workbooks are added with `update_store`, which parses only the workbooks
+that are new or whose content changed, and replaces just their files.
+
+Usage:
+    python -m nyc_sales.store <store directory> <workbook> [<workbook> ...]
+"""
+import json
+import os
+import sys
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from common.files import file_digest
+from common.parallel import map_processes
+
+from .loader import COLUMNS, NUMERIC_COLUMNS, read_sales
+from .schema import SALES_DTYPES, enforce_sales_schema
+
+FORMAT = 'nyc-sales'
+VERSION = 3
+MANIFEST = 'manifest.json'
+
+ROW_GROUP_SIZE = 8192
+SORT_COLUMNS = ['TAXCLASSATTIMEOFSALE', 'SALEDATE']
+
+# data column -> the partition key it is stored under; filters on the data
+# column are applied to the partition key as well to skip whole directories
+PARTITIONS = {'saleyear': 'sale_year', 'BOROUGH': 'borough'}
+PARTITION_SCHEMA = pa.schema([('sale_year', pa.int16()), ('borough', pa.int8())])
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+ARROW_TYPES = {'Int8': pa.int8(), 'Int16': pa.int16(), 'Int32': pa.int32()}
+
+
+def _arrow_type(column):
+    dtype = SALES_DTYPES.get(column)
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pa.dictionary(pa.int8(), pa.string())
+    if dtype is not None:
+        return ARROW_TYPES[dtype]
+    if column == 'SALEDATE':
+        return pa.timestamp('us')
+    return pa.float64() if column in NUMERIC_COLUMNS else pa.string()
+
+
+SCHEMA = pa.schema([(column, _arrow_type(column)) for column in COLUMNS + ['BUILDINGCLASSLETTER', 'saleyear']])
+
+# what a query sees: the stored columns followed by the partition keys
+DATASET_SCHEMA = pa.schema(list(SCHEMA) + list(PARTITION_SCHEMA))
+
+
+def _write_manifest(root, manifest):
+    path = os.path.join(root, MANIFEST)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent = 2, sort_keys = True)
+    os.replace(tmp, path)
+
+
+def _read_manifest(root):
+    with open(os.path.join(root, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT:
+        raise ValueError('%s is not an NYC sales store' % root)
+    if manifest.get('version') != VERSION:
+        raise ValueError('%s has sales store version %s, expected %d' % (root, manifest.get('version'), VERSION))
+    return manifest
+
+
+def _partition_value(value):
+    return NULL_PARTITION if pd.isna(value) else str(int(value))
+
+
+def storage_frame(sales):
+    """Return `sales` (as `read_sales` gives it) with the `SCHEMA` columns and types."""
+    sales = enforce_sales_schema(sales.reindex(columns = COLUMNS))
+    for column in COLUMNS:
+        if pa.types.is_string(SCHEMA.field(column).type):
+            # apartment numbers and the like mix numbers and text within a column
+            sales[column] = sales[column].map(str, na_action = 'ignore').astype(object)
+    return sales[SCHEMA.names]
+
+
+def write_partitions(root, name, sales):
+    """Write the rows of one workbook, split by sale year and borough; returns the relative paths."""
+    sales = storage_frame(sales)
+    paths = []
+    for (year, borough), rows in sales.groupby(['saleyear', 'BOROUGH'], dropna = False, sort = True):
+        directory = os.path.join('sale_year=' + _partition_value(year), 'borough=' + _partition_value(borough))
+        os.makedirs(os.path.join(root, directory), exist_ok = True)
+        path = os.path.join(directory, os.path.splitext(name)[0] + '.parquet')
+        rows = rows.sort_values(SORT_COLUMNS, kind = 'stable')
+        table = pa.Table.from_pandas(rows, schema = SCHEMA, preserve_index = False)
+        tmp = os.path.join(root, path) + '.tmp'
+        pq.write_table(table, tmp, row_group_size = ROW_GROUP_SIZE, write_statistics = True)
+        os.replace(tmp, os.path.join(root, path))
+        paths.append(path)
+    return paths
+
+
+def _remove(root, paths, keep = ()):
+    for path in paths:
+        if path not in keep and os.path.exists(os.path.join(root, path)):
+            os.remove(os.path.join(root, path))
+
+
+def update_store(root, files, max_workers = None):
+    """Add the rolling sales workbooks `files` to the store at `root`, creating it if needed.
+
+    Workbooks already in the store with the same content are skipped; new and
+    changed ones are parsed in parallel (see `load_sales`) and written one at
+    a time, replacing the files of an earlier version of the same workbook.
+    Returns the workbooks that were (re)written.
+    """
+    os.makedirs(root, exist_ok = True)
+    if os.path.exists(os.path.join(root, MANIFEST)):
+        manifest = _read_manifest(root)
+    else:
+        manifest = {'format': FORMAT, 'version': VERSION,
+                    'schema': [{'name': field.name, 'type': str(field.type)} for field in SCHEMA],
+                    'workbooks': {}}
+
+    digests = {path: file_digest(path) for path in files}
+    changed = [path for path in files
+               if manifest['workbooks'].get(os.path.basename(path), {}).get('sha256') != digests[path]]
+    frames = map_processes(read_sales, [(path,) for path in changed], max_workers)
+
+    for path, sales in zip(changed, frames):
+        name = os.path.basename(path)
+        paths = write_partitions(root, name, sales)
+        _remove(root, manifest['workbooks'].get(name, {}).get('files', []), keep = paths)
+        manifest['workbooks'][name] = {'sha256': digests[path], 'rows': len(sales), 'files': paths}
+        # written after every workbook so that an interrupted update keeps what it finished
+        _write_manifest(root, manifest)
+    return changed
+
+
+def _with_partitions(filters):
+    # filters are lists of (column, op, value) tuples, or lists of such lists
+    # (or-ed together), as in pyarrow.parquet
+    conjunctions = filters if isinstance(filters[0], list) else [filters]
+    return [list(terms) + [(PARTITIONS[column], op, value) for column, op, value in terms if column in PARTITIONS]
+            for terms in conjunctions]
+
+
+class SalesStore:
+    """Read access to a store written with `update_store`.
+
+    `store.query(columns, filters)` returns the matching rows as a DataFrame,
+    reading only the partitions and row groups the filters can match.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest = _read_manifest(root)
+
+    @property
+    def columns(self):
+        return [field['name'] for field in self.manifest['schema']]
+
+    @property
+    def files(self):
+        return sorted(path for workbook in self.manifest['workbooks'].values() for path in workbook['files'])
+
+    def __len__(self):
+        return sum(workbook['rows'] for workbook in self.manifest['workbooks'].values())
+
+    def dataset(self):
+        """The store as a pyarrow dataset, with the partition keys as extra fields."""
+        return ds.dataset([os.path.join(self.root, path) for path in self.files], schema = DATASET_SCHEMA,
+                          format = 'parquet', partitioning = ds.partitioning(PARTITION_SCHEMA, flavor = 'hive'),
+                          partition_base_dir = self.root)
+
+    def expression(self, filters):
+        """Turn pyarrow.parquet style `filters` into a dataset expression (None without filters)."""
+        if not filters:
+            return None
+        return pq.filters_to_expression(_with_partitions(filters))
+
+    def query(self, columns = None, filters = None):
+        """Return the `columns` (default all) of the rows matching `filters` as a DataFrame.
+
+        `filters` are (column, op, value) tuples that must all hold, e.g.
+        `[('BOROUGH', '==', 1), ('TAXCLASSATTIMEOFSALE', '==', 2), ('saleyear', 'in', [2020, 2021])]`,
+        or a list of such lists any of which may hold.
+        """
+        columns = list(columns) if columns is not None else self.columns
+        table = self.dataset().to_table(columns = columns, filter = self.expression(filters))
+        # nullable integers stay integers instead of turning into floats
+        sales = table.to_pandas(types_mapper = {pa.int8(): pd.Int8Dtype(), pa.int16(): pd.Int16Dtype(),
+                                                pa.int32(): pd.Int32Dtype()}.get)
+        return enforce_sales_schema(sales)[columns]
+
+    def scan_plan(self, filters = None):
+        """The files and row groups a query with `filters` reads, one row per file."""
+        expression = self.expression(filters)
+        dataset = self.dataset()
+        plan = []
+        for fragment in dataset.get_fragments(filter = expression):
+            row_groups = fragment.split_by_row_group(filter = expression, schema = dataset.schema)
+            plan.append((os.path.relpath(fragment.path, self.root), len(row_groups),
+                         fragment.metadata.num_row_groups))
+        return pd.DataFrame(plan, columns = ['file', 'row_groups_read', 'row_groups'])
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    written = update_store(sys.argv[1], sys.argv[2:])
+    for workbook in sys.argv[2:]:
+        print('%s: %s' % (workbook, 'written' if workbook in written else 'already in the store'))